@@ -1,26 +1,39 @@
-import psutil
+import argparse
 import time
 import threading
 import tkinter as tk
 from tkinter import ttk
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np
 from matplotlib.figure import Figure
-import matplotlib.colors as mcolors
 import subprocess
 import os
 import platform
 import traceback
 
-# Thresholds
-L_HIGH = 70  
-L_LOW = 30   # Standard threshold
-BALANCE_COOLDOWN = 15  # Seconds between balancing same process
-MIN_CPU_USAGE = 2.0    # Minimum % CPU for consideration
+import balancer_engine as engine
+import proc_reader
+from balancer_worker import BalancerWorker
+from dashboard_plot import CpuGraph, LoadColorMap
+from event_log import EventWriter, LogRing, add_event_log_argument
+from process_table import ProcessTable
+import load_generator
+import instrumentation
+from adaptive_sampling import AdaptiveInterval, refresh_delay_ms
+from balancer_engine import perform_load_balancing, set_process_affinity
+
 monitoring = False
-cpu_history = []
-balanced_processes = {}  # Keep track of processes we've already balanced
+worker = None         # BalancerWorker running the monitoring tick
+latest_result = None  # Most recent TickResult published by the worker
+thread_view_reader = proc_reader.ThreadReader()  # GUI-side reader for thread drill-down
+log_ring = LogRing()  # Last LOG_RING_CAPACITY activity log lines
+log_rendered_seq = 0  # Newest ring line already shown in the log widget
+log_render_pending = False
+# JSON-lines event log, written in the background; only with --event-log [PATH]
+arg_parser = argparse.ArgumentParser(description="CPU load balancer dashboard")
+add_event_log_argument(arg_parser)
+event_log_path = arg_parser.parse_args().event_log
+event_writer = EventWriter(event_log_path) if event_log_path else None
 
 
 # Update the color palette with more vibrant, cyberpunk-inspired colors
@@ -34,6 +47,9 @@ SUCCESS = "#00cc88"         # Emerald (healing magic)
 NEUTRAL = "#6a5acd"         # Slate purple (neutral)
 BORDER_COLOR = "#3a2a5a"    # Darkened purple (gothic borders)
 
+# Core bar colormap (rebuilt when the thresholds change)
+load_colors = LoadColorMap(NEUTRAL, SUCCESS, HIGHLIGHT)
+
 # Add these new functions for visual effects
 def create_glow_effect(widget, color):
     """Adds a subtle glow effect to widgets"""
@@ -77,367 +93,91 @@ def create_neumorphic_button(parent, text, command):
     return btn
 
 
-def get_cpu_load():
-    """Get per-core CPU usage"""
-    try:
-        return psutil.cpu_percent(percpu=True)
-    except Exception as e:
-        print(f"Error getting CPU load: {e}")
-        return [0] * psutil.cpu_count()
-
-def predict_overload():
-    """Predict which core is likely to overload"""
-    if len(cpu_history) < 5:
-        return None
-    try:
-        avg_usage = np.mean(cpu_history[-5:], axis=0)
-        for i, usage in enumerate(avg_usage):
-            if usage > L_HIGH - 10:
-                return i
-        return None
-    except Exception as e:
-        log_action(f"Error in prediction algorithm: {e}")
-        return None
-
-def get_core_processes():
-    """Get all CPU-intensive processes"""
-    processes = []
-    try:
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent']):
-            try:
-                if proc.info['cpu_percent'] > 1.0:  # Filter out idle processes
-                    processes.append(proc)
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
-        
-        # Sort by CPU usage (highest first)
-        processes.sort(key=lambda p: p.info['cpu_percent'], reverse=True)
-        return processes
-    except Exception as e:
-        log_action(f"Error getting processes: {e}")
-        return []
-
-
-def can_balance_process(proc):
-    """Check if a process is suitable for migration"""
-    try:
-        # Skip PID 0 (System Idle) and negative PIDs
-        if proc.pid <= 0:
-            return False
-            
-        # Skip system/low-PID processes
-        if proc.pid < 10:  # More aggressive system process blocking
-            return False
-            
-        # Skip recently balanced processes
-        if proc.pid in balanced_processes and time.time() - balanced_processes[proc.pid] < 30:
-            return False
-            
-        # Skip critical system processes
-        system_processes = ['system', 'systemd', 'kernel', 'wininit', 'services.exe', 
-                           'explorer.exe', 'csrss.exe', 'lsass.exe', 'winlogon.exe',
-                           'svchost.exe', 'taskhost.exe', 'dwm.exe']
-        proc_name = proc.name().lower()
-        if any(sys_proc in proc_name for sys_proc in system_processes):
-            return False
-            
-        # Only processes using >1% CPU
-        if proc.info['cpu_percent'] < 1.0:
-            return False
-            
-        # Additional check for process status
-        if proc.status() == psutil.STATUS_ZOMBIE:
-            return False
-            
-        return True
-    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-        return False
-    except Exception as e:
-        log_action(f"Unexpected error checking process {proc.pid if 'proc' in locals() else 'N/A'}: {str(e)}")
-        return False
-def set_process_affinity(pid, cpu_list):
-    """Set CPU affinity for a process with enhanced error handling"""
-    try:
-        process = psutil.Process(pid)
-        
-        # Check process status first
-        if process.status() == psutil.STATUS_ZOMBIE:
-            raise ValueError("Process is a zombie")
-            
-        current_affinity = process.cpu_affinity()
-        
-        # Don't change if it's already set correctly
-        if set(cpu_list) == set(current_affinity):
-            return False
-            
-        # Additional check for system processes with special affinity
-        if len(current_affinity) == 0:  # Some system processes return empty list
-            raise ValueError("Process has special affinity settings")
-            
-        # Try to set new affinity
-        process.cpu_affinity(cpu_list)
-        
-        # Verify the change took effect
-        new_affinity = process.cpu_affinity()
-        if set(new_affinity) != set(cpu_list):
-            raise RuntimeError("Affinity change verification failed")
-            
-        return True
-        
-    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess) as e:
-        log_action(f"Permission error setting affinity for PID {pid}: {str(e)}")
-        return False
-    except Exception as e:
-        log_action(f"Error setting affinity for PID {pid}: {str(e)}")
-        return False
-
-def perform_load_balancing(overloaded_core, underloaded_core, max_retries=2):
-    """Improved process migration with retries"""
-    retries = 0
-    while retries < max_retries:
-        try:
-            processes = get_core_processes()
-            processes.sort(key=lambda p: (p.info['cpu_percent'], p.nice() if hasattr(p, 'nice') else 0), reverse=True)
-            
-            for proc in processes:
-                if can_balance_process(proc):
-                    try:
-                        if set_process_affinity(proc.pid, [underloaded_core]):
-                            balanced_processes[proc.pid] = time.time()
-                            log_action(f"✅ Successfully moved {proc.name()} (PID: {proc.pid}) to CPU {underloaded_core}")
-                            return True
-                    except Exception as e:
-                        log_action(f"⚠️ Failed to move {proc.name()}: {str(e)}")
-                        continue
-                        
-            log_action("🔍 No suitable processes found for migration")
-            return False
-            
-        except Exception as e:
-            retries += 1
-            if retries >= max_retries:
-                log_action(f"💥 Critical balancing error after {max_retries} retries: {str(e)}")
-                return False
-            time.sleep(0.5)  # Brief delay before retry
-
-def balance_load(cpu_loads):
-    try:
-        if not (monitoring and auto_balance_var.get()):
-            return None, None
-
-        max_idx = cpu_loads.index(max(cpu_loads))
-        min_idx = cpu_loads.index(min(cpu_loads))
-        
-        # More flexible threshold checking
-        if (cpu_loads[max_idx] > L_HIGH and 
-            cpu_loads[min_idx] < L_LOW and
-            abs(cpu_loads[max_idx] - cpu_loads[min_idx]) > 30):  # Minimum difference
-            
-            log_action(f"⚖️ Strong imbalance detected: CPU {max_idx} ({cpu_loads[max_idx]:.1f}%) → CPU {min_idx} ({cpu_loads[min_idx]:.1f}%)")
-            
-            # Get movable processes sorted by best candidates
-            processes = sorted(
-                [p for p in get_core_processes() if can_balance_process(p)],
-                key=lambda p: (p.info['cpu_percent'], p.nice() if hasattr(p, 'nice') else 0),
-                reverse=True
-            )
-            
-            if processes:
-                proc = processes[0]  # Take the best candidate
-                if set_process_affinity(proc.pid, [min_idx]):
-                    balanced_processes[proc.pid] = time.time()
-                    log_action(f"✅ Balanced {proc.name()} (PID: {proc.pid}, {proc.info['cpu_percent']:.1f}%) to CPU {min_idx}")
-                    return max_idx, min_idx
-                else:
-                    log_action("⚠️ Failed to set affinity")
-            else:
-                log_action("🔍 No movable processes found")
-        
-        return None, None
-        
-    except Exception as e:
-        log_action(f"💥 Balance error: {str(e)}")
-        return None, None
-
-def log_action(message):
-    timestamp = time.strftime("%H:%M:%S")
-    log_text.insert(tk.END, f"[{timestamp}] {message}\n")
+def log_action(message, timestamp=None):
+    if timestamp is None:
+        timestamp = time.strftime("%H:%M:%S")
+    log_ring.append(timestamp, message)
+    schedule_log_render()
+
+def schedule_log_render():
+    """Render new log lines in one batch shortly, instead of once per message"""
+    global log_render_pending
+    if not log_render_pending:
+        log_render_pending = True
+        root.after(100, render_log)
+
+def render_log():
+    """Append the lines logged since the last render, keeping the widget bounded"""
+    global log_rendered_seq, log_render_pending
+    log_render_pending = False
+    entries, log_rendered_seq, evicted = log_ring.since(log_rendered_seq)
+    if not entries:
+        return
+    if evicted:
+        log_text.delete(1.0, tk.END)
+    log_text.insert(tk.END, "".join(f"[{timestamp}] {message}\n" for _, timestamp, message in entries))
+    # Drop the oldest lines beyond the ring capacity
+    lines = int(log_text.index("end-1c").split(".")[0])
+    if lines > log_ring.capacity:
+        log_text.delete(1.0, f"{lines - log_ring.capacity}.0")
     log_text.see(tk.END)
 
 def create_gradient_colors(cpu_loads):
-    colors = []
-    for load in cpu_loads:
-        if load > L_HIGH:
-            colors.append(HIGHLIGHT)
-        elif load < L_LOW:
-            colors.append(NEUTRAL)
-        else:
-            # Create gradient between low and high
-            ratio = (load - L_LOW) / (L_HIGH - L_LOW)
-            r1, g1, b1 = mcolors.to_rgb(NEUTRAL)
-            r2, g2, b2 = mcolors.to_rgb(SUCCESS)
-            r = r1 + (r2 - r1) * ratio
-            g = g1 + (g2 - g1) * ratio
-            b = b1 + (b2 - b1) * ratio
-            colors.append(mcolors.to_hex((r, g, b)))
-    return colors
-
-def update_cpu_graph():
-    global monitoring, cpu_history
-    if not monitoring:
-        return
-        
-    cpu_loads = get_cpu_load()
-    cpu_history.append(cpu_loads)
-    if len(cpu_history) > 20:  # Increased history for smoother trends
-        cpu_history.pop(0)
-
-    # Only perform balancing if auto-balance is enabled
-    if auto_balance_var.get():
-        max_idx, min_idx = balance_load(cpu_loads)
-    else:
-        max_idx, min_idx = None, None
-    
-    # Clear the figure for redrawing
-    ax.clear()
-    ax.set_facecolor(PANEL_BG)
-    fig.patch.set_facecolor(DARK_BG)
-    
-    # Create gradient colors for bars
-    colors = create_gradient_colors(cpu_loads)
-    
-    # Plot the bar chart with rounded corners
-    bars = ax.bar(
-        range(len(cpu_loads)), 
-        cpu_loads, 
-        color=colors, 
-        edgecolor=BORDER_COLOR, 
-        linewidth=1, 
-        width=0.65,
-        alpha=0.9
-    )
-    
-    # Add horizontal lines for thresholds
-    ax.axhline(y=L_HIGH, color=HIGHLIGHT, alpha=0.3, linestyle='--', linewidth=1)
-    ax.axhline(y=L_LOW, color=NEUTRAL, alpha=0.3, linestyle='--', linewidth=1)
-    
-    # Add text labels for high/low thresholds
-    ax.text(-0.5, L_HIGH + 2, f"High ({L_HIGH}%)", color=HIGHLIGHT, alpha=0.7, fontsize=8)
-    ax.text(-0.5, L_LOW - 4, f"Low ({L_LOW}%)", color=NEUTRAL, alpha=0.7, fontsize=8)
-    
-    # Add percentage text on top of each bar
-    for i, bar in enumerate(bars):
-        height = bar.get_height()
-        ax.text(
-            bar.get_x() + bar.get_width() / 2,
-            height + 2,
-            f"{int(height)}%",
-            ha='center',
-            color=TEXT_COLOR,
-            fontsize=9
+    """RGBA color per core from the precomputed threshold colormap"""
+    return load_colors(cpu_loads, engine.L_LOW, engine.L_HIGH)
+
+def update_cpu_graph(result):
+    """Render one tick published by the balancer worker"""
+    with instrumentation.stage("render"):
+        cpu_loads = result.cpu_loads
+        colors = create_gradient_colors(cpu_loads)
+
+        # Long-lived artists are updated in place and blitted
+        cpu_graph.update(
+            cpu_loads,
+            colors,
+            history=result.history,
+            moved=result.moved,
+            high=engine.L_HIGH,
+            low=engine.L_LOW
         )
-    
-    # Add load balancing indicators if needed
-    if max_idx is not None and min_idx is not None:
-        ax.text(max_idx, cpu_loads[max_idx] + 8, "⬇️", ha='center', fontsize=16)
-        ax.text(min_idx, cpu_loads[min_idx] + 8, "⬆️", ha='center', fontsize=16)
-    
-    # Customize the graph appearance
-    ax.set_ylim(0, 100)
-    ax.set_ylabel("CPU Usage (%)", fontsize=10, color=TEXT_COLOR)
-    ax.set_xticks(range(len(cpu_loads)))
-    ax.set_xticklabels([f"CPU {i}" for i in range(len(cpu_loads))], fontsize=9, color=TEXT_COLOR)
-    
-    # Style the axes
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    ax.spines['bottom'].set_color(BORDER_COLOR)
-    ax.spines['left'].set_color(BORDER_COLOR)
-    ax.tick_params(axis='both', colors=TEXT_COLOR)
-    
-    # Add line graph of historical data if we have enough history
-    if len(cpu_history) > 1:
-        # Create a small inset axes for the history graph
-        if not hasattr(update_cpu_graph, 'history_ax'):
-            update_cpu_graph.history_ax = ax.inset_axes([0.65, 0.05, 0.3, 0.2])
-        
-        history_ax = update_cpu_graph.history_ax
-        history_ax.clear()
-        history_ax.set_facecolor(PANEL_BG)
-        
-        # Plot small lines for each CPU
-        for i in range(len(cpu_loads)):
-            values = [history[i] for history in cpu_history]
-            history_ax.plot(values, alpha=0.7, linewidth=1, color=colors[i])
-        
-        history_ax.set_title("History", fontsize=8, color=TEXT_COLOR)
-        history_ax.tick_params(axis='both', colors=TEXT_COLOR, labelsize=6)
-        history_ax.set_ylim(0, 100)
-        history_ax.grid(alpha=0.1)
-        
-    # Update the canvas
-    canvas.draw()
-    
-    # Set up the next update
-    root.after(1000, update_cpu_graph)
+
+def drain_worker():
+    """Pick up ticks and log messages published by the balancer worker"""
+    global latest_result
+    if worker is None:
+        return
+    worker.auto_balance = bool(auto_balance_var.get())
+    results, messages = worker.drain()
+    for timestamp, message in messages:
+        log_action(message, timestamp)
+    if results:
+        # Only the newest tick is drawn; older ones were superseded
+        latest_result = results[-1]
+        update_cpu_graph(latest_result)
+        jitter = worker.jitter_stats()
+        jitter_label.config(text=f"Tick jitter: {jitter['mean_ms']:.1f} ms avg / {jitter['p95_ms']:.1f} ms p95 | interval {worker.interval:.1f} s")
+    if monitoring:
+        root.after(100, drain_worker)
 
 def update_process_list():
     """Update the list of top CPU using processes"""
     if not monitoring:
         return
         
-    # Clear current list
-    process_list.delete(0, tk.END)
-    
-    # Get top CPU using processes
-    processes = []
-    for proc in psutil.process_iter(['pid', 'name', 'cpu_percent']):
-        try:
-            processes.append(proc)
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
-    
-    # Sort by CPU usage
-    processes.sort(key=lambda p: p.info['cpu_percent'], reverse=True)
-    
-    # Take top 10
-    top_processes = processes[:10]
-    
-    # Add to list
-    for i, proc in enumerate(top_processes):
+    # Top CPU using processes from the latest tick's snapshot
+    if latest_result is None:
+        root.after(refresh_delay_ms(worker.interval if worker else 1.0), update_process_list)
+        return
+    with instrumentation.stage("process_list"):
         try:
-            cpu_percent = proc.info['cpu_percent']
-            if cpu_percent > 0.1:  # Only show active processes
-                try:
-                    # Try to get process affinity
-                    try:
-                        affinity = proc.cpu_affinity()
-                        affinity_str = f"CPUs: {','.join(map(str, affinity))}" if len(affinity) < 5 else f"CPUs: {len(affinity)}"
-                    except:
-                        affinity_str = "N/A"
-                    
-                    # Try to get process priority (niceness)
-                    try:
-                        priority = proc.nice()
-                        priority_str = f"Nice: {priority}"
-                    except:
-                        priority_str = ""
-                        
-                    list_item = f"{proc.info['name']} (PID: {proc.info['pid']}) - {cpu_percent:.1f}% - {affinity_str} {priority_str}"
-                    process_list.insert(tk.END, list_item)
-                    
-                    # Color-code based on CPU usage
-                    if cpu_percent > 50:
-                        process_list.itemconfig(i, {'fg': HIGHLIGHT})
-                    elif cpu_percent > 20:
-                        process_list.itemconfig(i, {'fg': ACCENT})
-                except:
-                    pass
-        except:
-            pass
+            # Only the rows that appeared, left or changed are touched
+            process_table.update(latest_result.snapshot)
+        except Exception as e:
+            log_action(f"⚠️ Process list error: {str(e)}")
     
     # Schedule next update
-    root.after(2000, update_process_list)
+    root.after(refresh_delay_ms(worker.interval if worker else 1.0), update_process_list)
 
 def check_admin_rights():
     """Check if application is running with admin rights"""
@@ -464,28 +204,71 @@ def check_and_notify_about_rights():
         log_action("✅ Running with administrator privileges. Full functionality available.")
         return True
 
+def update_overhead_panel():
+    """Refresh the per-stage latency and self overhead panel"""
+    if not monitoring:
+        return
+    overhead_label.config(text=instrumentation.format_report())
+    root.after(2000, update_overhead_panel)
+
+def toggle_instrumentation():
+    instrumentation.set_enabled(instrumentation_var.get())
+    log_action(f"⏱️ Stage instrumentation {'on' if instrumentation.enabled else 'off'}")
+    overhead_label.config(text=instrumentation.format_report())
+
 def start_monitoring():
-    global monitoring
+    global monitoring, worker
     if not monitoring:
         monitoring = True
         log_action("▶️ Monitoring Started")
         status_label.config(text="Status: Active", fg=SUCCESS)
         start_button.config(state=tk.DISABLED)
         stop_button.config(state=tk.NORMAL)
-        update_cpu_graph()
+
+        # Sampling and balancing run on the worker thread; the GUI only drains results
+        # The tick interval adapts to the load (100 ms near saturation, up to 5 s when idle)
+        worker = BalancerWorker(interval=1.0, auto_balance=bool(auto_balance_var.get()), scheduler=AdaptiveInterval())
+        engine.set_log_handler(worker.log)
+        worker.start()
+        drain_worker()
         update_process_list()
+        update_overhead_panel()
         
         # Check admin rights
         check_and_notify_about_rights()
 
 def stop_monitoring():
-    global monitoring
+    global monitoring, worker
     if monitoring:
         monitoring = False
+        stopped, worker = worker, None
+        stopped.stop()
+        stopped.join(timeout=2.0)
         log_action("⏹️ Monitoring Stopped")
         status_label.config(text="Status: Inactive", fg=HIGHLIGHT)
-        start_button.config(state=tk.NORMAL)
         stop_button.config(state=tk.DISABLED)
+        finish_stopping(stopped)
+
+def finish_stopping(stopped):
+    """Hand the engine log back to the GUI once the stopped worker has exited
+
+    Until then the engine keeps logging into the worker's queue, which is
+    drained here on the Tk thread.
+    """
+    for timestamp, message in stopped.drain()[1]:
+        log_action(message, timestamp)
+    if stopped.is_alive():
+        root.after(100, finish_stopping, stopped)
+        return
+    engine.set_log_handler(log_action)
+    start_button.config(state=tk.NORMAL)
+
+def run_on_worker(fn, *args):
+    """Change engine state between ticks: on the worker if one is running, else right away"""
+    if worker is not None:
+        worker.submit(fn, *args)
+    else:
+        fn(*args)
 
 def clear_log():
     log_text.delete(1.0, tk.END)
@@ -534,12 +317,15 @@ def manual_balance():
         log_action("⚠️ Cannot balance: Monitoring is not active")
         return
     
-    cpu_loads = get_cpu_load()
+    if latest_result is None:
+        log_action("⚠️ Cannot balance: No CPU sample yet")
+        return
+    cpu_loads = latest_result.cpu_loads
     max_idx = cpu_loads.index(max(cpu_loads))
     min_idx = cpu_loads.index(min(cpu_loads))
     
     log_action(f"🔄 Manual balancing: CPU {max_idx} → CPU {min_idx}")
-    perform_load_balancing(max_idx, min_idx)
+    worker.submit(perform_load_balancing, max_idx, min_idx)
 
 # Function to manually balance a selected process
 def balance_selected_process():
@@ -548,55 +334,93 @@ def balance_selected_process():
         log_action("⚠️ Cannot balance: Monitoring is not active")
         return
         
-    selection = process_list.curselection()
-    if not selection:
+    # The selection is carried by PID
+    pid = process_table.selected_pid()
+    if pid is None:
         log_action("⚠️ No process selected")
         return
         
-    # Get the selected process info
-    process_info = process_list.get(selection[0])
-    
-    # Extract PID from the string
     try:
-        pid_str = process_info.split("(PID: ")[1].split(")")[0]
-        pid = int(pid_str)
-        
         # Get current CPU loads
-        cpu_loads = get_cpu_load()
+        if latest_result is None:
+            log_action("⚠️ Cannot balance: No CPU sample yet")
+            return
+        cpu_loads = latest_result.cpu_loads
         min_idx = cpu_loads.index(min(cpu_loads))
-        
+        entry = latest_result.snapshot.find(pid)
+        shown = process_table.entry(pid)
+        process_name = shown.name if shown is not None else f"PID {pid}"
+
+        def move_process():
+            # Runs on the worker thread
+            moved = set_process_affinity(pid, [min_idx])
+            if entry is not None:
+                # Mark as recently balanced (keyed by PID and start time)
+                engine.record_migration(entry, entry.cpu_num, min_idx, moved)
+            if moved:
+                engine.log_action(f"🔄 Manually moved process {process_name} to CPU {min_idx}")
+            else:
+                engine.log_action("⚠️ Failed to set process affinity")
+
         # Set the process affinity to the least loaded CPU
-        if set_process_affinity(pid, [min_idx]):
-            process_name = process_info.split(" (PID:")[0]
-            log_action(f"🔄 Manually moved process {process_name} to CPU {min_idx}")
-            balanced_processes[pid] = time.time()  # Mark as recently balanced
-        else:
-            log_action("⚠️ Failed to set process affinity")
+        worker.submit(move_process)
     except Exception as e:
         log_action(f"⚠️ Error: {str(e)}")
 
-# Add a load generator for testing
-import multiprocessing
-import time
+# Drill down into the threads of the selected process
+def show_process_threads(event=None):
+    """Show per-thread load and current CPU for the selected process"""
+    pid = process_table.selected_pid()
+    if pid is None:
+        log_action("⚠️ No process selected")
+        return
+    shown = process_table.entry(pid)
+
+    window = tk.Toplevel(root, bg=DARK_BG)
+    window.title(f"Threads of {shown.name if shown is not None else 'process'} (PID: {pid})")
+    thread_list = tk.Listbox(window, font=("Consolas", 9), bg=DARK_BG, fg=TEXT_COLOR, width=60, height=15)
+    thread_list.pack(fill="both", expand=True, padx=10, pady=10)
+
+    def refresh_threads():
+        if not thread_list.winfo_exists():
+            return
+        threads = engine.get_thread_loads(pid, reader=thread_view_reader)
+        thread_list.delete(0, tk.END)
+        if not threads:
+            thread_list.insert(tk.END, "Process has exited or threads are not readable")
+            return
+        for thread in threads:
+            thread_list.insert(tk.END, f"TID {thread.tid:<8} {thread.name:<16} {thread.cpu_percent:5.1f}%  CPU {thread.cpu_num}")
+        window.after(1000, refresh_threads)
+
+    refresh_threads()
+
+
+def toggle_thread_mode():
+    mode = "thread" if thread_mode_var.get() else "process"
+    if mode == "thread" and not engine.thread_mode_supported():
+        thread_mode_var.set(False)
+        log_action("⚠️ Thread-level balancing needs Linux /proc; staying in process mode")
+        return
+    run_on_worker(apply_balance_mode, mode)
 
-# Define burn_cpu OUTSIDE generate_load (critical for multiprocessing)
-def burn_cpu(seconds):
-    """CPU burner function (must be at module level)"""
-    start = time.time()
-    while time.time() - start < seconds:
-        sum(x * x for x in range(1_000_000))  # Pure CPU torture
+def apply_balance_mode(mode):
+    engine.set_balance_mode(mode)
+    engine.log_action(f"⚙️ Balancing mode: {engine.BALANCE_MODE}")
+
+# Add a load generator for testing
+test_load = None  # load_generator.LoadGenerator started by the test button
 
 def generate_load():
     """Generate CPU load across all cores (30 seconds)"""
+    global test_load
     try:
         log_action("💣 NUKE MODE: Generating brutal CPU load on ALL CORES for 30 sec...")
         
-        workers = multiprocessing.cpu_count()
-        processes = []
-        for _ in range(workers):
-            p = multiprocessing.Process(target=burn_cpu, args=(30,))
-            p.start()
-            processes.append(p)
+        if test_load is not None:
+            test_load.stop()
+        # One full-duty worker per core, free to be moved by the balancer
+        test_load = load_generator.generate_load(profile=load_generator.Constant(1.0), duration=30)
         
         log_action("☠️ SUCCESS: CPU is now on FIRE (30 sec of pain).")
         
@@ -882,6 +706,26 @@ auto_balance_check = tk.Checkbutton(
 )
 auto_balance_check.pack(side="left", padx=20)
 
+# Thread-level balancing toggle
+thread_mode_var = tk.BooleanVar(value=False)
+thread_mode_check = tk.Checkbutton(
+    status_bar,
+    text="Thread Mode",
+    variable=thread_mode_var,
+    command=toggle_thread_mode,
+    font=("Segoe UI", 12),
+    bg=PANEL_BG,
+    fg=TEXT_COLOR,
+    selectcolor=DARK_BG,
+    activebackground=PANEL_BG,
+    activeforeground=ACCENT
+)
+thread_mode_check.pack(side="left", padx=20)
+
+# Worker tick jitter
+jitter_label = tk.Label(status_bar, text="Tick jitter: -", font=("Segoe UI", 10), bg=PANEL_BG, fg=TEXT_COLOR)
+jitter_label.pack(side="left", padx=10)
+
 # Control buttons
 controls_frame = tk.Frame(status_bar, bg=PANEL_BG)
 controls_frame.pack(side="right", padx=10)
@@ -939,6 +783,14 @@ fig = Figure(figsize=(10, 4), dpi=100)
 ax = fig.add_subplot(111)
 canvas = FigureCanvasTkAgg(fig, master=graph_panel)
 canvas.get_tk_widget().pack(fill="both", expand=True)
+cpu_graph = CpuGraph(fig, ax, canvas, {
+    "dark_bg": DARK_BG,
+    "panel_bg": PANEL_BG,
+    "border": BORDER_COLOR,
+    "text": TEXT_COLOR,
+    "high": HIGHLIGHT,
+    "low": NEUTRAL,
+}, history_capacity=engine.HISTORY_LENGTH)
 ax.spines['bottom'].set_color(ACCENT)
 ax.spines['left'].set_color(ACCENT)
 ax.tick_params(axis='x', colors=ACCENT)
@@ -985,20 +837,15 @@ process_header.pack(pady=(0, 10))
 process_frame = tk.Frame(process_panel, bg=PANEL_BG)
 process_frame.pack(fill="both", expand=True)
 
-process_list = tk.Listbox(
+# Process table keyed by PID; click a heading to sort
+process_table = ProcessTable(
     process_frame,
+    colors={"bg": DARK_BG, "fg": TEXT_COLOR, "select_bg": ACCENT, "select_fg": DARK_BG,
+            "hot": HIGHLIGHT, "warm": ACCENT},
     font=("Consolas", 9),
-    bg=DARK_BG,
-    fg=TEXT_COLOR,
-    selectbackground=ACCENT,
-    selectforeground=DARK_BG,
     height=10
 )
-process_list.pack(side="left", fill="both", expand=True)
-
-process_scroll = tk.Scrollbar(process_frame, orient="vertical", command=process_list.yview)
-process_scroll.pack(side="right", fill="y")
-process_list.config(yscrollcommand=process_scroll.set)
+process_table.pack(fill="both", expand=True)
 
 # Button to balance selected process
 balance_process_button = tk.Button(
@@ -1012,6 +859,37 @@ balance_process_button = tk.Button(
 )
 balance_process_button.pack(pady=(10, 0))
 
+# Double-click a process to see its threads
+process_table.bind("<Double-Button-1>", show_process_threads)
+
+# Balancer overhead panel (per-stage latency, own CPU and memory)
+overhead_panel = tk.Frame(right_panel, bg=PANEL_BG, padx=15, pady=10)
+overhead_panel.pack(fill="x", pady=(0, 10))
+
+overhead_header = tk.Frame(overhead_panel, bg=PANEL_BG)
+overhead_header.pack(fill="x")
+
+overhead_title = tk.Label(overhead_header, text="Balancer Overhead", font=("Segoe UI", 12, "bold"), bg=PANEL_BG, fg=ACCENT)
+overhead_title.pack(side="left")
+
+instrumentation_var = tk.BooleanVar(value=instrumentation.enabled)
+instrumentation_check = tk.Checkbutton(
+    overhead_header,
+    text="Instrumentation",
+    variable=instrumentation_var,
+    command=toggle_instrumentation,
+    font=("Segoe UI", 9),
+    bg=PANEL_BG,
+    fg=TEXT_COLOR,
+    selectcolor=DARK_BG,
+    activebackground=PANEL_BG,
+    activeforeground=ACCENT
+)
+instrumentation_check.pack(side="right")
+
+overhead_label = tk.Label(overhead_panel, text="No ticks yet", font=("Consolas", 9), bg=PANEL_BG, fg=TEXT_COLOR, justify="left", anchor="w")
+overhead_label.pack(fill="x", pady=(5, 0))
+
 # Log panel
 log_panel = tk.Frame(right_panel, bg=PANEL_BG, padx=15, pady=15)
 log_panel.pack(fill="both", expand=True)
@@ -1045,6 +923,12 @@ try:
 except:
     pass
 
+# Send engine log messages to the activity log
+engine.set_log_handler(log_action)
+if event_writer is not None:
+    engine.set_event_sink(event_writer.emit)
+    event_writer.start()
+
 # Add welcome message to log
 log_text.insert(tk.END, "Welcome to CPU Load Balancer Pro!\n")
 log_text.insert(tk.END, "Click 'Start' to begin monitoring CPU cores.\n")
@@ -1052,13 +936,12 @@ log_text.insert(tk.END, "-------------------------------\n")
 
 # Start the main event loop
 root.mainloop()
+if event_writer is not None:
+    event_writer.close()
 
-# Clean up temporary files
-try:
-    if os.path.exists("temp_load_generator.py"):
-        os.remove("temp_load_generator.py")
-except:
-    pass
+# Stop the test load if it is still running
+if test_load is not None:
+    test_load.stop()
 def pulse_status():
     current_color = status_label.cget("fg")
     if current_color == SUCCESS:
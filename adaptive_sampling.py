@@ -0,0 +1,72 @@
+"""Adaptive monitoring interval.
+
+A fixed 1 s tick wastes cycles on an idle host and reacts slowly near
+saturation. ``AdaptiveInterval`` picks each next interval from the tick's
+per-core loads and forecast:
+
+  * A core within ``near_margin`` of ``L_HIGH`` (or above it), or a
+    forecast trend steeper than ``steep_slope`` points/s, drops the
+    interval straight to ``min_interval``. This only applies while some
+    core has room to take work; a host that is busy everywhere has
+    nothing to balance.
+  * While every core stays ``calm_margin`` below ``L_HIGH``, the interval
+    grows by ``backoff`` per tick up to ``max_interval``.
+  * Anything in between eases back towards ``base_interval``.
+
+Per-process and per-core CPU rates are computed from measured timestamps,
+so they stay correct at any interval. Forecasts convert samples to seconds
+with ``engine.SAMPLE_INTERVAL``, which the worker keeps at the actual
+spacing of recent ticks (``engine.set_sample_interval``). Everything that
+spans several ticks is set in seconds and converted with the measured
+spacing (``engine.window_samples``): the forecast and attribution windows
+and the hysteresis hold, so a 100 ms interval does not shrink them to a
+fraction of a second. The snapshot reuse window follows the interval too.
+"""
+import numpy as np
+
+MIN_INTERVAL = 0.1   # Seconds, near saturation
+BASE_INTERVAL = 1.0  # Seconds, normal load
+MAX_INTERVAL = 5.0   # Seconds, idle host
+NEAR_MARGIN = 10.0   # Points below L_HIGH that count as approaching it
+CALM_MARGIN = 25.0   # Points below L_HIGH where every core counts as calm
+STEEP_SLOPE = 10.0   # Forecast trend (points/s) that counts as steep
+BACKOFF = 1.5        # Interval growth per calm tick
+
+
+class AdaptiveInterval:
+    """Next tick interval from the current loads and forecast trend"""
+
+    def __init__(self, min_interval=MIN_INTERVAL, base_interval=BASE_INTERVAL, max_interval=MAX_INTERVAL,
+                 near_margin=NEAR_MARGIN, calm_margin=CALM_MARGIN, steep_slope=STEEP_SLOPE, backoff=BACKOFF):
+        self.min_interval = min_interval
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.near_margin = near_margin
+        self.calm_margin = calm_margin
+        self.steep_slope = steep_slope
+        self.backoff = backoff
+        self.interval = base_interval
+
+    def update(self, loads, forecast, high, sample_interval):
+        """Feed one tick; returns the interval until the next one"""
+        loads = np.asarray(loads, dtype=float)
+        busiest, idlest = float(loads.max()), float(loads.min())
+        slope = 0.0
+        if forecast is not None and len(forecast.trend) == len(loads) and sample_interval > 0:
+            slope = float(np.max(forecast.trend)) / sample_interval  # Trend is per sample
+
+        room = idlest < high - self.near_margin
+        if room and (busiest >= high - self.near_margin or slope >= self.steep_slope):
+            self.interval = self.min_interval
+        elif busiest < high - self.calm_margin and slope < self.steep_slope / 2:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        elif self.interval < self.base_interval:
+            self.interval = min(self.interval * self.backoff, self.base_interval)
+        else:
+            self.interval = max(self.interval / self.backoff, self.base_interval)
+        return self.interval
+
+
+def refresh_delay_ms(interval, factor=2.0, min_ms=500, max_ms=10000):
+    """Refresh delay for dashboard views that need not follow every tick"""
+    return int(min(max(interval * factor * 1000, min_ms), max_ms))
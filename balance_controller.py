@@ -0,0 +1,144 @@
+"""Anti-oscillation layer between load measurements and migrations.
+
+``BalanceController`` adds hysteresis to the overload decision: balancing
+only starts after the imbalance has held for ``sustain_seconds`` (from the
+first to the latest imbalanced tick) above the enter thresholds, and it
+keeps going until the load drops below the (lower) exit thresholds. Short
+spikes and loads hovering around ``L_HIGH`` no longer flip it on and off.
+The hold is measured in seconds, not ticks, so it does not shrink when the
+adaptive interval speeds the ticks up.
+
+``MigrationCostModel`` estimates what a move costs, in the same load
+points as the gain the planner computes: a fixed base, the resident set
+(warm caches and memory to refill), the recent page-fault rate (an active
+working set) and a penalty that decays with the time since the process
+was last moved, which is what stops ping-ponging. The planner only keeps
+moves whose gain exceeds that cost. Fault rates belong to the tick snapshot
+they were computed from; a process priced from any other snapshot (e.g. a
+rescan for a manual action) is matched to them by ``(pid, create_time)``.
+"""
+import math
+import os
+import time
+
+import numpy as np
+
+import proc_reader
+
+SUSTAIN_SECONDS = 2.0  # Imbalance held this long (3 ticks at 1 s) before balancing starts
+ENTER_GAP = 30.0    # Busiest - idlest core (points) to start balancing
+EXIT_MARGIN = 10.0  # Stop once the busiest core is this far below L_HIGH...
+EXIT_GAP = 15.0     # ...or the spread is below this
+
+try:
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    PAGE_SIZE = 4096
+
+
+class BalanceController:
+    """Hysteresis state machine deciding when balancing is engaged"""
+
+    def __init__(self, sustain_seconds=SUSTAIN_SECONDS, enter_gap=ENTER_GAP,
+                 exit_margin=EXIT_MARGIN, exit_gap=EXIT_GAP):
+        self.sustain_seconds = sustain_seconds
+        self.enter_gap = enter_gap
+        self.exit_margin = exit_margin
+        self.exit_gap = exit_gap
+        self.streak = None     # Seconds the enter condition has held (None: not met)
+        self.engaged = False
+
+    def update(self, loads, high, low, elapsed=1.0):
+        """Feed one tick of (expected) per-core loads, `elapsed` s after the last; True while balancing"""
+        busiest, idlest = float(np.max(loads)), float(np.min(loads))
+        gap = busiest - idlest
+        if self.engaged:
+            if busiest < high - self.exit_margin or gap < self.exit_gap:
+                self.engaged = False
+                self.streak = None
+            return self.engaged
+
+        if busiest > high and idlest < low and gap > self.enter_gap:
+            # The first imbalanced tick starts the clock; the time before it was balanced
+            self.streak = 0.0 if self.streak is None else self.streak + elapsed
+        else:
+            self.streak = None
+        if self.streak is not None and self.streak >= self.sustain_seconds - 1e-9:
+            self.engaged = True
+        return self.engaged
+
+    def reset(self):
+        self.streak = None
+        self.engaged = False
+
+
+class MigrationCostModel:
+    """Per-move cost in load points from RSS, page faults and move recency"""
+
+    def __init__(self, base=2.0, per_gib=4.0, per_kfault=1.0, per_majfault=0.1,
+                 fault_cap=20.0, recent_penalty=25.0, recent_tau=60.0, margin=1.5):
+        self.base = base                      # Any move: lost L1/L2 state, IPIs
+        self.per_gib = per_gib                # Per GiB resident
+        self.per_kfault = per_kfault          # Per 1000 minor faults/s
+        self.per_majfault = per_majfault      # Per major fault/s
+        self.fault_cap = fault_cap
+        self.recent_penalty = recent_penalty  # Cost of moving right after a move...
+        self.recent_tau = recent_tau          # ...decaying with this time constant (s)
+        self.margin = margin                  # Gain must exceed cost by this factor
+        self._previous = None
+        self.fault_rate = np.zeros(0)         # Minor, major faults/s per row of `rated`
+        self.majfault_rate = np.zeros(0)
+        self.rated = None                     # Snapshot the fault rates were computed for
+
+    def update(self, snapshot):
+        """Compute page-fault rates against the previous /proc table"""
+        self.rated = snapshot
+        table = snapshot.table
+        if table is None:
+            self.fault_rate = self.majfault_rate = np.zeros(len(snapshot))
+            return
+        previous, self._previous = self._previous, table
+        if previous is None or not len(previous) or table.read_at <= previous.read_at:
+            self.fault_rate = self.majfault_rate = np.zeros(len(table))
+            return
+        elapsed = table.read_at - previous.read_at
+        prev_idx, matched = proc_reader.match_previous(previous, table)
+        self.fault_rate = np.where(matched, table.minflt - previous.minflt[prev_idx], 0) / elapsed
+        self.majfault_rate = np.where(matched, table.majflt - previous.majflt[prev_idx], 0) / elapsed
+
+    def cost(self, snapshot, index, history=None, now=None, key=None):
+        """Cost of migrating snapshot row `index`, already scaled by `margin`
+
+        `key` is the (id, create_time) the move is recorded under in
+        `history`, for moves of a thread (TID) or a cgroup (path) rather
+        than of the row's process.
+        """
+        cost = self.base
+        table = snapshot.table
+        if table is not None:
+            cost += self.per_gib * table.rss_pages[index] * PAGE_SIZE / 2**30
+            row = self._rated_row(snapshot, index)
+            if row is not None and row < len(self.fault_rate):
+                faults = (self.per_kfault * self.fault_rate[row] / 1000 +
+                          self.per_majfault * self.majfault_rate[row])
+                cost += min(faults, self.fault_cap)
+        if history is not None:
+            if key is None:
+                key = (int(snapshot.pid[index]), float(snapshot.create_time[index]))
+            record = history.get(*key)
+            if record is not None and record.moves:
+                now = time.monotonic() if now is None else now
+                cost += self.recent_penalty * math.exp(-(now - record.last_time) / self.recent_tau)
+        return float(cost * self.margin)
+
+    def _rated_row(self, snapshot, index):
+        """Row of snapshot row `index`'s process in the rated snapshot (None if absent)"""
+        rated = self.rated
+        if rated is None:
+            return None
+        if rated is snapshot:
+            return index
+        row = rated.index_of(int(snapshot.pid[index]))
+        if row is None or rated.create_time[row] != snapshot.create_time[index]:
+            return None
+        return row
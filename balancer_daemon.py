@@ -0,0 +1,134 @@
+"""Headless balancer daemon.
+
+Runs the sampling, prediction and balancing loop from ``balancer_engine``
+without a GUI, for servers that have no display:
+
+    python balancer_daemon.py --interval 1 --high 70 --low 30
+"""
+import argparse
+import signal
+import time
+
+import balancer_engine as engine
+import event_log
+import forecasting
+import instrumentation
+import load_trace
+import metrics_exporter
+import adaptive_sampling
+from balancer_worker import BalancerWorker
+
+running = True
+
+
+def stop(signum=None, frame=None):
+    """Ask the monitoring loop to exit after the current tick"""
+    global running
+    running = False
+
+
+def run(interval=1.0, dry_run=False, scheduler=None):
+    """Sample and balance every `interval` seconds (adapted by `scheduler`) until stopped"""
+    adaptive = f", adaptive {scheduler.min_interval}-{scheduler.max_interval}s" if scheduler else ""
+    engine.log_action(f"▶️ Balancer daemon started (interval {interval}s{adaptive}, high {engine.L_HIGH}%, low {engine.L_LOW}%)")
+    # Nothing consumes tick results here, so keep only the latest
+    worker = BalancerWorker(interval=interval, auto_balance=not dry_run, queue_size=1, scheduler=scheduler)
+    worker.start()
+    while running and worker.is_alive():
+        time.sleep(0.2)
+    worker.stop()
+    worker.join()
+    jitter = worker.jitter_stats()
+    engine.log_action(f"⏹️ Balancer daemon stopped (tick jitter {jitter['mean_ms']:.2f} ms avg, {jitter['p95_ms']:.2f} ms p95, {jitter['overruns']} overruns)")
+    if instrumentation.enabled and instrumentation.stage_stats:
+        engine.log_action("⏱️ Balancer overhead:\n" + instrumentation.format_report())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless dynamic CPU load balancer")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between ticks")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="adapt the interval to the load (shorter near L_HIGH, longer when idle)")
+    parser.add_argument("--min-interval", type=float, default=adaptive_sampling.MIN_INTERVAL,
+                        help="shortest adaptive interval (s)")
+    parser.add_argument("--max-interval", type=float, default=adaptive_sampling.MAX_INTERVAL,
+                        help="longest adaptive interval (s)")
+    parser.add_argument("--high", type=int, default=engine.L_HIGH, help="high load threshold (%%)")
+    parser.add_argument("--low", type=int, default=engine.L_LOW, help="low load threshold (%%)")
+    parser.add_argument("--forecast-model", choices=forecasting.FORECAST_MODELS,
+                        default=engine.FORECAST_MODEL, help="load forecasting model")
+    parser.add_argument("--horizon", type=float, default=engine.FORECAST_HORIZON,
+                        help="seconds ahead to forecast overloads")
+    parser.add_argument("--budget", type=int, default=engine.MIGRATION_BUDGET,
+                        help="most migrations applied per tick")
+    parser.add_argument("--cooldown", type=float, default=engine.BALANCE_COOLDOWN,
+                        help="seconds before a migrated process may be moved again")
+    parser.add_argument("--sustain", type=float, default=engine.balance_controller.sustain_seconds,
+                        help="seconds an imbalance must last before balancing starts")
+    parser.add_argument("--sysfs-root", default="/sys", help="sysfs tree to read the CPU topology from")
+    parser.add_argument("--policy", help="JSON allow/deny policy for which processes may be moved")
+    parser.add_argument("--threads", action="store_true", help="migrate individual hot threads instead of whole processes")
+    parser.add_argument("--cgroups", action="store_true",
+                        help="restrict the cpuset of each process's cgroup v2 group instead of pinning PIDs")
+    parser.add_argument("--cgroup-root", default="/sys/fs/cgroup", help="cgroup v2 mount point")
+    parser.add_argument("--dry-run", action="store_true", help="monitor only, never change affinity")
+    parser.add_argument("--record", help="record every tick into this load trace file (see replay.py)")
+    event_log.add_event_log_argument(parser)
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help=f"serve Prometheus metrics on this port (e.g. {metrics_exporter.METRICS_PORT}; 0 = off)")
+    parser.add_argument("--no-instrumentation", action="store_true",
+                        help="turn the per-stage timing hooks into no-ops")
+    parser.add_argument("--metrics-host", default=metrics_exporter.METRICS_HOST,
+                        help="address the metrics exporter listens on")
+    args = parser.parse_args(argv)
+
+    engine.set_thresholds(args.high, args.low)
+    engine.set_forecast(args.forecast_model, args.horizon)
+    engine.SAMPLE_INTERVAL = args.interval
+    engine.MIGRATION_BUDGET = args.budget
+    engine.set_cooldown(args.cooldown)
+    engine.balance_controller.sustain_seconds = args.sustain
+    if args.sysfs_root != "/sys":
+        engine.set_topology_root(args.sysfs_root)
+    if args.policy:
+        engine.load_policy(args.policy)
+    if args.cgroup_root != "/sys/fs/cgroup":
+        engine.set_cgroup_root(args.cgroup_root)
+    if args.cgroups:
+        engine.set_balance_mode("cgroup")
+    elif args.threads:
+        engine.set_balance_mode("thread")
+    if args.no_instrumentation:
+        instrumentation.set_enabled(False)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    writer = None
+    if args.event_log:
+        writer = event_log.EventWriter(args.event_log)
+        engine.set_event_sink(writer.emit)
+        writer.start()
+    if args.record:
+        engine.set_trace_writer(load_trace.TraceWriter(args.record))
+    exporter = None
+    if args.metrics_port:
+        exporter = metrics_exporter.MetricsExporter(args.metrics_port, args.metrics_host).start()
+        engine.log_action(f"📡 Metrics on http://{args.metrics_host}:{exporter.port}/metrics")
+    try:
+        scheduler = None
+        if args.adaptive:
+            scheduler = adaptive_sampling.AdaptiveInterval(args.min_interval, args.interval, args.max_interval)
+        run(args.interval, args.dry_run, scheduler)
+    finally:
+        if exporter is not None:
+            exporter.close()
+        if engine.trace_writer is not None:
+            engine.trace_writer.close()
+            engine.set_trace_writer(None)
+        if writer is not None:
+            engine.set_event_sink(None)
+            writer.close()
+
+
+if __name__ == "__main__":
+    main()
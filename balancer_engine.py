@@ -0,0 +1,853 @@
+"""Headless CPU load balancing engine.
+
+Sampling, overload prediction and process migration logic shared by the
+Tkinter dashboards and the headless daemon. Nothing in this module touches
+Tkinter or matplotlib, so it can be imported on servers without a display.
+"""
+import itertools
+import os
+import psutil
+import time
+from collections import deque, namedtuple
+import numpy as np
+
+import candidate_selection
+import forecasting
+import instrumentation
+from balance_controller import BalanceController, MigrationCostModel
+from cgroup_cpuset import CpusetController, format_cpu_list
+import migration_planner
+import process_snapshot
+import proc_reader
+from core_attribution import CoreAttribution
+from cpu_ring import CpuHistory
+from cpu_topology import CpuTopology
+from migration_history import MigrationHistory
+from process_policy import ProcessPolicy
+
+# Thresholds
+L_HIGH = 70
+L_LOW = 30   # Standard threshold
+BALANCE_COOLDOWN = 15  # Seconds between balancing same process
+MIN_CPU_USAGE = 2.0    # Minimum % CPU for consideration
+HISTORY_LENGTH = 20    # Samples shown in the history plot
+HISTORY_CAPACITY = 100 # Samples kept: FORECAST_WINDOW at the 100 ms adaptive interval
+cpu_history = CpuHistory(psutil.cpu_count() or 1, HISTORY_CAPACITY)  # Per-core ring buffer
+migration_history = MigrationHistory(cooldown=BALANCE_COOLDOWN)  # Keyed by (pid, create_time)
+process_policy = ProcessPolicy()  # Which processes may be migrated at all
+balance_controller = BalanceController()  # Sustained-imbalance hysteresis
+cpu_topology = CpuTopology.load(num_cpus=psutil.cpu_count() or 1)  # SMT/L3/NUMA layout
+migration_cost = MigrationCostModel()     # Per-move cost vs. expected gain
+
+MIGRATION_BUDGET = 4   # Most migrations planned per tick
+CANDIDATE_LIMIT = 64   # Eligible candidates per overloaded core handed to the planner
+
+# Forecasting
+FORECAST_MODEL = "holt"  # One of forecasting.FORECAST_MODELS
+FORECAST_HORIZON = 5.0   # Seconds ahead the balancer looks
+FORECAST_WINDOW = 10.0   # Seconds of history fed to the forecast models
+SAMPLE_INTERVAL = 1.0    # Seconds between monitoring ticks (mean over the forecast window when adaptive)
+_sample_spacing = deque(maxlen=HISTORY_CAPACITY)  # Measured seconds between recent ticks
+_settled = None  # Per core: samples since a migration last moved load on or off it
+latest_forecast = None
+core_attribution = CoreAttribution()  # Which processes load which core
+
+# "process" pins whole processes; "thread" moves individual hot threads (Linux);
+# "cgroup" rewrites the cpuset of the process's cgroup v2 group (Linux)
+BALANCE_MODE = "process"
+cpuset_controller = CpusetController()
+GROUP_IDLE_RESTORE = 60.0  # Seconds a moved cgroup must stay idle before its cpuset is restored
+idle_groups = {}  # moved group -> when it was first seen idle
+THREAD_TRACK_LIMIT = 8  # Hottest processes whose threads are sampled each tick
+thread_reader = proc_reader.ThreadReader()
+tracked_threads = {}  # pid -> task table read this tick (thread mode)
+
+ThreadEntry = namedtuple("ThreadEntry", "tid name cpu_percent cpu_num")
+# A single thread as a balancing candidate; `create_time` is its process's
+ThreadTask = namedtuple("ThreadTask", "pid tid name cpu_percent cpu_num create_time")
+
+trace_writer = None       # load_trace.TraceWriter recording every tick, if any
+_affinity_backend = None  # Replaces psutil affinity calls (replay simulation)
+migration_counts = {"attempted": 0, "succeeded": 0, "failed": 0}  # Process, thread and cpuset moves
+_completed_ticks = 0  # Ticks whose sampling and balancing have finished
+_log_handler = None
+_event_sink = None
+
+
+def set_log_handler(handler):
+    """Route engine log messages to a front end (None restores stdout)"""
+    global _log_handler
+    _log_handler = handler
+
+
+def set_event_sink(sink):
+    """Send structured events to `sink(event, **fields)` (e.g. EventWriter.emit)"""
+    global _event_sink
+    _event_sink = sink
+
+
+def log_event(event, **fields):
+    """Record a structured balancing event; must not block"""
+    if _event_sink is not None:
+        try:
+            _event_sink(event, **fields)
+        except Exception:
+            pass
+
+
+def log_action(message):
+    """Log a balancing event through the registered handler"""
+    log_event("log", message=message)
+    if _log_handler is not None:
+        _log_handler(message)
+        return
+    timestamp = time.strftime("%H:%M:%S")
+    print(f"[{timestamp}] {message}", flush=True)
+
+
+def _rounded(loads):
+    return [round(float(load), 1) for load in loads]
+
+
+def set_thresholds(high=None, low=None):
+    """Update the high/low load thresholds"""
+    global L_HIGH, L_LOW
+    if high is not None:
+        L_HIGH = high
+    if low is not None:
+        L_LOW = low
+
+
+def load_policy(policy):
+    """Replace the eligibility policy (dict or JSON file path)"""
+    process_policy.load(policy)
+
+
+def set_topology_root(sysfs_root):
+    """Rebuild the CPU topology from another sysfs tree"""
+    global cpu_topology
+    cpu_topology = CpuTopology.load(sysfs_root, num_cpus=psutil.cpu_count() or 1)
+
+
+def set_trace_writer(writer):
+    """Record every tick's CPU sample and snapshot (None stops recording)"""
+    global trace_writer
+    trace_writer = writer
+
+
+def reset_state():
+    """Forget all history, attribution and controller state (e.g. between replays)"""
+    global latest_forecast, core_attribution, migration_cost, _settled
+    cpu_history.clear()
+    latest_forecast = None
+    _settled = None
+    core_attribution = CoreAttribution()
+    migration_cost = MigrationCostModel()
+    migration_history.clear()
+    balance_controller.reset()
+    migration_counts.update(attempted=0, succeeded=0, failed=0)
+    _sample_spacing.clear()
+    tracked_threads.clear()
+    idle_groups.clear()
+
+
+def set_cooldown(seconds):
+    """Seconds before a migrated process may be moved again"""
+    global BALANCE_COOLDOWN
+    BALANCE_COOLDOWN = migration_history.cooldown = seconds
+
+
+def thread_mode_supported():
+    """True if single threads can be pinned here (Linux /proc and sched_setaffinity)"""
+    return proc_reader.is_supported() and hasattr(os, "sched_setaffinity")
+
+
+def set_balance_mode(mode):
+    """Switch between whole-process ("process"), per-thread ("thread") and cgroup cpuset ("cgroup") balancing"""
+    global BALANCE_MODE
+    if mode == "thread" and not thread_mode_supported():
+        log_action("⚠️ Thread-level balancing needs Linux /proc; staying in process mode")
+        mode = "process"
+    if mode == "cgroup" and not cpuset_controller.is_supported():
+        log_action(f"⚠️ cgroup balancing needs cgroup v2 with the cpuset controller at {cpuset_controller.cgroup_root}; staying in process mode")
+        mode = "process"
+    BALANCE_MODE = mode
+
+
+def set_cgroup_root(cgroup_root, proc_root="/proc"):
+    """Use another cgroupfs (and /proc) tree for cgroup balancing"""
+    global cpuset_controller
+    cpuset_controller = CpusetController(cgroup_root, proc_root)
+
+
+def set_forecast(model=None, horizon=None):
+    """Choose the forecast model and horizon (seconds)"""
+    global FORECAST_MODEL, FORECAST_HORIZON
+    if model is not None:
+        if model not in forecasting.FORECAST_MODELS:
+            raise ValueError(f"Unknown forecast model: {model}")
+        FORECAST_MODEL = model
+    if horizon is not None:
+        FORECAST_HORIZON = horizon
+    if len(cpu_history):
+        forecast_loads()
+
+
+def set_sample_interval(seconds):
+    """Record the time since the previous sample
+
+    SAMPLE_INTERVAL becomes the mean spacing over the forecast window, so
+    forecasts stay in seconds when the tick interval adapts.
+    """
+    global SAMPLE_INTERVAL
+    if seconds > 0:
+        _sample_spacing.append(seconds)
+        recent = list(_sample_spacing)[-window_samples(FORECAST_WINDOW):]
+        SAMPLE_INTERVAL = sum(recent) / len(recent)
+
+
+def window_samples(seconds):
+    """Number of the newest samples spanning `seconds` at the measured tick spacing
+
+    Windows (forecast, attribution) are set in seconds so they keep their
+    length when the adaptive interval changes. Past the measured spacings,
+    SAMPLE_INTERVAL is assumed.
+    """
+    total, count = 0.0, 0
+    for spacing in reversed(_sample_spacing):
+        if total + spacing > seconds + 1e-9:
+            return max(count, 1)
+        total += spacing
+        count += 1
+    return max(count + int((seconds - total) / SAMPLE_INTERVAL + 1e-9), 1)
+
+
+def _last_spacing():
+    return _sample_spacing[-1] if _sample_spacing else SAMPLE_INTERVAL
+
+
+def get_cpu_load():
+    """Get per-core CPU usage"""
+    try:
+        return psutil.cpu_percent(percpu=True)
+    except Exception as e:
+        print(f"Error getting CPU load: {e}")
+        return [0] * psutil.cpu_count()
+
+
+def record_cpu_sample(cpu_loads):
+    """Append a sample to the CPU history and refresh the forecast"""
+    cpu_history.push(cpu_loads)
+    if _settled is not None:
+        np.minimum(_settled + 1, HISTORY_CAPACITY, out=_settled)
+    forecast_loads()
+
+
+def note_migration(from_core, to_core):
+    """Restart both cores' forecast trend from their post-move load (see forecasting)"""
+    global _settled
+    if _settled is None or len(_settled) != cpu_history.num_cores:
+        _settled = np.full(cpu_history.num_cores, HISTORY_CAPACITY)
+    for core in (from_core, to_core):
+        if 0 <= core < len(_settled):
+            _settled[core] = 0
+
+
+def forecast_loads():
+    """Forecast every core FORECAST_HORIZON seconds ahead (per-core load and time to overload)"""
+    global latest_forecast
+    window = min(window_samples(FORECAST_WINDOW), cpu_history.capacity)
+    latest_forecast = forecasting.forecast(cpu_history, L_HIGH, FORECAST_HORIZON,
+                                           SAMPLE_INTERVAL, FORECAST_MODEL, window, _settled)
+    return latest_forecast
+
+
+def predict_overload():
+    """Predict which core will overload first within the forecast horizon"""
+    if len(cpu_history) < 5 or latest_forecast is None:
+        return None
+    try:
+        time_to_overload = latest_forecast.time_to_overload
+        core = int(np.argmin(time_to_overload))
+        if time_to_overload[core] <= latest_forecast.horizon:
+            return core
+        return None
+    except Exception as e:
+        log_action(f"Error in prediction algorithm: {e}")
+        return None
+
+
+def sample_tick():
+    """Take this tick's CPU sample and shared process snapshot"""
+    with instrumentation.stage("sample"):
+        cpu_loads = get_cpu_load()
+    snapshot = process_snapshot.refresh_snapshot(cpu_loads)
+    if trace_writer is not None:
+        trace_writer.write(snapshot)
+    return ingest_snapshot(snapshot)
+
+
+def finish_tick():
+    """Mark the current tick's sampling and balancing (and its migrations) as done"""
+    global _completed_ticks
+    _completed_ticks += 1
+
+
+def ticks_completed():
+    """Number of ticks finished so far; state read between two changes is consistent"""
+    return _completed_ticks
+
+
+def ingest_snapshot(snapshot):
+    """Feed one tick's snapshot to history, attribution and cost tracking"""
+    record_cpu_sample(snapshot.cpu_loads)
+    core_attribution.update(snapshot, window_samples(core_attribution.window))
+    migration_cost.update(snapshot)
+    migration_history.evict()
+    if len(process_policy.verdicts) > 2 * len(snapshot) + 1024:
+        process_policy.prune(snapshot)
+    if BALANCE_MODE == "thread":
+        track_hot_threads(snapshot)
+    return snapshot
+
+
+def current_snapshot():
+    """Process snapshot for consumers outside the tick (rescanned if stale)"""
+    return process_snapshot.current_snapshot(get_cpu_load)
+
+
+def _core_candidates(core_num, snapshot):
+    """Yield (snapshot index, load) of processes loading `core_num`, ranked lazily
+
+    Heaviest contributor to the core first, lower niceness breaks ties. Only
+    as much of the list is ordered as the caller consumes. Without last-run
+    CPU data (or for core None) every busy process counts with its CPU %.
+    """
+    if core_num is not None and core_attribution.has_data():
+        indices, loads = core_attribution.processes_on(core_num, snapshot, min_load=1.0)
+    else:
+        indices = np.flatnonzero(snapshot.cpu_percent > 1.0)  # Filter out idle processes
+        loads = snapshot.cpu_percent[indices]
+    for k in candidate_selection.ranked(loads, snapshot.nice_keys()[indices]):
+        yield int(indices[k]), float(loads[k])
+
+
+def get_core_processes(core_num=None, snapshot=None, limit=None):
+    """Get CPU-intensive processes loading `core_num` (all cores if None)
+
+    Processes are attributed to a core from the CPU they last ran on over the
+    last few ticks and returned heaviest contributor first, then by priority.
+    Without last-run CPU data (e.g. on Windows) every busy process is returned.
+    With `limit`, only that many are ranked and returned.
+    """
+    try:
+        if snapshot is None:
+            snapshot = current_snapshot()
+        return [snapshot.entry(i) for i, _ in itertools.islice(_core_candidates(core_num, snapshot), limit)]
+    except Exception as e:
+        log_action(f"Error getting processes: {e}")
+        return []
+
+
+def can_balance_process(proc):
+    """Check if a process is suitable for migration"""
+    try:
+        # Skip PID 0 (System Idle) and negative PIDs
+        if proc.pid <= 0:
+            return False
+
+        # Allow/deny policy (system processes, low PIDs, ...), cached per process
+        if not process_policy.allows(proc):
+            return False
+
+        # Skip recently balanced processes
+        if migration_history.in_cooldown(proc.pid, proc.create_time):
+            return False
+
+        # Only processes using >1% CPU
+        if proc.cpu_percent < 1.0:
+            return False
+
+        # Additional check for process status
+        if proc.status == psutil.STATUS_ZOMBIE:
+            return False
+
+        return True
+    except Exception as e:
+        log_action(f"Unexpected error checking process {proc.pid}: {str(e)}")
+        return False
+
+
+def set_affinity_backend(backend):
+    """Route process affinity changes to `backend(pid, cpu_list)` (None = psutil)"""
+    global _affinity_backend
+    _affinity_backend = backend
+
+
+def _counted(change, *args):
+    """Run one affinity or cpuset change, counting the attempt and its outcome in migration_counts"""
+    migration_counts["attempted"] += 1
+    result = None
+    try:
+        result = change(*args)
+    finally:
+        migration_counts["succeeded" if result else "failed"] += 1
+    return result
+
+
+def set_process_affinity(pid, cpu_list):
+    """Set CPU affinity for a process"""
+    return _counted(_affinity_backend or _set_affinity, pid, cpu_list)
+
+
+def _set_affinity(pid, cpu_list):
+    """Set CPU affinity for a process with enhanced error handling"""
+    try:
+        process = psutil.Process(pid)
+
+        # Check process status first
+        if process.status() == psutil.STATUS_ZOMBIE:
+            raise ValueError("Process is a zombie")
+
+        current_affinity = process.cpu_affinity()
+
+        # Don't change if it's already set correctly
+        if set(cpu_list) == set(current_affinity):
+            return False
+
+        # Additional check for system processes with special affinity
+        if len(current_affinity) == 0:  # Some system processes return empty list
+            raise ValueError("Process has special affinity settings")
+
+        # Try to set new affinity
+        process.cpu_affinity(cpu_list)
+
+        # Verify the change took effect
+        new_affinity = process.cpu_affinity()
+        if set(new_affinity) != set(cpu_list):
+            raise RuntimeError("Affinity change verification failed")
+
+        return True
+
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess) as e:
+        log_action(f"Permission error setting affinity for PID {pid}: {str(e)}")
+        return False
+    except Exception as e:
+        log_action(f"Error setting affinity for PID {pid}: {str(e)}")
+        return False
+
+
+def perform_load_balancing(overloaded_core, underloaded_core, max_retries=2, snapshot=None):
+    """Improved process migration with retries, considering priority"""
+    retries = 0
+    while retries < max_retries:
+        try:
+            # Retries reuse the same snapshot instead of rescanning
+            if snapshot is None:
+                snapshot = current_snapshot()
+            # Thread mode: the hottest threads that run on the overloaded core
+            tracked = set()
+            if BALANCE_MODE == "thread":
+                tracked, threads = _thread_candidates({overloaded_core}, snapshot)
+                for candidate, _ in sorted(threads, key=lambda c: -c[0].load):
+                    with instrumentation.stage("apply"):
+                        moved = migrate_thread(candidate.proc, overloaded_core, underloaded_core)
+                    if moved:
+                        return True
+            # Only processes that actually run on the overloaded core, built
+            # one at a time so the search stops paying at the first move
+            for i, _ in _core_candidates(overloaded_core, snapshot):
+                if int(snapshot.pid[i]) in tracked:
+                    continue  # Its threads were considered above
+                proc = snapshot.entry(i)
+                if can_balance_process(proc):
+                    try:
+                        priority = proc.nice if proc.nice is not None else 0
+
+                        # Don't move very high-priority processes unless the core is clearly overloaded
+                        if priority <= -10 and snapshot.cpu_loads[overloaded_core] <= L_HIGH + 5:
+                            log_action(f"⚠️ Not moving high-priority process {proc.name} (PID: {proc.pid})")
+                            continue
+
+                        with instrumentation.stage("apply"):
+                            moved = migrate_process(proc, overloaded_core, underloaded_core)
+                        if moved:
+                            log_action(f"✅ Successfully moved {proc.name} (PID: {proc.pid}, Nice: {priority}) to CPU {underloaded_core}")
+                            return True
+                    except Exception as e:
+                        log_action(f"⚠️ Failed to move {proc.name}: {str(e)}")
+                        continue
+
+            log_action("🔍 No suitable processes found for migration")
+            return False
+
+        except Exception as e:
+            retries += 1
+            if retries >= max_retries:
+                log_action(f"💥 Critical balancing error after {max_retries} retries: {str(e)}")
+                return False
+            time.sleep(0.5)  # Brief delay before retry
+
+
+def track_hot_threads(snapshot):
+    """Sample threads of the hottest multi-threaded processes (kept in tracked_threads)"""
+    tracked_threads.clear()
+    busy = np.flatnonzero(snapshot.cpu_percent > 1.0)
+    for k in candidate_selection.ranked(snapshot.cpu_percent[busy]):
+        i = busy[k]
+        if len(tracked_threads) >= THREAD_TRACK_LIMIT:
+            break
+        if snapshot.table is not None and snapshot.table.num_threads[i] < 2:
+            continue
+        pid = int(snapshot.pid[i])
+        table = thread_reader.read(pid)
+        if table is not None:
+            tracked_threads[pid] = table
+    thread_reader.prune()
+
+
+def _thread_candidates(cores, snapshot):
+    """Planner candidates for the hot threads of tracked processes running on `cores`
+
+    Returns (pids of all tracked processes, [(Candidate, snapshot index)]).
+    Each thread is attributed to the CPU it last ran on and sized by its own
+    CPU delta, so a service is found from its hot threads wherever its main
+    thread ran, and a single thread is moved instead of the process's total
+    load. Moves are priced from the owning process's row.
+    """
+    candidates = []
+    for pid, table in tracked_threads.items():
+        i = snapshot.index_of(pid)
+        if i is None:
+            continue
+        proc = snapshot.entry(i)
+        if proc.status == psutil.STATUS_ZOMBIE or not process_policy.allows(proc):
+            continue
+        for k in np.flatnonzero(np.isin(table.processor, list(cores)) & (table.cpu_percent >= 1.0)):
+            tid = int(table.pid[k])
+            # Threads are keyed by TID and their process's start time
+            if migration_history.in_cooldown(tid, proc.create_time):
+                continue
+            thread = ThreadTask(pid, tid, table.names[k], float(table.cpu_percent[k]),
+                                int(table.processor[k]), proc.create_time)
+            candidates.append((migration_planner.Candidate(thread, thread.cpu_percent, thread.cpu_num), i))
+    return set(tracked_threads), candidates
+
+
+def get_thread_loads(pid, refresh=True, reader=None):
+    """Per-thread load of a process, hottest first (list of ThreadEntry)
+
+    Pass a separate `reader` when calling from a thread other than the
+    balancer's, so each keeps its own CPU deltas.
+    """
+    if reader is None:
+        reader = thread_reader
+    table = reader.read(pid) if refresh else reader.last(pid)
+    if table is None:
+        return []
+    order = np.argsort(-table.cpu_percent, kind='stable')
+    return [ThreadEntry(int(table.pid[i]), table.names[i], float(table.cpu_percent[i]),
+                        int(table.processor[i])) for i in order]
+
+
+def set_thread_affinity(tid, cpu_list):
+    """Pin a single thread (TID) with sched_setaffinity"""
+    return _counted(_set_thread_affinity, tid, cpu_list)
+
+
+def _set_thread_affinity(tid, cpu_list):
+    """sched_setaffinity for one TID, verified after the change"""
+    try:
+        if set(os.sched_getaffinity(tid)) == set(cpu_list):
+            return False
+        os.sched_setaffinity(tid, cpu_list)
+        if set(os.sched_getaffinity(tid)) != set(cpu_list):
+            raise RuntimeError("Affinity change verification failed")
+        return True
+    except (ProcessLookupError, PermissionError) as e:
+        log_action(f"Permission error setting affinity for TID {tid}: {str(e)}")
+        return False
+    except Exception as e:
+        log_action(f"Error setting affinity for TID {tid}: {str(e)}")
+        return False
+
+
+def migrate_hot_thread(proc, overloaded_core, underloaded_core):
+    """Move the hottest thread of `proc` running on the overloaded core"""
+    threads = get_thread_loads(proc.pid, refresh=False) or get_thread_loads(proc.pid)
+    for thread in threads:
+        if thread.cpu_num != overloaded_core or thread.cpu_percent < 1.0:
+            continue
+        # Threads are keyed by TID and their process's start time
+        if migration_history.in_cooldown(thread.tid, proc.create_time):
+            continue
+        task = ThreadTask(proc.pid, thread.tid, thread.name, thread.cpu_percent, thread.cpu_num, proc.create_time)
+        if migrate_thread(task, overloaded_core, underloaded_core):
+            return True
+    return False
+
+
+def migrate_thread(thread, overloaded_core, underloaded_core):
+    """Pin one thread (a ThreadTask) to the underloaded core"""
+    if not set_thread_affinity(thread.tid, [underloaded_core]):
+        return False
+    migration_history.record(thread.tid, thread.create_time, overloaded_core, underloaded_core, True)
+    note_migration(overloaded_core, underloaded_core)
+    log_event("migrate_thread", pid=thread.pid, tid=thread.tid, name=thread.name,
+              from_core=overloaded_core, to_core=underloaded_core,
+              load=round(thread.cpu_percent, 1), loads=_rounded(cpu_history.latest()))
+    log_action(f"✅ Moved thread {thread.name} (TID: {thread.tid}, {thread.cpu_percent:.1f}%) of PID {thread.pid} to CPU {underloaded_core}")
+    return True
+
+
+def migrate_group(group, proc, overloaded_core, underloaded_core):
+    """Move a whole cgroup off the overloaded core by rewriting its cpuset"""
+    # Groups share the history store; their key has no start time
+    if migration_history.in_cooldown(group, 0.0):
+        return False
+    try:
+        cpus = _counted(cpuset_controller.move_off, group, overloaded_core, underloaded_core,
+                        range(psutil.cpu_count() or 1))
+    except (OSError, RuntimeError) as e:
+        log_action(f"Error setting cpuset for cgroup {group}: {str(e)}")
+        cpus = None
+    if cpus is None:
+        migration_history.record(group, 0.0, overloaded_core, underloaded_core, False)
+        log_event("migrate_failed", group=group, pid=proc.pid, from_core=overloaded_core,
+                  to_core=underloaded_core)
+        return False
+    migration_history.record(group, 0.0, overloaded_core, underloaded_core, True)
+    note_migration(overloaded_core, underloaded_core)
+    log_event("migrate_group", group=group, pid=proc.pid, cpus=cpus, from_core=overloaded_core,
+              to_core=underloaded_core, loads=_rounded(cpu_history.latest()))
+    log_action(f"✅ Moved cgroup {group} off CPU {overloaded_core} (cpuset {format_cpu_list(cpus)})")
+    return True
+
+
+def restore_cpusets():
+    """Give every cgroup moved in cgroup mode its original cpuset back (on shutdown)"""
+    idle_groups.clear()
+    for group in cpuset_controller.restore_all():
+        log_event("restore_group", group=group)
+        log_action(f"↩️ Restored the cpuset of cgroup {group}")
+
+
+def release_idle_groups(snapshot):
+    """Restore moved cgroups that have been idle for GROUP_IDLE_RESTORE seconds
+
+    Groups that no longer exist are forgotten.
+    """
+    now = migration_history.clock()
+    for group in list(cpuset_controller.original):
+        members = cpuset_controller.members(group)
+        if members is None:
+            cpuset_controller.original.pop(group, None)
+            idle_groups.pop(group, None)
+            continue
+        rows = [i for i in map(snapshot.index_of, members) if i is not None]
+        if float(snapshot.cpu_percent[rows].sum()) >= MIN_CPU_USAGE:
+            idle_groups.pop(group, None)
+            continue
+        if now - idle_groups.setdefault(group, now) < GROUP_IDLE_RESTORE:
+            continue
+        idle_groups.pop(group, None)
+        try:
+            cpuset_controller.restore(group)
+        except OSError:
+            cpuset_controller.original.pop(group, None)  # Removed meanwhile
+            continue
+        log_event("restore_group", group=group)
+        log_action(f"↩️ Restored the cpuset of idle cgroup {group}")
+
+
+def migrate_process(proc, overloaded_core, underloaded_core):
+    """Move a process (or its hottest thread, or its whole cgroup) to another core"""
+    if isinstance(proc, ThreadTask):
+        return migrate_thread(proc, overloaded_core, underloaded_core)
+    if BALANCE_MODE == "thread":
+        return migrate_hot_thread(proc, overloaded_core, underloaded_core)
+    if BALANCE_MODE == "cgroup":
+        group = cpuset_controller.group_of(proc.pid)
+        if group is not None:
+            return migrate_group(group, proc, overloaded_core, underloaded_core)
+        # Processes in the root group are pinned individually
+    if set_process_affinity(proc.pid, [underloaded_core]):
+        record_migration(proc, overloaded_core, underloaded_core, True)
+        note_migration(overloaded_core, underloaded_core)
+        log_event("migrate", pid=proc.pid, name=proc.name, from_core=overloaded_core,
+                  to_core=underloaded_core, load=round(proc.cpu_percent, 1),
+                  loads=_rounded(cpu_history.latest()))
+        return True
+    record_migration(proc, overloaded_core, underloaded_core, False)
+    log_event("migrate_failed", pid=proc.pid, name=proc.name, from_core=overloaded_core,
+              to_core=underloaded_core)
+    return False
+
+
+def record_migration(proc, from_core, to_core, ok):
+    """Remember a migration attempt of `proc` (a ProcessEntry) for cooldowns"""
+    return migration_history.record(proc.pid, proc.create_time, from_core, to_core, ok)
+
+
+def expected_loads(cpu_loads):
+    """Per-core load to plan with: the worse of now and the forecast"""
+    loads = np.asarray(cpu_loads, dtype=float)
+    if (latest_forecast is None or len(cpu_history) < 5 or
+            len(latest_forecast.predicted) != len(loads)):
+        return loads
+    return np.maximum(loads, latest_forecast.predicted)
+
+
+def plan_balance(loads, snapshot=None, budget=None):
+    """Plan migrations for every core above L_HIGH (see migration_planner)
+
+    Each hot core contributes its CANDIDATE_LIMIT heaviest eligible
+    processes, taken in ranked order, so entries and eligibility checks are
+    only built for those. Processes lighter than the planner's minimum gain
+    can never be moved and end the search. Cgroup mode needs every member to
+    sum a group's load and is not limited. In thread mode, processes whose
+    threads are tracked are planned thread by thread (``_thread_candidates``).
+    """
+    if snapshot is None:
+        snapshot = current_snapshot()
+    loads = np.asarray(loads, dtype=float)
+    limited = BALANCE_MODE != "cgroup"
+    hot_cores = [int(core) for core in np.flatnonzero(loads > L_HIGH)]
+    candidates = {}
+    rejected = set()
+    threads = []
+    with instrumentation.stage("eligibility"):
+        if BALANCE_MODE == "thread":
+            rejected, threads = _thread_candidates(set(hot_cores), snapshot)
+        for core in hot_cores:
+            found = 0
+            for i, load in _core_candidates(core, snapshot):
+                if limited and (found >= CANDIDATE_LIMIT or load < migration_planner.MIN_GAIN):
+                    break
+                pid = int(snapshot.pid[i])
+                if pid in rejected:
+                    continue
+                # A process seen on several hot cores is planned from the one it loads most
+                if pid in candidates:
+                    found += 1
+                    if load > candidates[pid][0].load:
+                        candidates[pid] = (candidates[pid][0]._replace(load=load, from_core=core), i)
+                    continue
+                proc = snapshot.entry(i)
+                if not can_balance_process(proc):
+                    rejected.add(pid)
+                    continue
+                candidates[pid] = (migration_planner.Candidate(proc, load, core), i)
+                found += 1
+        eligible = [(c, i, _history_key(c.proc)) for c, i in list(candidates.values()) + threads]
+        if BALANCE_MODE == "cgroup":
+            eligible = _merge_by_group(eligible)
+
+    # Price each move so the planner only keeps those worth their cost
+    with instrumentation.stage("plan"):
+        now = migration_history.clock()
+        movable = [c._replace(cost=migration_cost.cost(snapshot, i, migration_history, now, key))
+                   for c, i, key in eligible]
+        return migration_planner.plan_migrations(loads, movable, L_HIGH,
+                                                 budget=MIGRATION_BUDGET if budget is None else budget,
+                                                 choose_target=cpu_topology.choose_target)
+
+
+def _history_key(proc):
+    """(id, create_time) a move of `proc` (ProcessEntry or ThreadTask) is recorded under"""
+    if isinstance(proc, ThreadTask):
+        return proc.tid, proc.create_time
+    return proc.pid, proc.create_time
+
+
+def _merge_by_group(candidates):
+    """One candidate per (cgroup, core) carrying the whole group's load
+
+    Takes and returns (Candidate, snapshot index, history key); a merged
+    group is keyed like migrate_group records it. Groups still in their
+    cooldown are left out.
+    """
+    merged = {}
+    for candidate, i, history_key in candidates:
+        group = cpuset_controller.group_of(candidate.proc.pid)
+        if group is not None and migration_history.in_cooldown(group, 0.0):
+            continue
+        key = (group or candidate.proc.pid, candidate.from_core)
+        if key not in merged:
+            if group is not None:
+                candidate = candidate._replace(cpus=frozenset(cpuset_controller.cpus(group) or
+                                                              range(psutil.cpu_count() or 1)))
+                history_key = (group, 0.0)
+            merged[key] = (candidate, i, history_key)
+            continue
+        heaviest, j, history_key = merged[key]
+        total, cpus = heaviest.load + candidate.load, heaviest.cpus
+        if candidate.load > heaviest.load:
+            heaviest, j = candidate, i
+        merged[key] = (heaviest._replace(load=total, cpus=cpus), j, history_key)
+    return list(merged.values())
+
+
+def apply_plan(plan):
+    """Apply a migration plan as one batch; returns the moves that succeeded"""
+    log_action(f"🧮 Planned {len(plan.moves)} migration(s): imbalance {plan.imbalance_before:.1f} → {plan.imbalance_after:.1f} points")
+    log_event("plan", moves=len(plan.moves), loads=_rounded(plan.loads_before),
+              predicted_loads=_rounded(plan.loads_after))
+    applied = []
+    for move in plan.moves:
+        proc = move.proc
+        if migrate_process(proc, move.from_core, move.to_core):
+            applied.append(move)
+            log_action(f"✅ Balanced {proc.name} (PID: {proc.pid}, {move.load:.1f}%) CPU {move.from_core} → CPU {move.to_core}")
+    return applied
+
+
+def balance_load(cpu_loads, snapshot=None):
+    """Move work off the core that is (or is forecast to be) overloaded"""
+    try:
+        if cpuset_controller.original:
+            release_idle_groups(snapshot if snapshot is not None else current_snapshot())
+        expected = expected_loads(cpu_loads)
+        soonest = predict_overload()
+        max_idx = soonest if soonest is not None else int(np.argmax(expected))
+        # A core that is idle now but forecast to get busy is a poor target;
+        # so is an SMT sibling of the busy core or a core on another NUMA node
+        min_idx = cpu_topology.choose_target(expected, max_idx)
+        if min_idx is None:
+            min_idx = int(np.argmin(expected))
+
+        # Balance only once the imbalance has held for a few ticks, and keep
+        # going until it has clearly cleared (hysteresis against ping-pong)
+        was_engaged = balance_controller.engaged
+        if not balance_controller.update(expected, L_HIGH, L_LOW, _last_spacing()):
+            if was_engaged:
+                log_action("✅ Load back within thresholds, balancing paused")
+            return None, None
+        if expected[max_idx] <= L_HIGH:
+            return None, None
+
+        if not was_engaged:
+            log_event("overload", from_core=max_idx, to_core=min_idx, loads=_rounded(cpu_loads),
+                      expected_loads=_rounded(expected), forecast=bool(cpu_loads[max_idx] <= L_HIGH))
+            if cpu_loads[max_idx] <= L_HIGH:
+                eta = latest_forecast.time_to_overload[max_idx]
+                log_action(f"📈 CPU {max_idx} forecast to reach {expected[max_idx]:.1f}% (overload in {eta:.1f}s) → CPU {min_idx} ({cpu_loads[min_idx]:.1f}%)")
+            else:
+                log_action(f"⚖️ Sustained imbalance detected: CPU {max_idx} ({cpu_loads[max_idx]:.1f}%) → CPU {min_idx} ({cpu_loads[min_idx]:.1f}%)")
+
+        # Plan this tick's moves across all overloaded cores, then apply them together
+        plan = plan_balance(expected, snapshot)
+        if plan.moves:
+            with instrumentation.stage("apply"):
+                applied = apply_plan(plan)
+            if applied:
+                return max_idx, min_idx
+            log_action("⚠️ Failed to set affinity")
+        elif not was_engaged:
+            log_action("🔍 No movable process worth its migration cost")
+
+        return None, None
+
+    except Exception as e:
+        log_action(f"💥 Balance error: {str(e)}")
+        return None, None
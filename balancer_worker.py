@@ -0,0 +1,164 @@
+"""Sampler/balancer worker thread.
+
+Runs the monitoring tick (sampling, snapshot, prediction, balancing and
+affinity syscalls) off the Tk main thread on its own deadline-based
+scheduler. Results are published through a bounded queue that the GUI
+drains; when the GUI falls behind the oldest result is dropped, so the
+worker never blocks. Log messages and GUI-requested actions (manual
+balancing) go through queues too, so all engine work stays on this thread.
+Each result carries its own copy of the load history, taken right after
+that tick's sample, so the GUI never reads the ring buffer the worker is
+writing to.
+
+Tick jitter (actual start minus scheduled start) is measured every tick.
+With a ``scheduler`` (``adaptive_sampling.AdaptiveInterval``) the interval
+is re-chosen after every tick from the loads and forecast; the measured
+spacing between ticks is passed on to the engine's rate calculations.
+"""
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+
+import balancer_engine as engine
+import instrumentation
+import process_snapshot
+
+TickResult = namedtuple("TickResult", "tick cpu_loads history snapshot forecast moved jitter duration")
+
+
+class BalancerWorker(threading.Thread):
+    """Background thread that samples and balances every `interval` seconds"""
+
+    def __init__(self, interval=1.0, auto_balance=True, balance_fn=None, queue_size=8, scheduler=None):
+        super().__init__(name="balancer-worker", daemon=True)
+        self.interval = interval
+        self.scheduler = scheduler
+        self.auto_balance = auto_balance
+        self.balance_fn = balance_fn or engine.balance_load
+        self.results = queue.Queue(maxsize=queue_size)
+        self.logs = queue.Queue(maxsize=1000)
+        self.commands = queue.Queue()
+        self.jitter = deque(maxlen=300)  # Seconds late, most recent ticks
+        self.overruns = 0                # Ticks skipped because a tick ran long
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def log(self, message):
+        """Thread-safe log handler (drops messages if the GUI stops draining)"""
+        try:
+            self.logs.put_nowait((time.strftime("%H:%M:%S"), message))
+        except queue.Full:
+            pass
+
+    def submit(self, fn, *args, **kwargs):
+        """Run `fn` on the worker thread before its next tick"""
+        self.commands.put((fn, args, kwargs))
+
+    def run(self):
+        engine.get_cpu_load()  # Prime psutil's per-core counters
+        process_snapshot.set_tick_interval(self.interval)
+        deadline = time.monotonic() + self.interval
+        previous = None
+        tick = 0
+        while not self._stop_event.is_set():
+            self._run_commands()
+            delay = deadline - time.monotonic()
+            if delay > 0 and self._stop_event.wait(delay):
+                break
+
+            started = time.monotonic()
+            self.jitter.append(started - deadline)
+            if previous is not None:
+                engine.set_sample_interval(started - previous)
+            previous = started
+            tick += 1
+            try:
+                result = self._tick(tick, started - deadline)
+            except Exception as e:
+                engine.finish_tick()
+                engine.log_action(f"💥 Monitoring tick failed: {str(e)}")
+            else:
+                self._publish(result)
+                if self.scheduler is not None:
+                    self.interval = self.scheduler.update(result.cpu_loads, result.forecast,
+                                                          engine.L_HIGH, engine.SAMPLE_INTERVAL)
+                    process_snapshot.set_tick_interval(self.interval)
+
+            # Fixed-rate schedule; if a tick overran, skip the missed slots
+            # instead of running a burst of catch-up ticks
+            deadline += self.interval
+            now = time.monotonic()
+            if now > deadline:
+                missed = int((now - deadline) // self.interval) + 1
+                self.overruns += missed
+                deadline += missed * self.interval
+        # Moved cgroups keep their narrowed cpusets only while we are running
+        engine.restore_cpusets()
+
+    def _tick(self, tick, jitter):
+        start = time.perf_counter()
+        snapshot = engine.sample_tick()
+        history = engine.cpu_history.window(engine.HISTORY_LENGTH).copy()
+        moved = (None, None)
+        if self.auto_balance:
+            moved = self.balance_fn(snapshot.cpu_loads, snapshot)
+        duration = time.perf_counter() - start
+        instrumentation.record_stage("tick", duration)
+        instrumentation.set_gauge("tick_jitter_ms", jitter * 1000)
+        instrumentation.sample_self()
+        engine.finish_tick()
+        return TickResult(tick, snapshot.cpu_loads, history, snapshot, engine.latest_forecast, moved, jitter, duration)
+
+    def _publish(self, result):
+        while True:
+            try:
+                self.results.put_nowait(result)
+                return
+            except queue.Full:
+                try:
+                    self.results.get_nowait()  # Drop the oldest result
+                except queue.Empty:
+                    pass
+
+    def _run_commands(self):
+        while True:
+            try:
+                fn, args, kwargs = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                engine.log_action(f"⚠️ Error: {str(e)}")
+
+    def drain(self):
+        """Return all pending results (oldest first) and (timestamp, message) logs"""
+        results, messages = [], []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                break
+        while True:
+            try:
+                messages.append(self.logs.get_nowait())
+            except queue.Empty:
+                break
+        return results, messages
+
+    def jitter_stats(self):
+        """Tick start jitter in milliseconds (mean, p95, max) and overrun count"""
+        if not self.jitter:
+            return {"mean_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0, "overruns": self.overruns}
+        values = np.fromiter(self.jitter, dtype=float) * 1000
+        return {
+            "mean_ms": float(values.mean()),
+            "p95_ms": float(np.percentile(values, 95)),
+            "max_ms": float(values.max()),
+            "overruns": self.overruns,
+        }
@@ -0,0 +1,112 @@
+"""Dashboard graph frame time against core count.
+
+Compares the old full redraw (``ax.clear()`` + rebuild + ``canvas.draw()``)
+with the persistent-artist ``CpuGraph`` blit path, rendering off-screen with
+the Agg backend so no display is needed:
+
+    python bench_render.py --cores 4 16 64 256 --frames 30
+"""
+import argparse
+import time
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from dashboard_plot import CpuGraph, LoadColorMap
+
+STYLE = {
+    "dark_bg": "#0D1117",
+    "panel_bg": "#161B22",
+    "border": "#30363D",
+    "text": "#E6EDF3",
+    "high": "#FF7B72",
+    "low": "#79C0FF",
+}
+HIGH, LOW = 70, 30
+HISTORY = 20
+load_colors = LoadColorMap(STYLE["low"], STYLE["text"], STYLE["high"])
+
+
+def make_figure():
+    fig = Figure(figsize=(10, 4), dpi=100)
+    ax = fig.add_subplot(111)
+    return fig, ax, FigureCanvasAgg(fig)
+
+
+def bar_colors(loads):
+    return [STYLE["high"] if load > HIGH else STYLE["low"] for load in loads]
+
+
+def full_redraw(fig, ax, canvas, loads, history, state):
+    """The dashboard's original per-frame redraw"""
+    ax.clear()
+    ax.set_facecolor(STYLE["panel_bg"])
+    fig.patch.set_facecolor(STYLE["dark_bg"])
+    colors = bar_colors(loads)
+    bars = ax.bar(range(len(loads)), loads, color=colors, edgecolor=STYLE["border"],
+                  linewidth=1, width=0.65, alpha=0.9)
+    ax.axhline(y=HIGH, color=STYLE["high"], alpha=0.3, linestyle='--', linewidth=1)
+    ax.axhline(y=LOW, color=STYLE["low"], alpha=0.3, linestyle='--', linewidth=1)
+    ax.text(-0.5, HIGH + 2, f"High ({HIGH}%)", color=STYLE["high"], alpha=0.7, fontsize=8)
+    ax.text(-0.5, LOW - 4, f"Low ({LOW}%)", color=STYLE["low"], alpha=0.7, fontsize=8)
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width() / 2, height + 2, f"{int(height)}%",
+                ha='center', color=STYLE["text"], fontsize=9)
+    ax.set_ylim(0, 100)
+    ax.set_ylabel("CPU Usage (%)", fontsize=10, color=STYLE["text"])
+    ax.set_xticks(range(len(loads)))
+    ax.set_xticklabels([f"CPU {i}" for i in range(len(loads))], fontsize=9, color=STYLE["text"])
+    if "history_ax" not in state:
+        state["history_ax"] = ax.inset_axes([0.65, 0.05, 0.3, 0.2])
+    history_ax = state["history_ax"]
+    history_ax.clear()
+    for i in range(len(loads)):
+        history_ax.plot(history[i], alpha=0.7, linewidth=1, color=colors[i])
+    history_ax.set_title("History", fontsize=8, color=STYLE["text"])
+    history_ax.set_ylim(0, 100)
+    history_ax.grid(alpha=0.1)
+    canvas.draw()
+
+
+def persistent_update(graph, loads, history, state):
+    graph.update(loads, load_colors(loads, LOW, HIGH), history, moved=(0, 1), high=HIGH, low=LOW)
+
+
+def time_frames(render, frames, cores, rng):
+    history = rng.uniform(0, 100, (cores, HISTORY))
+    # Warm-up frame (builds artists / caches fonts)
+    render(rng.uniform(0, 100, cores), history)
+    samples = []
+    for _ in range(frames):
+        loads = rng.uniform(0, 100, cores)
+        start = time.perf_counter()
+        render(loads, history)
+        samples.append(time.perf_counter() - start)
+    return np.array(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cores", type=int, nargs="+", default=[4, 8, 16, 32, 64, 128, 256])
+    parser.add_argument("--frames", type=int, default=30)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'cores':>6} {'full redraw ms':>15} {'blit ms':>10} {'speedup':>8}")
+    for cores in args.cores:
+        fig, ax, canvas = make_figure()
+        state = {}
+        full = time_frames(lambda l, h: full_redraw(fig, ax, canvas, l, h, state), args.frames, cores, rng)
+
+        fig, ax, canvas = make_figure()
+        graph = CpuGraph(fig, ax, canvas, STYLE, history_capacity=HISTORY)
+        blit = time_frames(lambda l, h: persistent_update(graph, l, h, state), args.frames, cores, rng)
+
+        print(f"{cores:>6} {np.median(full):>15.1f} {np.median(blit):>10.1f} "
+              f"{np.median(full) / np.median(blit):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
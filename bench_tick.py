@@ -0,0 +1,229 @@
+"""Per-stage latency of the monitoring tick's hot paths.
+
+Times what one dashboard tick runs: ``get_core_processes`` on the busiest
+core, ``can_balance_process`` over its processes, ``balance_load``, the bar
+colours (``create_gradient_colors``), the process table diff plus the
+affinity of its visible rows (``update_process_list``) and the graph frame
+(``CpuGraph.update``, Agg).
+Process tables are synthetic (mostly idle processes, a few hot ones piled
+on core 0) and psutil is replaced by a fake backend, so nothing real is
+read or pinned and runs are comparable across machines.
+
+    python bench_tick.py --processes 100 1000 10000 100000 --cores 4 64 512
+    python bench_tick.py --save-baseline bench_baseline.json
+    python bench_tick.py --baseline bench_baseline.json
+
+With ``--baseline``, stages whose median got slower than ``--tolerance``
+times the baseline are reported and the exit status is 1.
+"""
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import balancer_engine as engine
+import process_table
+from bench_render import HIGH, HISTORY, LOW, STYLE, load_colors
+from cpu_topology import CpuTopology
+from dashboard_plot import CpuGraph
+from process_snapshot import ProcessSnapshot
+from process_table import ProcessTableModel
+
+STAGES = ["get_core_processes", "can_balance_process", "balance_load",
+          "create_gradient_colors", "update_process_list", "render"]
+PERCENTILES = (50, 95, 99)
+WARMUP_TICKS = 6  # Fills history, forecast and attribution before timing
+VISIBLE_ROWS = 10  # Process table rows in view (details fetched for these)
+
+
+class FakeProcess:
+    def __init__(self, backend, pid):
+        self.backend = backend
+        self.pid = pid
+
+    def cpu_affinity(self, cpus=None):
+        if cpus is None:
+            return self.backend.pins.get(self.pid, self.backend.all_cpus)
+        self.backend.pins[self.pid] = list(cpus)
+
+
+class FakePsutil:
+    """The slice of psutil the timed stages use, backed by a dict of pins"""
+
+    def __init__(self, num_cpus):
+        self.all_cpus = list(range(num_cpus))
+        self.pins = {}
+
+    def Process(self, pid):
+        return FakeProcess(self, pid)
+
+    def set_affinity(self, pid, cpu_list):
+        """Engine affinity backend: always succeeds"""
+        self.pins[pid] = list(cpu_list)
+        return True
+
+
+def synthetic_snapshot(processes, cores, rng, tick=1):
+    """Snapshot of `processes` tasks: 95% idle, 4% light, 1% hot (half on core 0)"""
+    pid = np.arange(1000, 1000 + processes, dtype=np.int64)
+    kind = rng.random(processes)
+    cpu = np.where(kind < 0.95, 0.0,
+                   np.where(kind < 0.99, rng.uniform(0.1, 2.0, processes), rng.uniform(2.0, 40.0, processes)))
+    cpu_num = rng.integers(0, cores, processes).astype(np.int32)
+    cpu_num[(kind >= 0.99) & (rng.random(processes) < 0.5)] = 0
+    loads = np.clip(rng.normal(20.0, 5.0, cores), 0.0, 100.0)
+    loads[0] = 95.0
+    return ProcessSnapshot(loads.tolist(), pid, cpu, np.zeros(processes, dtype=np.int32), cpu_num,
+                           np.full(processes, 1.7e9) + pid, [f"worker-{p}" for p in pid],
+                           ["running" if c > 0 else "sleeping" for c in cpu],
+                           time.monotonic(), 0.0, tick)
+
+
+def percentiles(samples):
+    ms = np.asarray(samples) * 1000
+    result = {f"p{p}": float(np.percentile(ms, p)) for p in PERCENTILES}
+    result["max"] = float(ms.max())
+    return result
+
+
+def timed(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def bench_engine(processes, cores, iterations, rng):
+    """Engine and process list stages for one table size and core count"""
+    fake = FakePsutil(cores)
+    real_psutil, real_topology = process_table.psutil, engine.cpu_topology
+    process_table.psutil = fake
+    engine.cpu_topology = CpuTopology.flat(cores)
+    engine.set_affinity_backend(fake.set_affinity)
+    engine.set_log_handler(lambda message: None)
+    engine.reset_state()
+    cooldown, sustain = engine.BALANCE_COOLDOWN, engine.balance_controller.sustain_seconds
+    # Every tick plans: nothing leaves the candidate set through cooldown
+    engine.set_cooldown(0)
+    engine.balance_controller.sustain_seconds = 0.0
+    try:
+        for tick in range(WARMUP_TICKS):
+            snapshot = engine.ingest_snapshot(synthetic_snapshot(processes, cores, rng, tick))
+        loads = snapshot.cpu_loads
+        busiest = int(np.argmax(loads))
+        on_core = engine.get_core_processes(busiest, snapshot)
+        # The process table alternates between two ticks so every refresh has diffs
+        table = ProcessTableModel()
+        ticks = itertools.cycle([snapshot, synthetic_snapshot(processes, cores, rng, WARMUP_TICKS)])
+
+        def update_process_table():
+            table.update(next(ticks))
+            for pid in table.order()[:VISIBLE_ROWS]:
+                table.detail(pid)
+        return {
+            "get_core_processes": timed(lambda: engine.get_core_processes(busiest, snapshot), iterations),
+            "can_balance_process": timed(lambda: [engine.can_balance_process(p) for p in on_core], iterations),
+            "balance_load": timed(lambda: engine.balance_load(loads, snapshot), iterations),
+            "create_gradient_colors": timed(lambda: load_colors(loads, LOW, HIGH), iterations),
+            "update_process_list": timed(update_process_table, iterations),
+        }
+    finally:
+        process_table.psutil, engine.cpu_topology = real_psutil, real_topology
+        engine.set_affinity_backend(None)
+        engine.set_log_handler(None)
+        engine.set_cooldown(cooldown)
+        engine.balance_controller.sustain_seconds = sustain
+        engine.reset_state()
+
+
+def bench_render(cores, iterations, rng):
+    """One graph frame (independent of the process table size)"""
+    fig = Figure(figsize=(10, 4), dpi=100)
+    ax = fig.add_subplot(111)
+    graph = CpuGraph(fig, ax, FigureCanvasAgg(fig), STYLE, history_capacity=HISTORY)
+    history = rng.uniform(0, 100, (cores, HISTORY))
+    frames = [rng.uniform(0, 100, cores) for _ in range(iterations + 1)]
+    graph.update(frames[0], load_colors(frames[0], LOW, HIGH), history, high=HIGH, low=LOW)
+    frame = iter(frames[1:])
+
+    def render():
+        loads = next(frame)
+        graph.update(loads, load_colors(loads, LOW, HIGH), history, moved=(0, 1), high=HIGH, low=LOW)
+    return timed(render, iterations)
+
+
+def run(process_counts, core_counts, iterations, seed=0):
+    """{"stage|processes|cores": percentiles}; render is keyed with 0 processes"""
+    rng = np.random.default_rng(seed)
+    results = {}
+    for cores in core_counts:
+        for processes in process_counts:
+            for stage, stats in bench_engine(processes, cores, iterations, rng).items():
+                results[f"{stage}|{processes}|{cores}"] = stats
+        results[f"render|0|{cores}"] = bench_render(cores, iterations, rng)
+    return results
+
+
+def print_results(results, baseline=None, tolerance=1.25):
+    """Print the percentile table; returns the keys that regressed against `baseline`"""
+    regressions = []
+    header = f"{'stage':<24}{'procs':>8}{'cores':>7}" + "".join(f"{f'p{p} ms':>11}" for p in PERCENTILES)
+    print(header + (f"{'vs base':>10}" if baseline else ""))
+    for stage in STAGES:
+        for key in sorted((k for k in results if k.startswith(stage + "|")),
+                          key=lambda k: tuple(int(x) for x in k.split("|")[1:])):
+            _, processes, cores = key.split("|")
+            stats = results[key]
+            line = f"{stage:<24}{processes if processes != '0' else '-':>8}{cores:>7}"
+            line += "".join(f"{stats[f'p{p}']:>11.3f}" for p in PERCENTILES)
+            if baseline and key in baseline:
+                ratio = stats["p50"] / max(baseline[key]["p50"], 1e-6)
+                line += f"{ratio:>9.2f}x"
+                if ratio > tolerance:
+                    line += "  REGRESSION"
+                    regressions.append(key)
+            print(line)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--cores", type=int, nargs="+", default=[4, 16, 64, 512])
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as a baseline file")
+    parser.add_argument("--baseline", metavar="PATH", help="compare medians against a baseline file")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="median slowdown against the baseline reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = run(args.processes, args.cores, args.iterations, args.seed)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    regressions = print_results(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"python": platform.python_version(), "numpy": np.__version__,
+                       "machine": platform.machine(), "iterations": args.iterations,
+                       "results": results}, f, indent=1, sort_keys=True)
+        print(f"Baseline saved to {args.save_baseline}")
+    if regressions:
+        print(f"{len(regressions)} stage(s) slower than {args.tolerance:.2f}x the baseline")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""Top-K candidate selection without full sorts.
+
+Balancing and the process table only ever look at the first few of the
+thousands of processes in a snapshot, so the candidates are ranked lazily:
+``ranked`` partitions off the next batch of largest keys (``np.partition``,
+linear time), orders just that batch and yields it before touching the
+rest. Each batch is twice the size of the previous one, so a consumer that
+stops after k items pays for about O(n log(n/k) + k log k) instead of a
+full sort. Everything at the batch's cut-off key goes into the same batch,
+so the order is exactly that of a full stable sort, ties included.
+
+Keys are plain arrays computed once per snapshot (CPU %, attributed core
+load, niceness with ``ProcessSnapshot.nice_keys``). Nothing per-process is
+built here: callers create a ``ProcessEntry`` or run eligibility checks only
+for the indices they actually consume.
+"""
+import numpy as np
+
+CANDIDATE_BATCH = 32  # Size of the first batch ranked by `ranked`
+
+
+def _order(keys, tiebreak, chosen):
+    """`chosen` ordered by key descending, then tiebreak ascending, then index (stable)"""
+    if tiebreak is None:
+        return chosen[np.argsort(-keys[chosen], kind='stable')]
+    return chosen[np.lexsort((tiebreak[chosen], -keys[chosen]))]
+
+
+def _split(keys, remaining, k):
+    """(top `k` of `remaining` plus any ties at the cut-off, the rest)"""
+    if len(remaining) <= k:
+        return remaining, remaining[:0]
+    values = keys[remaining]
+    cutoff = np.partition(values, len(values) - k)[len(values) - k]
+    top = values >= cutoff
+    return remaining[top], remaining[~top]
+
+
+def ranked(keys, tiebreak=None, batch=CANDIDATE_BATCH):
+    """Yield indices of `keys`, largest first (smaller `tiebreak` first on ties), batch by batch"""
+    keys = np.asarray(keys, dtype=float)
+    if tiebreak is not None:
+        tiebreak = np.asarray(tiebreak)
+    remaining = np.arange(len(keys))
+    while len(remaining):
+        chosen, remaining = _split(keys, remaining, batch)
+        yield from _order(keys, tiebreak, chosen).tolist()
+        batch *= 2
+
+
+def top_k(keys, k=None, tiebreak=None):
+    """Indices of the `k` largest `keys` (all of them if None), largest first"""
+    keys = np.asarray(keys, dtype=float)
+    if tiebreak is not None:
+        tiebreak = np.asarray(tiebreak)
+    everything = np.arange(len(keys))
+    if k is None:
+        return _order(keys, tiebreak, everything)
+    chosen, _ = _split(keys, everything, max(k, 1))
+    return _order(keys, tiebreak, chosen)[:k]
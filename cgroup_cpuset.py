@@ -0,0 +1,148 @@
+"""cgroup v2 cpuset balancing.
+
+Instead of pinning individual PIDs, restrict the ``cpuset.cpus`` of the
+cgroup (systemd service, container, ...) a process belongs to. One write
+covers every current member and every child it forks later, so services
+that spawn workers constantly are not re-migrated forever.
+
+Moving a group off a CPU either swaps that CPU for the target (when the
+target is outside the group's cpuset) or, when the cpuset already has the
+target, narrows it by the overloaded CPU; the group's work there is then
+spread over the CPUs that remain. Each group's original ``cpuset.cpus`` is
+recorded before the first change and written back when the balancer stops
+(``restore_all``) or once the group has gone idle (``restore``), so
+repeated balancing cannot keep shrinking a service's cpuset. It is not
+restored just because the imbalance cleared: that would put the load back
+where it came from and the group would be moved again every cooldown.
+
+Groups are found from the ``0::/path`` line of ``/proc/[pid]/cgroup``. Both
+the cgroupfs root and the /proc root are configurable for testing against
+fixture trees.
+"""
+import os
+
+from cpu_topology import parse_cpu_list
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+def format_cpu_list(cpus):
+    """[0, 1, 2, 5] -> '0-2,5'"""
+    cpus = sorted(set(cpus))
+    parts = []
+    start = prev = None
+    for cpu in cpus:
+        if start is None:
+            start = prev = cpu
+        elif cpu == prev + 1:
+            prev = cpu
+        else:
+            parts.append(f"{start}-{prev}" if prev > start else str(start))
+            start = prev = cpu
+    if start is not None:
+        parts.append(f"{start}-{prev}" if prev > start else str(start))
+    return ",".join(parts)
+
+
+def read_cgroup_path(pid, proc_root="/proc"):
+    """cgroup v2 path of `pid` (e.g. '/system.slice/nginx.service'), None if unknown"""
+    try:
+        with open(os.path.join(proc_root, str(pid), "cgroup")) as f:
+            for line in f:
+                if line.startswith("0::"):
+                    return line[3:].strip() or None
+    except OSError:
+        pass
+    return None
+
+
+class CpusetController:
+    """Reads and writes cpuset.cpus of cgroup v2 groups"""
+
+    def __init__(self, cgroup_root=CGROUP_ROOT, proc_root="/proc"):
+        self.cgroup_root = cgroup_root
+        self.proc_root = proc_root
+        self.original = {}  # group -> cpuset.cpus before we first changed it ('' = inherited)
+
+    def is_supported(self):
+        """True if `cgroup_root` is a cgroup v2 hierarchy with the cpuset controller"""
+        controllers = self._read("/", "cgroup.controllers")
+        return controllers is not None and "cpuset" in controllers.split()
+
+    def group_of(self, pid):
+        """cgroup of `pid` if its cpuset can be changed (not the root group)"""
+        path = read_cgroup_path(pid, self.proc_root)
+        if path is None or path == "/":
+            return None
+        if not os.path.exists(self._path(path, "cpuset.cpus")):
+            return None
+        return path
+
+    def members(self, group):
+        """PIDs in the group, None if the group no longer exists"""
+        text = self._read(group, "cgroup.procs")
+        if text is None:
+            return None
+        return [int(pid) for pid in text.split()]
+
+    def cpus(self, group):
+        """CPUs the group may run on (its effective cpuset)"""
+        text = self._read(group, "cpuset.cpus.effective") or self._read(group, "cpuset.cpus")
+        return parse_cpu_list(text) if text else []
+
+    def set_cpus(self, group, cpus):
+        """Write cpuset.cpus for the group and verify it took effect"""
+        value = format_cpu_list(cpus)
+        with open(self._path(group, "cpuset.cpus"), "w") as f:
+            f.write(value + "\n")
+        if parse_cpu_list(self._read(group, "cpuset.cpus") or "") != sorted(set(cpus)):
+            raise RuntimeError("cpuset change verification failed")
+        return True
+
+    def move_off(self, group, from_cpu, to_cpu, all_cpus):
+        """Take `from_cpu` out of the group's cpuset; returns the new set (None if not possible)
+
+        `to_cpu` is swapped in if the set does not have it yet; otherwise the
+        set is only narrowed, and never to nothing.
+        """
+        current = set(self.cpus(group) or all_cpus)
+        if from_cpu not in current:
+            return None
+        new = current - {from_cpu}
+        if to_cpu not in current:
+            new.add(to_cpu)
+        if not new:
+            return None
+        self.original.setdefault(group, self._read(group, "cpuset.cpus") or "")
+        self.set_cpus(group, new)
+        return sorted(new)
+
+    def restore(self, group):
+        """Write back the cpuset.cpus the group had before it was first moved"""
+        original = self.original.pop(group, None)
+        if original is None:
+            return False
+        with open(self._path(group, "cpuset.cpus"), "w") as f:
+            f.write(original + "\n")
+        return True
+
+    def restore_all(self):
+        """Restore every changed group; returns the groups restored"""
+        restored = []
+        for group in list(self.original):
+            try:
+                if self.restore(group):
+                    restored.append(group)
+            except OSError:
+                self.original.pop(group, None)  # The group is gone
+        return restored
+
+    def _path(self, group, name):
+        return os.path.join(self.cgroup_root, group.lstrip("/"), name)
+
+    def _read(self, group, name):
+        try:
+            with open(self._path(group, name)) as f:
+                return f.read().strip()
+        except OSError:
+            return None
@@ -0,0 +1,91 @@
+"""Attribute process CPU load to the cores it actually runs on.
+
+Each snapshot records the CPU every task last ran on (``processor`` in
+/proc/[pid]/stat, psutil ``cpu_num``). Over a window of ticks, the load a
+process puts on a core is estimated as the average of its CPU usage over the
+samples where it was seen on that core. This lets the balancer pick only
+processes that really load the overloaded core.
+
+Samples where a process used no CPU add nothing to any estimate, so only
+busy samples are kept. The per-core estimates are cached until the next
+snapshot arrives, since the planner and manual balancing ask for the same
+core within one tick.
+"""
+from collections import deque
+
+import numpy as np
+
+ATTRIBUTION_WINDOW = 5.0     # Seconds of last-run CPU samples to keep
+ATTRIBUTION_MAX_SAMPLES = 64 # Most samples kept, however fast the ticks
+
+
+class CoreAttribution:
+    """Sliding window of (pid, start time, last CPU, CPU %) samples"""
+
+    def __init__(self, window=ATTRIBUTION_WINDOW, max_samples=ATTRIBUTION_MAX_SAMPLES):
+        self.window = window  # Seconds; the caller converts it to samples
+        self.samples = deque(maxlen=max_samples)
+        self._core_loads = {}  # core -> core_loads() result for the current window
+
+    def update(self, snapshot, samples=None):
+        """Add the snapshot's samples, keeping the newest `samples` (those spanning `window`)
+
+        Snapshots without cpu_num are ignored.
+        """
+        known = snapshot.cpu_num >= 0
+        if not known.any():
+            return
+        busy = known & (snapshot.cpu_percent > 0)
+        self.samples.append((snapshot.pid[busy], snapshot.create_time[busy],
+                             snapshot.cpu_num[busy], snapshot.cpu_percent[busy]))
+        if samples is not None:
+            while len(self.samples) > max(samples, 1):
+                self.samples.popleft()
+        self._core_loads.clear()
+
+    def has_data(self):
+        return len(self.samples) > 0
+
+    def core_loads(self, core_num):
+        """Estimated load per process on `core_num`: (pids, create_times, loads)"""
+        cached = self._core_loads.get(core_num)
+        if cached is None:
+            cached = self._core_loads[core_num] = self._estimate(core_num)
+        return cached
+
+    def _estimate(self, core_num):
+        if not self.samples:
+            empty = np.empty(0)
+            return empty.astype(np.int64), empty, empty
+        pid = np.concatenate([s[0] for s in self.samples])
+        created = np.concatenate([s[1] for s in self.samples])
+        cpu_num = np.concatenate([s[2] for s in self.samples])
+        cpu = np.concatenate([s[3] for s in self.samples])
+        on_core = cpu_num == core_num
+        keys = np.stack([pid[on_core], created[on_core]], axis=1)
+        if not len(keys):
+            return pid[:0], created[:0], cpu[:0]
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+        loads = np.bincount(inverse.ravel(), weights=cpu[on_core]) / len(self.samples)
+        return unique[:, 0].astype(np.int64), unique[:, 1], loads
+
+    def processes_on(self, core_num, snapshot, min_load=1.0):
+        """Snapshot indices of processes loading `core_num`, in no particular order
+
+        Returns (indices, loads) where loads are the attributed core loads;
+        rank them with ``candidate_selection``.
+        """
+        pids, created, loads = self.core_loads(core_num)
+        keep = loads > min_load
+        pids, created, loads = pids[keep], created[keep], loads[keep]
+        if not len(pids):
+            return np.empty(0, dtype=np.int64), loads
+
+        # Match to the live snapshot on (pid, create_time) so exited or
+        # recycled PIDs are dropped
+        order = snapshot.pid_order()
+        pos = np.searchsorted(snapshot.pid[order], pids)
+        pos[pos >= len(order)] = 0
+        idx = order[pos]
+        alive = (snapshot.pid[idx] == pids) & (snapshot.create_time[idx] == created)
+        return idx[alive], loads[alive]
@@ -1,3 +1,4 @@
+import argparse
 import psutil
 import time
 import threading
@@ -5,18 +6,34 @@ import tkinter as tk
 from tkinter import ttk
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np
 from matplotlib.figure import Figure
-import matplotlib.colors as mcolors
-import subprocess
 import os
 import platform
 
-L_HIGH = 80
-L_LOW = 30
+import balancer_engine as engine
+import proc_reader
+from balancer_worker import BalancerWorker
+from dashboard_plot import CpuGraph, LoadColorMap
+from event_log import EventWriter, LogRing, add_event_log_argument
+from process_table import ProcessTable
+import load_generator
+import instrumentation
+from adaptive_sampling import AdaptiveInterval, refresh_delay_ms
+from balancer_engine import perform_load_balancing, set_process_affinity
+
+engine.set_thresholds(high=80, low=30)
 monitoring = False
-cpu_history = []
-balanced_processes = {}  # Keep track of processes we've already balanced
+worker = None         # BalancerWorker running the monitoring tick
+latest_result = None  # Most recent TickResult published by the worker
+thread_view_reader = proc_reader.ThreadReader()  # GUI-side reader for thread drill-down
+log_ring = LogRing()  # Last LOG_RING_CAPACITY activity log lines
+log_rendered_seq = 0  # Newest ring line already shown in the log widget
+log_render_pending = False
+# JSON-lines event log, written in the background; only with --event-log [PATH]
+arg_parser = argparse.ArgumentParser(description="CPU load balancer dashboard")
+add_event_log_argument(arg_parser)
+event_log_path = arg_parser.parse_args().event_log
+event_writer = EventWriter(event_log_path) if event_log_path else None
 
 # Modern color palette
 DARK_BG = "#1e1e2e"         # Dark background
@@ -29,305 +46,94 @@ SUCCESS = "#a6e3a1"          # Success indicator
 NEUTRAL = "#89dceb"          # Neutral indicator
 BORDER_COLOR = "#6c7086"     # Border color
 
-def get_cpu_load():
-    return psutil.cpu_percent(percpu=True)
-
-def predict_overload():
-    global cpu_history
-    if len(cpu_history) < 5:
-        return None
-    avg_usage = np.mean(cpu_history[-5:], axis=0)
-    for i, usage in enumerate(avg_usage):
-        if usage > L_HIGH - 10:
-            return i
-    return None
-
-def get_core_processes(core_num):
-    """Get processes running on a specific CPU core"""
-    processes = []
-    for proc in psutil.process_iter(['pid', 'name', 'cpu_percent']):
-        try:
-            # On some systems, cpu_num might not be available or accurate
-            # So we use cpu_percent to estimate load contribution
-            if proc.info['cpu_percent'] > 1.0:  # Filter out idle processes
-                processes.append(proc)
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
-    
-    # Sort by CPU usage (highest first)
-    processes.sort(key=lambda p: p.info['cpu_percent'], reverse=True)
-    return processes
-
-def set_process_affinity(pid, cpu_list):
-    """Set CPU affinity for a process"""
-    try:
-        process = psutil.Process(pid)
-        current_affinity = process.cpu_affinity()
-        
-        # Don't change if it's already set correctly or if it's a system process with special affinity
-        if set(cpu_list) == set(current_affinity) or len(current_affinity) > len(psutil.cpu_count()):
-            return False
-            
-        process.cpu_affinity(cpu_list)
-        return True
-    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-        return False
-    except Exception as e:
-        log_action(f"Error setting affinity: {str(e)}")
-        return False
-
-def can_balance_process(proc):
-    """Check if we can and should balance this process"""
-    try:
-        # Skip system processes
-        if proc.pid < 100:
-            return False
-            
-        # Skip processes that were recently balanced
-        if proc.pid in balanced_processes and time.time() - balanced_processes[proc.pid] < 30:
-            return False
-            
-        # Skip certain critical system processes
-        if proc.name().lower() in ['system', 'systemd', 'kernel', 'wininit', 'services.exe', 'explorer.exe']:
-            return False
-            
-        return True
-    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-        return False
-
-def perform_load_balancing(overloaded_core, underloaded_core):
-    """Perform actual load balancing by moving processes between cores, considering priority."""
-    try:
-        # Get processes from the overloaded core
-        processes = get_core_processes(overloaded_core)
-        
-        # Sort processes by their niceness value (higher niceness = lower priority)
-        def get_niceness(proc):
-            try:
-                return proc.nice()
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                return 999  # Assign a very high niceness to inaccessible processes
-        
-        processes.sort(key=get_niceness)
-        
-        for proc in processes:
-            if can_balance_process(proc):
-                try:
-                    priority = proc.nice()
-                    current_name = proc.name()
-                    current_pid = proc.pid
-                    
-                    # Basic priority consideration: Don't move very high-priority processes lightly
-                    if priority <= -10 and get_cpu_load()[overloaded_core] <= L_HIGH + 5:
-                        log_action(f"⚠️ Not moving high-priority process {current_name} (PID: {current_pid})")
-                        continue
-                        
-                    if set_process_affinity(current_pid, [underloaded_core]):
-                        balanced_processes[current_pid] = time.time()  # Mark as recently balanced
-                        log_action(f"🔄 Moved process {current_name} (PID: {current_pid}, Nice: {priority}) from CPU {overloaded_core} to CPU {underloaded_core}")
-                        return True
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess) as e:
-                    log_action(f"Error accessing process {proc.pid}: {e}")
-                    continue
-                except Exception as e:
-                    log_action(f"Error handling process {proc.pid}: {e}")
-                    continue
-        
-        return False
-    except Exception as e:
-        log_action(f"Error during balancing: {str(e)}")
-        return False
-
-def balance_load(cpu_loads):
-    max_idx = predict_overload()
-    if max_idx is None:
-        max_idx = cpu_loads.index(max(cpu_loads))
-    min_idx = cpu_loads.index(min(cpu_loads))
-    
-    if cpu_loads[max_idx] > L_HIGH and cpu_loads[min_idx] < L_LOW:
-        log_action(f"⚖️ Detected imbalance: CPU {max_idx} ({cpu_loads[max_idx]:.1f}%) ➡ CPU {min_idx} ({cpu_loads[min_idx]:.1f}%)")
-        
-        # Perform actual load balancing
-        if perform_load_balancing(max_idx, min_idx):
-            return max_idx, min_idx
-    
-    return None, None
-
-def log_action(message):
-    timestamp = time.strftime("%H:%M:%S")
-    log_text.insert(tk.END, f"[{timestamp}] {message}\n")
+# Core bar colormap (rebuilt when the thresholds change)
+load_colors = LoadColorMap(NEUTRAL, SUCCESS, HIGHLIGHT)
+
+def log_action(message, timestamp=None):
+    if timestamp is None:
+        timestamp = time.strftime("%H:%M:%S")
+    log_ring.append(timestamp, message)
+    schedule_log_render()
+
+def schedule_log_render():
+    """Render new log lines in one batch shortly, instead of once per message"""
+    global log_render_pending
+    if not log_render_pending:
+        log_render_pending = True
+        root.after(100, render_log)
+
+def render_log():
+    """Append the lines logged since the last render, keeping the widget bounded"""
+    global log_rendered_seq, log_render_pending
+    log_render_pending = False
+    entries, log_rendered_seq, evicted = log_ring.since(log_rendered_seq)
+    if not entries:
+        return
+    if evicted:
+        log_text.delete(1.0, tk.END)
+    log_text.insert(tk.END, "".join(f"[{timestamp}] {message}\n" for _, timestamp, message in entries))
+    # Drop the oldest lines beyond the ring capacity
+    lines = int(log_text.index("end-1c").split(".")[0])
+    if lines > log_ring.capacity:
+        log_text.delete(1.0, f"{lines - log_ring.capacity}.0")
     log_text.see(tk.END)
 
 def create_gradient_colors(cpu_loads):
-    colors = []
-    for load in cpu_loads:
-        if load > L_HIGH:
-            colors.append(HIGHLIGHT)
-        elif load < L_LOW:
-            colors.append(NEUTRAL)
-        else:
-            # Create gradient between low and high
-            ratio = (load - L_LOW) / (L_HIGH - L_LOW)
-            r1, g1, b1 = mcolors.to_rgb(NEUTRAL)
-            r2, g2, b2 = mcolors.to_rgb(SUCCESS)
-            r = r1 + (r2 - r1) * ratio
-            g = g1 + (g2 - g1) * ratio
-            b = b1 + (b2 - b1) * ratio
-            colors.append(mcolors.to_hex((r, g, b)))
-    return colors
-
-def update_cpu_graph():
-    global monitoring, cpu_history
-    if not monitoring:
-        return
-        
-    cpu_loads = get_cpu_load()
-    cpu_history.append(cpu_loads)
-    if len(cpu_history) > 20:  # Increased history for smoother trends
-        cpu_history.pop(0)
-
-    max_idx, min_idx = balance_load(cpu_loads)
-    
-    # Clear the figure for redrawing
-    ax.clear()
-    ax.set_facecolor(PANEL_BG)
-    fig.patch.set_facecolor(DARK_BG)
-    
-    # Create gradient colors for bars
-    colors = create_gradient_colors(cpu_loads)
-    
-    # Plot the bar chart with rounded corners
-    bars = ax.bar(
-        range(len(cpu_loads)), 
-        cpu_loads, 
-        color=colors, 
-        edgecolor=BORDER_COLOR, 
-        linewidth=1, 
-        width=0.65,
-        alpha=0.9
-    )
-    
-    # Add horizontal lines for thresholds
-    ax.axhline(y=L_HIGH, color=HIGHLIGHT, alpha=0.3, linestyle='--', linewidth=1)
-    ax.axhline(y=L_LOW, color=NEUTRAL, alpha=0.3, linestyle='--', linewidth=1)
-    
-    # Add text labels for high/low thresholds
-    ax.text(-0.5, L_HIGH + 2, f"High ({L_HIGH}%)", color=HIGHLIGHT, alpha=0.7, fontsize=8)
-    ax.text(-0.5, L_LOW - 4, f"Low ({L_LOW}%)", color=NEUTRAL, alpha=0.7, fontsize=8)
-    
-    # Add percentage text on top of each bar
-    for i, bar in enumerate(bars):
-        height = bar.get_height()
-        ax.text(
-            bar.get_x() + bar.get_width() / 2,
-            height + 2,
-            f"{int(height)}%",
-            ha='center',
-            color=TEXT_COLOR,
-            fontsize=9
+    """RGBA color per core from the precomputed threshold colormap"""
+    return load_colors(cpu_loads, engine.L_LOW, engine.L_HIGH)
+
+def update_cpu_graph(result):
+    """Render one tick published by the balancer worker"""
+    with instrumentation.stage("render"):
+        cpu_loads = result.cpu_loads
+        colors = create_gradient_colors(cpu_loads)
+
+        # Long-lived artists are updated in place and blitted
+        cpu_graph.update(
+            cpu_loads,
+            colors,
+            history=result.history,
+            moved=result.moved,
+            high=engine.L_HIGH,
+            low=engine.L_LOW
         )
-    
-    # Add load balancing indicators if needed
-    if max_idx is not None and min_idx is not None:
-        ax.text(max_idx, cpu_loads[max_idx] + 8, "⬇️", ha='center', fontsize=16)
-        ax.text(min_idx, cpu_loads[min_idx] + 8, "⬆️", ha='center', fontsize=16)
-    
-    # Customize the graph appearance
-    ax.set_ylim(0, 100)
-    ax.set_ylabel("CPU Usage (%)", fontsize=10, color=TEXT_COLOR)
-    ax.set_xticks(range(len(cpu_loads)))
-    ax.set_xticklabels([f"CPU {i}" for i in range(len(cpu_loads))], fontsize=9, color=TEXT_COLOR)
-    
-    # Style the axes
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    ax.spines['bottom'].set_color(BORDER_COLOR)
-    ax.spines['left'].set_color(BORDER_COLOR)
-    ax.tick_params(axis='both', colors=TEXT_COLOR)
-    
-    # Add line graph of historical data if we have enough history
-    if len(cpu_history) > 1:
-        # Create a small inset axes for the history graph
-        if not hasattr(update_cpu_graph, 'history_ax'):
-            update_cpu_graph.history_ax = ax.inset_axes([0.65, 0.05, 0.3, 0.2])
-        
-        history_ax = update_cpu_graph.history_ax
-        history_ax.clear()
-        history_ax.set_facecolor(PANEL_BG)
-        
-        # Plot small lines for each CPU
-        for i in range(len(cpu_loads)):
-            values = [history[i] for history in cpu_history]
-            history_ax.plot(values, alpha=0.7, linewidth=1, color=colors[i])
-        
-        history_ax.set_title("History", fontsize=8, color=TEXT_COLOR)
-        history_ax.tick_params(axis='both', colors=TEXT_COLOR, labelsize=6)
-        history_ax.set_ylim(0, 100)
-        history_ax.grid(alpha=0.1)
-        
-    # Update the canvas
-    canvas.draw()
-    
-    # Set up the next update
-    root.after(1000, update_cpu_graph)
+
+def drain_worker():
+    """Pick up ticks and log messages published by the balancer worker"""
+    global latest_result
+    if worker is None:
+        return
+    worker.auto_balance = bool(auto_balance_var.get())
+    results, messages = worker.drain()
+    for timestamp, message in messages:
+        log_action(message, timestamp)
+    if results:
+        # Only the newest tick is drawn; older ones were superseded
+        latest_result = results[-1]
+        update_cpu_graph(latest_result)
+        jitter = worker.jitter_stats()
+        jitter_label.config(text=f"Tick jitter: {jitter['mean_ms']:.1f} ms avg / {jitter['p95_ms']:.1f} ms p95 | interval {worker.interval:.1f} s")
+    if monitoring:
+        root.after(100, drain_worker)
 
 def update_process_list():
     """Update the list of top CPU using processes"""
     if not monitoring:
         return
         
-    # Clear current list
-    process_list.delete(0, tk.END)
-    
-    # Get top CPU using processes
-    processes = []
-    for proc in psutil.process_iter(['pid', 'name', 'cpu_percent']):
-        try:
-            processes.append(proc)
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
-    
-    # Sort by CPU usage
-    processes.sort(key=lambda p: p.info['cpu_percent'], reverse=True)
-    
-    # Take top 10
-    top_processes = processes[:10]
-    
-    # Add to list
-    for i, proc in enumerate(top_processes):
+    # Top CPU using processes from the latest tick's snapshot
+    if latest_result is None:
+        root.after(refresh_delay_ms(worker.interval if worker else 1.0), update_process_list)
+        return
+    with instrumentation.stage("process_list"):
         try:
-            cpu_percent = proc.info['cpu_percent']
-            if cpu_percent > 0.1:  # Only show active processes
-                try:
-                    # Try to get process affinity
-                    try:
-                        affinity = proc.cpu_affinity()
-                        affinity_str = f"CPUs: {','.join(map(str, affinity))}" if len(affinity) < 5 else f"CPUs: {len(affinity)}"
-                    except:
-                        affinity_str = "N/A"
-                    
-                    # Try to get process priority (niceness)
-                    try:
-                        priority = proc.nice()
-                        priority_str = f"Nice: {priority}"
-                    except:
-                        priority_str = ""
-                        
-                    list_item = f"{proc.info['name']} (PID: {proc.info['pid']}) - {cpu_percent:.1f}% - {affinity_str} {priority_str}"
-                    process_list.insert(tk.END, list_item)
-                    
-                    # Color-code based on CPU usage
-                    if cpu_percent > 50:
-                        process_list.itemconfig(i, {'fg': HIGHLIGHT})
-                    elif cpu_percent > 20:
-                        process_list.itemconfig(i, {'fg': ACCENT})
-                except:
-                    pass
-        except:
-            pass
+            # Only the rows that appeared, left or changed are touched
+            process_table.update(latest_result.snapshot)
+        except Exception as e:
+            log_action(f"⚠️ Process list error: {str(e)}")
     
     # Schedule next update
-    root.after(2000, update_process_list)
+    root.after(refresh_delay_ms(worker.interval if worker else 1.0), update_process_list)
 
 def check_admin_rights():
     """Check if application is running with admin rights"""
@@ -354,28 +160,74 @@ def check_and_notify_about_rights():
         log_action("✅ Running with administrator privileges. Full functionality available.")
         return True
 
+def update_overhead_panel():
+    """Refresh the per-stage latency and self overhead panel"""
+    if not monitoring:
+        return
+    overhead_label.config(text=instrumentation.format_report())
+    root.after(2000, update_overhead_panel)
+
+def toggle_instrumentation():
+    instrumentation.set_enabled(instrumentation_var.get())
+    log_action(f"⏱️ Stage instrumentation {'on' if instrumentation.enabled else 'off'}")
+    overhead_label.config(text=instrumentation.format_report())
+
 def start_monitoring():
-    global monitoring
+    global monitoring, worker
     if not monitoring:
         monitoring = True
         log_action("▶️ Monitoring Started")
         status_label.config(text="Status: Active", fg=SUCCESS)
         start_button.config(state=tk.DISABLED)
         stop_button.config(state=tk.NORMAL)
-        update_cpu_graph()
+
+        # Sampling and balancing run on the worker thread; the GUI only drains results
+        # The tick interval adapts to the load (100 ms near saturation, up to 5 s when idle)
+        # Balancing is the engine's (planner, cost model, topology-aware targets)
+        # with the thresholds set by the sliders
+        worker = BalancerWorker(interval=1.0, auto_balance=bool(auto_balance_var.get()),
+                                scheduler=AdaptiveInterval())
+        engine.set_log_handler(worker.log)
+        worker.start()
+        drain_worker()
         update_process_list()
+        update_overhead_panel()
         
         # Check admin rights
         check_and_notify_about_rights()
 
 def stop_monitoring():
-    global monitoring
+    global monitoring, worker
     if monitoring:
         monitoring = False
+        stopped, worker = worker, None
+        stopped.stop()
+        stopped.join(timeout=2.0)
         log_action("⏹️ Monitoring Stopped")
         status_label.config(text="Status: Inactive", fg=HIGHLIGHT)
-        start_button.config(state=tk.NORMAL)
         stop_button.config(state=tk.DISABLED)
+        finish_stopping(stopped)
+
+def finish_stopping(stopped):
+    """Hand the engine log back to the GUI once the stopped worker has exited
+
+    Until then the engine keeps logging into the worker's queue, which is
+    drained here on the Tk thread.
+    """
+    for timestamp, message in stopped.drain()[1]:
+        log_action(message, timestamp)
+    if stopped.is_alive():
+        root.after(100, finish_stopping, stopped)
+        return
+    engine.set_log_handler(log_action)
+    start_button.config(state=tk.NORMAL)
+
+def run_on_worker(fn, *args):
+    """Change engine state between ticks: on the worker if one is running, else right away"""
+    if worker is not None:
+        worker.submit(fn, *args)
+    else:
+        fn(*args)
 
 def clear_log():
     log_text.delete(1.0, tk.END)
@@ -639,6 +491,17 @@ system_label = tk.Label(
 )
 system_label.pack(side="right")
 
+jitter_label = tk.Label(
+    status_bar, 
+    text="Tick jitter: -", 
+    font=("Segoe UI", 10), 
+    bg=PANEL_BG, 
+    fg=TEXT_COLOR, 
+    padx=15, 
+    pady=5
+)
+jitter_label.pack(side="right")
+
 # Control buttons in their own panel
 control_panel = tk.Frame(dashboard_top, bg=PANEL_BG, padx=15, pady=15)
 control_panel.pack(fill="x", pady=10)
@@ -717,6 +580,14 @@ ax.set_facecolor(PANEL_BG)
 
 canvas = FigureCanvasTkAgg(fig, master=graph_panel)
 canvas.get_tk_widget().pack(fill="both", expand=True)
+cpu_graph = CpuGraph(fig, ax, canvas, {
+    "dark_bg": DARK_BG,
+    "panel_bg": PANEL_BG,
+    "border": BORDER_COLOR,
+    "text": TEXT_COLOR,
+    "high": HIGHLIGHT,
+    "low": NEUTRAL,
+}, history_capacity=engine.HISTORY_LENGTH)
 
 log_panel = tk.Frame(dashboard_main, bg=PANEL_BG, padx=15, pady=15)
 log_panel.grid(row=0, column=1, sticky="nsew", padx=(0, 10))
@@ -799,20 +670,53 @@ refresh_button.pack(side="right")
 process_list_frame = tk.Frame(process_panel, bg=DARK_BG)
 process_list_frame.pack(fill="both", expand=True)
 
-process_scrollbar = tk.Scrollbar(process_list_frame)
-process_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-process_list = tk.Listbox(
+# Process table keyed by PID; click a heading to sort
+process_table = ProcessTable(
     process_list_frame,
-    bg=DARK_BG,
+    colors={"bg": DARK_BG, "fg": TEXT_COLOR, "select_bg": ACCENT, "select_fg": DARK_BG,
+            "hot": HIGHLIGHT, "warm": ACCENT},
+    font=("Consolas", 10)
+)
+process_table.pack(fill=tk.BOTH, expand=True)
+
+# Balancer overhead (per-stage latency, own CPU and memory) under the process list
+overhead_header = tk.Frame(process_panel, bg=PANEL_BG)
+overhead_header.pack(fill="x", pady=(10, 0))
+
+overhead_title = tk.Label(
+    overhead_header, 
+    text="Balancer Overhead", 
+    font=("Segoe UI", 12, "bold"), 
+    bg=PANEL_BG, 
+    fg=ACCENT
+)
+overhead_title.pack(side="left")
+
+instrumentation_var = tk.BooleanVar(value=instrumentation.enabled)
+instrumentation_check = tk.Checkbutton(
+    overhead_header,
+    text="Instrumentation",
+    variable=instrumentation_var,
+    command=toggle_instrumentation,
+    bg=PANEL_BG,
     fg=TEXT_COLOR,
-    font=("Consolas", 10),
-    selectbackground=ACCENT,
-    selectforeground=DARK_BG,
-    yscrollcommand=process_scrollbar.set
+    selectcolor=DARK_BG,
+    activebackground=PANEL_BG,
+    activeforeground=ACCENT,
+    font=small_font
 )
-process_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-process_scrollbar.config(command=process_list.yview)
+instrumentation_check.pack(side="right")
+
+overhead_label = tk.Label(
+    process_panel, 
+    text="No ticks yet", 
+    font=("Consolas", 9), 
+    bg=PANEL_BG, 
+    fg=TEXT_COLOR, 
+    justify="left", 
+    anchor="w"
+)
+overhead_label.pack(fill="x", pady=(5, 0))
 
 # Advanced settings frame at the bottom of dashboard
 settings_frame = tk.Frame(dashboard_frame, bg=PANEL_BG, padx=15, pady=15)
@@ -853,13 +757,12 @@ high_slider = tk.Scale(
     troughcolor=BORDER_COLOR,
     activebackground=ACCENT
 )
-high_slider.set(L_HIGH)
+high_slider.set(engine.L_HIGH)
 high_slider.grid(row=0, column=1, padx=10, pady=5)
 
 def update_high_threshold(val):
-    global L_HIGH
-    L_HIGH = int(val)
-    log_action(f"⚙️ High load threshold set to {L_HIGH}%")
+    run_on_worker(engine.set_thresholds, int(val))
+    log_action(f"⚙️ High load threshold set to {int(val)}%")
 
 high_slider.config(command=update_high_threshold)
 
@@ -885,13 +788,12 @@ low_slider = tk.Scale(
     troughcolor=BORDER_COLOR,
     activebackground=ACCENT
 )
-low_slider.set(L_LOW)
+low_slider.set(engine.L_LOW)
 low_slider.grid(row=1, column=1, padx=10, pady=5)
 
 def update_low_threshold(val):
-    global L_LOW
-    L_LOW = int(val)
-    log_action(f"⚙️ Low load threshold set to {L_LOW}%")
+    run_on_worker(engine.set_thresholds, None, int(val))
+    log_action(f"⚙️ Low load threshold set to {int(val)}%")
 
 low_slider.config(command=update_low_threshold)
 
@@ -947,12 +849,15 @@ def manual_balance():
         log_action("⚠️ Cannot balance: Monitoring is not active")
         return
     
-    cpu_loads = get_cpu_load()
+    if latest_result is None:
+        log_action("⚠️ Cannot balance: No CPU sample yet")
+        return
+    cpu_loads = latest_result.cpu_loads
     max_idx = cpu_loads.index(max(cpu_loads))
     min_idx = cpu_loads.index(min(cpu_loads))
     
     log_action(f"🔄 Manual balancing: CPU {max_idx} → CPU {min_idx}")
-    perform_load_balancing(max_idx, min_idx)
+    worker.submit(perform_load_balancing, max_idx, min_idx)
 
 # Function to manually balance a selected process
 def balance_selected_process():
@@ -961,80 +866,124 @@ def balance_selected_process():
         log_action("⚠️ Cannot balance: Monitoring is not active")
         return
         
-    selection = process_list.curselection()
-    if not selection:
+    # The selection is carried by PID
+    pid = process_table.selected_pid()
+    if pid is None:
         log_action("⚠️ No process selected")
         return
         
-    # Get the selected process info
-    process_info = process_list.get(selection[0])
-    
-    # Extract PID from the string
     try:
-        pid_str = process_info.split("(PID: ")[1].split(")")[0]
-        pid = int(pid_str)
-        
         # Get current CPU loads
-        cpu_loads = get_cpu_load()
+        if latest_result is None:
+            log_action("⚠️ Cannot balance: No CPU sample yet")
+            return
+        cpu_loads = latest_result.cpu_loads
         min_idx = cpu_loads.index(min(cpu_loads))
-        
+        entry = latest_result.snapshot.find(pid)
+        shown = process_table.entry(pid)
+        process_name = shown.name if shown is not None else f"PID {pid}"
+
+        def move_process():
+            # Runs on the worker thread
+            moved = set_process_affinity(pid, [min_idx])
+            if entry is not None:
+                # Mark as recently balanced (keyed by PID and start time)
+                engine.record_migration(entry, entry.cpu_num, min_idx, moved)
+            if moved:
+                engine.log_action(f"🔄 Manually moved process {process_name} to CPU {min_idx}")
+            else:
+                engine.log_action("⚠️ Failed to set process affinity")
+
         # Set the process affinity to the least loaded CPU
-        if set_process_affinity(pid, [min_idx]):
-            process_name = process_info.split(" (PID:")[0]
-            log_action(f"🔄 Manually moved process {process_name} to CPU {min_idx}")
-            balanced_processes[pid] = time.time()  # Mark as recently balanced
-        else:
-            log_action("⚠️ Failed to set process affinity")
+        worker.submit(move_process)
     except Exception as e:
         log_action(f"⚠️ Error: {str(e)}")
 
+# Drill down into the threads of the selected process
+def show_process_threads(event=None):
+    """Show per-thread load and current CPU for the selected process"""
+    pid = process_table.selected_pid()
+    if pid is None:
+        log_action("⚠️ No process selected")
+        return
+    shown = process_table.entry(pid)
+
+    window = tk.Toplevel(root, bg=DARK_BG)
+    window.title(f"Threads of {shown.name if shown is not None else 'process'} (PID: {pid})")
+    thread_list = tk.Listbox(window, font=("Consolas", 9), bg=DARK_BG, fg=TEXT_COLOR, width=60, height=15)
+    thread_list.pack(fill="both", expand=True, padx=10, pady=10)
+
+    def refresh_threads():
+        if not thread_list.winfo_exists():
+            return
+        threads = engine.get_thread_loads(pid, reader=thread_view_reader)
+        thread_list.delete(0, tk.END)
+        if not threads:
+            thread_list.insert(tk.END, "Process has exited or threads are not readable")
+            return
+        for thread in threads:
+            thread_list.insert(tk.END, f"TID {thread.tid:<8} {thread.name:<16} {thread.cpu_percent:5.1f}%  CPU {thread.cpu_num}")
+        window.after(1000, refresh_threads)
+
+    refresh_threads()
+
+
+def toggle_thread_mode():
+    mode = "thread" if thread_mode_var.get() else "process"
+    if mode == "thread" and not engine.thread_mode_supported():
+        thread_mode_var.set(False)
+        log_action("⚠️ Thread-level balancing needs Linux /proc; staying in process mode")
+        return
+    run_on_worker(apply_balance_mode, mode)
+
+def apply_balance_mode(mode):
+    engine.set_balance_mode(mode)
+    engine.log_action(f"⚙️ Balancing mode: {engine.BALANCE_MODE}")
+
 # Add right-click context menu for processes
 def show_process_menu(event):
     try:
-        selection = process_list.curselection()
-        if selection:
+        # Right-click selects the row under the cursor
+        if process_table.select_at(event.y) is not None:
             process_menu.post(event.x_root, event.y_root)
     except:
         pass
 
 process_menu = tk.Menu(root, tearoff=0, bg=PANEL_BG, fg=TEXT_COLOR, activebackground=ACCENT, activeforeground=DARK_BG)
 process_menu.add_command(label="Balance This Process", command=balance_selected_process)
+process_menu.add_command(label="Show Threads", command=show_process_threads)
 
-process_list.bind("<Button-3>", show_process_menu)  # Right-click
+process_table.bind("<Button-3>", show_process_menu)  # Right-click
+process_table.bind("<Double-Button-1>", show_process_threads)
+
+thread_mode_var = tk.IntVar(value=0)
+thread_mode_check = tk.Checkbutton(
+    balance_options_frame,
+    text="Thread-Level Balancing",
+    variable=thread_mode_var,
+    command=toggle_thread_mode,
+    bg=PANEL_BG,
+    fg=TEXT_COLOR,
+    selectcolor=DARK_BG,
+    activebackground=PANEL_BG,
+    activeforeground=ACCENT,
+    font=small_font
+)
+thread_mode_check.pack(anchor="w", pady=5)
 
 # Add a load generator for testing
+test_load = None  # load_generator.LoadGenerator started by the test button
+
 def generate_load():
     """Generate CPU load for testing balancing"""
+    global test_load
     try:
         log_action("🔄 Generating test load on CPU 0...")
         
-        # Create a script that will generate load
-        load_script = """
-import time
-import multiprocessing
-
-def generate_load(cpu_num):
-    # Pin this process to the specified CPU
-    process = multiprocessing.current_process()
-    process.cpu_affinity([cpu_num])
-    
-    # Generate load
-    start_time = time.time()
-    while time.time() - start_time < 30:  # Run for 30 seconds
-        x = 0
-        for i in range(10000000):
-            x += i * i
-            
-if __name__ == '__main__':
-    generate_load(0)  # Generate load on CPU 0
-        """
-        
-        # Save to a temporary file
-        with open("temp_load_generator.py", "w") as f:
-            f.write(load_script)
-            
-        # Run the load generator in a separate process
-        subprocess.Popen(["python", "temp_load_generator.py"])
+        if test_load is not None:
+            test_load.stop()
+        # Full-duty worker started on CPU 0 for the balancer to move
+        test_load = load_generator.generate_load(cpus=[0], profile=load_generator.Constant(1.0), duration=30)
         
         log_action("⚙️ Test load process started (will run for 30 seconds)")
     except Exception as e:
@@ -1054,6 +1003,12 @@ generate_load_button = tk.Button(
 )
 generate_load_button.pack(anchor="w", pady=5)
 
+# Send engine log messages to the activity log
+engine.set_log_handler(log_action)
+if event_writer is not None:
+    engine.set_event_sink(event_writer.emit)
+    event_writer.start()
+
 # Show home frame initially
 update_active_nav_button("home")
 home_frame.pack(fill="both", expand=True)
@@ -1064,3 +1019,7 @@ log_action("This version includes REAL load balancing capabilities.")
 
 # Start the main loop
 root.mainloop()
+if event_writer is not None:
+    event_writer.close()
+if test_load is not None:
+    test_load.stop()
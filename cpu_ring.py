@@ -0,0 +1,75 @@
+"""Fixed-size per-core CPU history ring buffer.
+
+Samples are stored in a preallocated ``cores x 2N`` array and each one is
+written twice (at ``i`` and ``i + N``), so the last ``n`` samples are always
+one contiguous slice. ``window(n)`` is therefore a zero-copy view, and the
+rolling statistics run vectorized across all cores without allocating per
+sample.
+"""
+import numpy as np
+
+
+class CpuHistory:
+    """Ring buffer of the last `capacity` per-core load samples"""
+
+    def __init__(self, num_cores, capacity):
+        self.capacity = capacity
+        self._buffer = np.zeros((num_cores, 2 * capacity))
+        self._pos = 0
+        self._count = 0
+        self._ramps = {}  # n -> centred 0..n-1 ramp for slope()
+
+    @property
+    def num_cores(self):
+        return self._buffer.shape[0]
+
+    def __len__(self):
+        return self._count
+
+    def push(self, cpu_loads):
+        """Store one per-core sample (a different core count resets history)"""
+        if len(cpu_loads) != self.num_cores:
+            self.resize(len(cpu_loads))
+        pos = self._pos
+        self._buffer[:, pos] = cpu_loads
+        self._buffer[:, pos + self.capacity] = cpu_loads
+        self._pos = (pos + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def resize(self, num_cores):
+        self._buffer = np.zeros((num_cores, 2 * self.capacity))
+        self._pos = 0
+        self._count = 0
+
+    def clear(self):
+        self._pos = 0
+        self._count = 0
+
+    def window(self, n=None):
+        """View of the last `n` samples (all stored by default), oldest first"""
+        if n is None or n > self._count:
+            n = self._count
+        end = self._pos + self.capacity
+        return self._buffer[:, end - n:end]
+
+    def latest(self):
+        return self._buffer[:, self._pos + self.capacity - 1]
+
+    def mean(self, n=None):
+        return self.window(n).mean(axis=1)
+
+    def var(self, n=None):
+        return self.window(n).var(axis=1)
+
+    def slope(self, n=None):
+        """Least-squares trend per core, in load % per sample"""
+        window = self.window(n)
+        n = window.shape[1]
+        if n < 2:
+            return np.zeros(self.num_cores)
+        ramp = self._ramps.get(n)
+        if ramp is None:
+            ramp = np.arange(n) - (n - 1) / 2
+            ramp = self._ramps[n] = ramp / (ramp @ ramp)
+        return window @ ramp
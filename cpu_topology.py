@@ -0,0 +1,154 @@
+"""CPU topology model for target selection.
+
+Built from sysfs (``devices/system/cpu/cpuN/topology``, the cache sharing
+lists under ``cpuN/cache/index*`` and the NUMA ``node*/cpulist`` maps). The
+root is configurable so the model can be built from a fixture tree. When
+sysfs is missing (non-Linux) every CPU is treated as its own core on a
+single L3 and node.
+
+``choose_target`` scores the CPUs a process could move to. The source's SMT
+siblings are excluded, since they share its execution units. A target
+whose sibling is busy offers less capacity than its own load suggests.
+Leaving the source's L3 or NUMA node (where its memory most likely is)
+costs extra.
+"""
+import glob
+import os
+import re
+
+import numpy as np
+
+SYSFS_ROOT = "/sys"
+SIBLING_WEIGHT = 0.5   # Share of an SMT sibling's load counted against a target
+L3_PENALTY = 5.0       # Load points for leaving the source's L3 domain
+NUMA_PENALTY = 20.0    # Load points for leaving the source's NUMA node
+
+
+def parse_cpu_list(text):
+    """'0-3,8,10-11' -> [0, 1, 2, 3, 8, 10, 11]"""
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-")
+            cpus.extend(range(int(lo), int(hi) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _group_ids(num_cpus, groups):
+    """Group id per CPU (lowest CPU of its group); CPUs in no group get their own"""
+    ids = np.arange(num_cpus)
+    for members in groups:
+        members = [c for c in members if c < num_cpus]
+        if members:
+            ids[members] = min(members)
+    return ids
+
+
+class CpuTopology:
+    """SMT core, L3 domain and NUMA node of every logical CPU"""
+
+    def __init__(self, smt_group, l3_group, node, package=None):
+        self.smt_group = np.asarray(smt_group)
+        self.l3_group = np.asarray(l3_group)
+        self.node = np.asarray(node)
+        self.package = np.zeros(len(self.node), dtype=int) if package is None else np.asarray(package)
+        # Member CPUs of every core with more than one hardware thread
+        self._smt_cores = [members for members in
+                           (np.flatnonzero(self.smt_group == g) for g in np.unique(self.smt_group))
+                           if len(members) > 1]
+
+    def __len__(self):
+        return len(self.node)
+
+    @classmethod
+    def flat(cls, num_cpus):
+        """Every CPU its own core, one L3 and one node"""
+        return cls(np.arange(num_cpus), np.zeros(num_cpus, dtype=int), np.zeros(num_cpus, dtype=int))
+
+    @classmethod
+    def load(cls, sysfs_root=SYSFS_ROOT, num_cpus=None):
+        """Read the topology from `sysfs_root` (falls back to flat)"""
+        cpu_root = os.path.join(sysfs_root, "devices", "system", "cpu")
+        cpus = sorted(int(m.group(1)) for m in
+                      (re.match(r"cpu(\d+)$", os.path.basename(p)) for p in glob.glob(os.path.join(cpu_root, "cpu*")))
+                      if m)
+        if num_cpus is None:
+            num_cpus = (max(cpus) + 1) if cpus else (os.cpu_count() or 1)
+        if not cpus:
+            return cls.flat(num_cpus)
+
+        smt, l3, package = [], [], np.zeros(num_cpus, dtype=int)
+        for cpu in cpus:
+            if cpu >= num_cpus:
+                continue
+            base = os.path.join(cpu_root, f"cpu{cpu}")
+            siblings = (_read(os.path.join(base, "topology", "thread_siblings_list")) or
+                        _read(os.path.join(base, "topology", "core_cpus_list")))
+            if siblings:
+                smt.append(parse_cpu_list(siblings))
+            package_id = _read(os.path.join(base, "topology", "physical_package_id"))
+            if package_id is not None and package_id.lstrip("-").isdigit():
+                package[cpu] = int(package_id)
+            for index in glob.glob(os.path.join(base, "cache", "index*")):
+                if _read(os.path.join(index, "level")) == "3":
+                    shared = _read(os.path.join(index, "shared_cpu_list"))
+                    if shared:
+                        l3.append(parse_cpu_list(shared))
+
+        node = np.zeros(num_cpus, dtype=int)
+        for path in glob.glob(os.path.join(sysfs_root, "devices", "system", "node", "node*", "cpulist")):
+            match = re.search(r"node(\d+)", path)
+            cpulist = _read(path)
+            if match and cpulist:
+                members = [c for c in parse_cpu_list(cpulist) if c < num_cpus]
+                node[members] = int(match.group(1))
+
+        # Without L3 info, assume one L3 per package
+        l3_group = _group_ids(num_cpus, l3) if l3 else package.copy()
+        return cls(_group_ids(num_cpus, smt), l3_group, node, package)
+
+    def siblings(self, cpu):
+        """Logical CPUs sharing `cpu`'s physical core (including itself)"""
+        return np.flatnonzero(self.smt_group == self.smt_group[cpu])
+
+    def sibling_load(self, loads):
+        """Busiest other SMT thread on each CPU's core (0 without SMT)"""
+        loads = np.asarray(loads, dtype=float)
+        result = np.zeros(len(loads))
+        for members in self._smt_cores:
+            for cpu in members:
+                result[cpu] = loads[members[members != cpu]].max()
+        return result
+
+    def target_scores(self, loads, source):
+        """Effective load of moving work from `source` to each CPU (inf = not allowed)"""
+        loads = np.asarray(loads, dtype=float)
+        scores = loads + SIBLING_WEIGHT * self.sibling_load(loads)
+        scores = scores + np.where(self.l3_group != self.l3_group[source], L3_PENALTY, 0.0)
+        scores = scores + np.where(self.node != self.node[source], NUMA_PENALTY, 0.0)
+        # The source's own core (itself and its SMT siblings) adds no capacity
+        scores[self.smt_group == self.smt_group[source]] = np.inf
+        return scores
+
+    def choose_target(self, loads, source):
+        """Best CPU to move work from `source` to, or None if there is none"""
+        if len(loads) != len(self):
+            # Topology out of date (CPU hotplug): plain least-loaded CPU
+            loads = np.asarray(loads, dtype=float)
+            candidates = np.flatnonzero(np.arange(len(loads)) != source)
+            return int(candidates[np.argmin(loads[candidates])]) if len(candidates) else None
+        scores = self.target_scores(loads, source)
+        target = int(np.argmin(scores))
+        return None if np.isinf(scores[target]) else target
@@ -0,0 +1,222 @@
+"""Persistent-artist CPU bar graph for the dashboards.
+
+The bars, their percentage labels, the balancing arrows and the history
+lines are created once and marked ``animated``; each frame only updates
+them in place (``set_height``/``set_facecolor``/``set_data``/``set_text``) and
+blits the plot area over a cached background. The static parts (axes,
+ticks, threshold lines) are only redrawn when the core count or the
+thresholds change, or when the canvas itself redraws (e.g. on resize).
+"""
+import matplotlib.colors as mcolors
+import numpy as np
+from matplotlib.transforms import Bbox
+
+LABEL_MAX_CORES = 32  # Above this the per-bar % labels overlap; skip them
+COLORMAP_SIZE = 256   # Gradient entries between the low and high thresholds
+
+
+class LoadColorMap:
+    """Load -> RGBA lookup table for the core bars
+
+    Loads below `low` map to `low_color`, above `high` to `high_color`, and
+    everything in between to a `COLORMAP_SIZE`-entry gradient from
+    `low_color` to `mid_color`. The table is rebuilt only when the
+    thresholds change; mapping a tick is one NumPy fancy-index.
+    """
+
+    def __init__(self, low_color, mid_color, high_color, size=COLORMAP_SIZE):
+        self.size = size
+        self._colors = [mcolors.to_rgba(c) for c in (low_color, mid_color, high_color)]
+        self.thresholds = None
+        self.lut = None
+        self._scale = 0.0
+
+    def build(self, low, high):
+        low_rgba, mid_rgba, high_rgba = (np.array(c) for c in self._colors)
+        ratio = np.linspace(0.0, 1.0, self.size)[:, None]
+        # Entry 0 is "below low", the last entry is "above high"
+        self.lut = np.vstack([low_rgba, low_rgba + (mid_rgba - low_rgba) * ratio, high_rgba])
+        self._scale = (self.size - 1) / (high - low) if high > low else 0.0
+        self.thresholds = (low, high)
+
+    def __call__(self, cpu_loads, low, high):
+        """RGBA rows (one per core) for `cpu_loads`"""
+        if self.thresholds != (low, high):
+            self.build(low, high)
+        loads = np.asarray(cpu_loads, dtype=float)
+        idx = np.clip(np.rint((loads - low) * self._scale), 0, self.size - 1).astype(np.intp) + 1
+        idx[loads < low] = 0
+        idx[loads > high] = self.size + 1
+        return self.lut[idx]
+
+
+class CpuGraph:
+    """Bar chart of per-core load with a history inset, updated by blitting"""
+
+    def __init__(self, fig, ax, canvas, style, history_capacity=20):
+        self.fig = fig
+        self.ax = ax
+        self.canvas = canvas
+        self.style = style  # Theme colors: dark_bg, panel_bg, border, text, high, low
+        self.history_capacity = history_capacity
+        self.num_cores = 0
+        self.thresholds = None
+        self.background = None
+        self.history_background = None  # Cached inset panel, pasted over the bars
+        self.history_ax = None
+        self.bars = []
+        self.labels = []
+        self.history_lines = []
+        self.arrows = []
+        self.animated = []
+        self._history_x = np.arange(history_capacity)
+        self._has_frame = False
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def build(self, num_cores, high, low):
+        """(Re)create all artists for `num_cores` bars; triggers a full draw"""
+        style = self.style
+        ax = self.ax
+        ax.clear()
+        ax.set_facecolor(style["panel_bg"])
+        self.fig.patch.set_facecolor(style["dark_bg"])
+
+        x = np.arange(num_cores)
+        self.bars = list(ax.bar(
+            x,
+            np.zeros(num_cores),
+            color=style["low"],
+            edgecolor=style["border"],
+            linewidth=1,
+            width=0.65,
+            alpha=0.9,
+            animated=True
+        ))
+
+        # Threshold lines and their labels are part of the static background
+        self.high_line = ax.axhline(y=high, color=style["high"], alpha=0.3, linestyle='--', linewidth=1)
+        self.low_line = ax.axhline(y=low, color=style["low"], alpha=0.3, linestyle='--', linewidth=1)
+        self.high_text = ax.text(-0.5, high + 2, f"High ({high}%)", color=style["high"], alpha=0.7, fontsize=8)
+        self.low_text = ax.text(-0.5, low - 4, f"Low ({low}%)", color=style["low"], alpha=0.7, fontsize=8)
+
+        self.labels = [
+            ax.text(i, 2, "", ha='center', color=style["text"], fontsize=9, animated=True)
+            for i in range(num_cores if num_cores <= LABEL_MAX_CORES else 0)
+        ]
+        self.arrows = [
+            ax.text(0, 0, "⬇️", ha='center', fontsize=16, animated=True, visible=False),
+            ax.text(0, 0, "⬆️", ha='center', fontsize=16, animated=True, visible=False),
+        ]
+
+        ax.set_ylim(0, 100)
+        ax.set_ylabel("CPU Usage (%)", fontsize=10, color=style["text"])
+        ax.set_xticks(x)
+        ax.set_xticklabels([f"CPU {i}" for i in range(num_cores)], fontsize=9, color=style["text"])
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+        ax.spines['bottom'].set_color(style["border"])
+        ax.spines['left'].set_color(style["border"])
+        ax.tick_params(axis='both', colors=style["text"])
+
+        # History inset: one line per core, hidden until there are two samples
+        history_ax = self.history_ax = ax.inset_axes([0.65, 0.05, 0.3, 0.2])
+        history_ax.set_facecolor(style["panel_bg"])
+        history_ax.set_title("History", fontsize=8, color=style["text"])
+        history_ax.tick_params(axis='both', colors=style["text"], labelsize=6)
+        history_ax.set_xlim(0, self.history_capacity - 1)
+        history_ax.set_ylim(0, 100)
+        history_ax.grid(alpha=0.1)
+        self.history_lines = [
+            history_ax.plot([], [], alpha=0.7, linewidth=1, animated=True)[0]
+            for _ in range(num_cores)
+        ]
+        history_ax.set_visible(False)
+
+        self.animated = self.bars + self.labels + self.arrows
+        self.num_cores = num_cores
+        self.thresholds = (high, low)
+        self.canvas.draw()
+
+    def set_thresholds(self, high, low):
+        """Move the threshold lines and redraw the static background"""
+        if self.thresholds == (high, low) or not self.num_cores:
+            return
+        self.high_line.set_ydata([high, high])
+        self.low_line.set_ydata([low, low])
+        self.high_text.set_y(high + 2)
+        self.high_text.set_text(f"High ({high}%)")
+        self.low_text.set_y(low - 4)
+        self.low_text.set_text(f"Low ({low}%)")
+        self.thresholds = (high, low)
+        self.canvas.draw()
+
+    def update(self, cpu_loads, colors, history=None, moved=None, high=None, low=None):
+        """Render one frame; `history` is a cores x samples array (oldest first)"""
+        if len(cpu_loads) != self.num_cores:
+            self.build(len(cpu_loads), high, low)
+        elif high is not None:
+            self.set_thresholds(high, low)
+
+        for bar, load, color in zip(self.bars, cpu_loads, colors):
+            bar.set_height(load)
+            bar.set_facecolor(color)
+        for label, load in zip(self.labels, cpu_loads):
+            label.set_y(load + 2)
+            label.set_text(f"{int(load)}%")
+
+        down, up = self.arrows
+        if moved and moved[0] is not None and moved[1] is not None:
+            max_idx, min_idx = moved
+            down.set_position((max_idx, cpu_loads[max_idx] + 8))
+            up.set_position((min_idx, cpu_loads[min_idx] + 8))
+            down.set_visible(True)
+            up.set_visible(True)
+        else:
+            down.set_visible(False)
+            up.set_visible(False)
+
+        if history is not None and history.shape[1] > 1:
+            if not self.history_ax.get_visible():
+                # Showing the inset changes the background
+                self.history_ax.set_visible(True)
+                self.canvas.draw()
+            x = self._history_x[:history.shape[1]]
+            for line, row, color in zip(self.history_lines, history, colors):
+                line.set_data(x, row)
+                line.set_color(color)
+
+        self._has_frame = True
+        self.blit()
+
+    def blit(self):
+        """Restore the cached background and draw only the animated artists"""
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_animated()
+        self.canvas.blit(self.blit_region())
+
+    def blit_region(self):
+        """Plot area plus the headroom above it used by labels and arrows"""
+        bbox = self.ax.bbox
+        return Bbox.from_extents(bbox.x0, bbox.y0, bbox.x1, self.fig.bbox.y1)
+
+    def _draw_animated(self):
+        for artist in self.animated:
+            if artist.get_visible():
+                self.ax.draw_artist(artist)
+        if self.history_ax is not None and self.history_ax.get_visible():
+            # The inset sits on top of the bars: paste its cached panel back
+            # instead of re-rendering its axes, then draw the lines
+            self.canvas.restore_region(self.history_background)
+            for line in self.history_lines:
+                self.history_ax.draw_artist(line)
+
+    def _on_draw(self, event):
+        """Full redraws (resize, rebuild) refresh the cached background"""
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        if self.history_ax is not None and self.history_ax.get_visible():
+            self.history_background = self.canvas.copy_from_bbox(self.history_ax.bbox)
+        if self._has_frame:
+            self._draw_animated()
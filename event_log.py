@@ -0,0 +1,144 @@
+"""Bounded log ring and asynchronous structured event log.
+
+``LogRing`` keeps the last few hundred human-readable log lines in memory
+with a sequence number per line, so the dashboards can render only what is
+new (in batches) and never hold more than ``LOG_RING_CAPACITY`` lines.
+
+``EventWriter`` appends structured events (timestamp, event type, pid,
+from/to core, loads, ...) as JSON lines to a size-rotated file from its own
+thread. ``emit`` only does a non-blocking queue put: when the writer falls
+behind, events are dropped and counted instead of stalling the balancer.
+The event log is off unless asked for (``--event-log [PATH]``, see
+``add_event_log_argument``); without a PATH it goes to the per-user state
+directory, never into the working directory.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+LOG_RING_CAPACITY = 500                  # Lines kept in memory / in the log widget
+EVENT_LOG_NAME = "balancer_events.jsonl"
+EVENT_LOG_MAX_BYTES = 5 * 1024 * 1024    # Rotate the event file at this size
+EVENT_LOG_BACKUPS = 3                    # Rotated files kept (.1 .. .N)
+
+
+class LogRing:
+    """Fixed-capacity ring of (seq, timestamp, message) log lines"""
+
+    def __init__(self, capacity=LOG_RING_CAPACITY):
+        self.capacity = capacity
+        self.entries = deque(maxlen=capacity)
+        self.seq = 0  # Sequence number of the newest line
+        self._lock = threading.Lock()
+
+    def append(self, timestamp, message):
+        with self._lock:
+            self.seq += 1
+            self.entries.append((self.seq, timestamp, message))
+
+    def since(self, seq):
+        """Lines newer than `seq`: (entries, newest seq, True if some were evicted)"""
+        with self._lock:
+            newest = self.seq
+            missing = newest - seq
+            if missing <= 0:
+                return [], newest, False
+            entries = list(self.entries)[-missing:]
+        return entries, newest, missing > len(entries)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+
+def default_event_log_path():
+    """$XDG_STATE_HOME/cpu-balancer/balancer_events.jsonl (~/.local/state if unset)"""
+    state_home = os.environ.get("XDG_STATE_HOME") or os.path.join(os.path.expanduser("~"), ".local", "state")
+    return os.path.join(state_home, "cpu-balancer", EVENT_LOG_NAME)
+
+
+def add_event_log_argument(parser):
+    """Add --event-log [PATH] to an argparse parser (None when not given)"""
+    parser.add_argument("--event-log", nargs="?", const=default_event_log_path(), default=None,
+                        metavar="PATH", help="append balancing events as JSON lines to PATH "
+                                             f"(default {default_event_log_path()}); off without this flag")
+
+
+class EventWriter(threading.Thread):
+    """Background thread that writes JSON-lines events to a rotating file"""
+
+    def __init__(self, path, max_bytes=EVENT_LOG_MAX_BYTES, backups=EVENT_LOG_BACKUPS,
+                 batch_size=256, flush_interval=1.0, queue_size=10000):
+        super().__init__(name="event-writer", daemon=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.events = queue.Queue(maxsize=queue_size)
+        self.dropped = 0  # Events lost because the queue was full
+        self.written = 0
+        self._stop_event = threading.Event()
+
+    def emit(self, event, **fields):
+        """Queue one event; never blocks"""
+        record = {"ts": round(time.time(), 3), "event": event}
+        record.update(fields)
+        try:
+            self.events.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=2.0):
+        """Flush what is queued and stop the writer"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        except OSError:
+            pass  # Reported as dropped events by _write
+        while not self._stop_event.is_set():
+            self._stop_event.wait(self.flush_interval)
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch):
+        lines = "".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in batch)
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(lines) > self.max_bytes:
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            self.written += len(batch)
+        except OSError:
+            self.dropped += len(batch)
+
+    def _rotate(self):
+        """balancer_events.jsonl -> .1 -> .2 ... (the oldest is deleted)"""
+        for i in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
@@ -0,0 +1,102 @@
+"""Per-core load forecasting.
+
+All models run vectorized across cores on the ``CpuHistory`` ring buffer and
+produce, for a configurable horizon, the predicted load of every core and
+the estimated time until it crosses the overload threshold:
+
+  * ``ewma``  - exponentially weighted level, trend from the rolling slope
+  * ``holt``  - Holt's linear trend (double exponential smoothing)
+  * ``slope`` - least-squares line through the recent window
+
+A migration shifts load between two cores in one step, which every model
+would otherwise read as a steep trend and forecast onward. Given the
+number of samples since a move last touched each core (``settled``), the
+samples before it are replaced by the first one after (``since_move``), so
+those cores start from a flat history at their post-move level.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+FORECAST_MODELS = ("ewma", "holt", "slope")
+
+Forecast = namedtuple("Forecast", "model horizon predicted level trend time_to_overload")
+
+
+def ewma(window, alpha=0.5):
+    """Exponentially weighted level per core (rows of `window` are cores)"""
+    level = window[:, 0].copy()
+    for t in range(1, window.shape[1]):
+        level += alpha * (window[:, t] - level)
+    return level
+
+
+def holt(window, alpha=0.5, beta=0.3):
+    """Holt's linear trend: (level, trend per sample) per core"""
+    level = window[:, 0].copy()
+    trend = np.zeros_like(level)
+    if window.shape[1] > 1:
+        trend = window[:, 1] - window[:, 0]
+    for t in range(1, window.shape[1]):
+        previous = level
+        level = alpha * window[:, t] + (1 - alpha) * (level + trend)
+        trend = beta * (level - previous) + (1 - beta) * trend
+    return level, trend
+
+
+def least_squares(window):
+    """Fitted value at the latest sample and slope per sample, per core"""
+    n = window.shape[1]
+    if n < 2:
+        return window[:, -1].copy(), np.zeros(window.shape[0])
+    ramp = np.arange(n) - (n - 1) / 2
+    slope = window @ ramp / (ramp @ ramp)
+    level = window.mean(axis=1) + slope * (n - 1) / 2
+    return level, slope
+
+
+def since_move(window, settled):
+    """`window` with each core's samples older than its last `settled` set to the first of those"""
+    width = window.shape[1]
+    start = np.clip(width - np.asarray(settled), 0, width - 1)
+    first = window[np.arange(window.shape[0]), start]
+    return np.where(np.arange(width) < start[:, None], first[:, None], window)
+
+
+def time_to_threshold(level, trend, threshold, interval):
+    """Seconds until each core reaches `threshold` (0 if above, inf if never)"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        steps = np.where(trend > 0, (threshold - level) / trend, np.inf)
+    steps = np.where(level >= threshold, 0.0, steps)
+    return steps * interval
+
+
+def forecast(history, threshold, horizon=5.0, interval=1.0, model="holt", window=10, settled=None):
+    """Forecast every core `horizon` seconds ahead from the last `window` samples
+
+    `settled` holds, per core, the samples taken since a migration last
+    moved load on or off it (None if there were no moves).
+    """
+    if model not in FORECAST_MODELS:
+        raise ValueError(f"Unknown forecast model: {model}")
+    samples = history.window(window)
+    if samples.shape[1] == 0:
+        zeros = np.zeros(history.num_cores)
+        return Forecast(model, horizon, zeros, zeros, zeros, np.full(history.num_cores, np.inf))
+    if settled is not None and len(settled) == samples.shape[0]:
+        samples = since_move(samples, settled)
+    else:
+        settled = None
+
+    if model == "ewma":
+        level = ewma(samples)
+        trend = history.slope(window) if settled is None else least_squares(samples)[1]
+    elif model == "holt":
+        level, trend = holt(samples)
+    else:
+        level, trend = least_squares(samples)
+
+    steps = horizon / interval
+    predicted = np.clip(level + trend * steps, 0.0, 100.0)
+    return Forecast(model, horizon, predicted, level, trend,
+                    time_to_threshold(level, trend, threshold, interval))
@@ -0,0 +1,175 @@
+"""Lightweight timing of the monitoring tick's stages.
+
+Stages record their duration with ``stage(name)`` or ``record_stage``; other
+numbers worth watching (e.g. snapshot size) are kept as gauges. Durations
+are also counted into fixed histogram buckets for the metrics exporter and
+kept in a rolling window (the last ``ROLLING_WINDOW`` runs) for percentiles.
+
+Stages timed per tick: ``sample`` (per-core load), ``snapshot`` (process
+scan), ``eligibility``, ``plan`` and ``apply`` in the engine, ``render`` and
+``process_list`` in the dashboards, and the whole ``tick``.
+``sample_self`` gauges the balancer's own CPU use and RSS.
+
+``set_enabled(False)`` swaps ``record_stage``, ``stage`` and
+``sample_self`` for no-ops, so the hooks cost one call and nothing else.
+Call them through the module (``instrumentation.stage(...)``), not names
+imported from it, so the switch takes effect.
+
+Stages are recorded on the worker and Tk threads and read by the metrics
+exporter's HTTP threads; writers update the dicts under ``_lock`` and
+readers work on the copies ``snapshot()`` takes under it.
+"""
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+import psutil
+
+# Histogram bucket upper bounds (seconds); one more bucket counts the rest
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+ROLLING_WINDOW = 300  # Most recent runs per stage kept for percentiles
+STAGE_ORDER = ["sample", "snapshot", "eligibility", "plan", "apply", "render", "process_list", "tick"]
+
+enabled = True
+stage_stats = {}  # stage name -> {"last", "count", "total", "max", "buckets"} (seconds)
+rolling = {}      # stage name -> deque of the last ROLLING_WINDOW durations (seconds)
+gauges = {}
+_lock = threading.Lock()
+_self_process = None
+_self_last = None  # (wall, cpu seconds) at the previous sample_self
+
+
+def _record_stage(name, seconds):
+    """Record one execution of a tick stage"""
+    with _lock:
+        stats = stage_stats.get(name)
+        if stats is None:
+            stats = stage_stats[name] = {"last": 0.0, "count": 0, "total": 0.0, "max": 0.0,
+                                         "buckets": [0] * (len(STAGE_BUCKETS) + 1)}
+            rolling[name] = deque(maxlen=ROLLING_WINDOW)
+        stats["last"] = seconds
+        stats["count"] += 1
+        stats["total"] += seconds
+        if seconds > stats["max"]:
+            stats["max"] = seconds
+        stats["buckets"][bisect.bisect_left(STAGE_BUCKETS, seconds)] += 1
+        rolling[name].append(seconds)
+
+
+@contextmanager
+def _stage(name):
+    """Time the enclosed block as one execution of `name`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record_stage(name, time.perf_counter() - start)
+
+
+def _sample_self():
+    """Gauge the balancer process's CPU use since the last call and its RSS"""
+    global _self_process, _self_last
+    wall, cpu = time.monotonic(), time.process_time()
+    if _self_last is not None and wall > _self_last[0]:
+        set_gauge("self_cpu_percent", 100.0 * (cpu - _self_last[1]) / (wall - _self_last[0]))
+    _self_last = (wall, cpu)
+    set_gauge("self_cpu_seconds", cpu)
+    try:
+        if _self_process is None:
+            _self_process = psutil.Process()
+        set_gauge("self_rss_bytes", _self_process.memory_info().rss)
+    except psutil.Error:
+        pass
+
+
+_NULL_STAGE = nullcontext()
+
+
+def _noop_record(name, seconds):
+    pass
+
+
+def _noop_stage(name):
+    return _NULL_STAGE
+
+
+def _noop_sample():
+    pass
+
+
+record_stage = _record_stage
+stage = _stage
+sample_self = _sample_self
+
+
+def set_enabled(on):
+    """Turn the hooks on, or into no-ops (collected numbers are kept)"""
+    global enabled, record_stage, stage, sample_self
+    enabled = bool(on)
+    if enabled:
+        record_stage, stage, sample_self = _record_stage, _stage, _sample_self
+    else:
+        record_stage, stage, sample_self = _noop_record, _noop_stage, _noop_sample
+
+
+def set_gauge(name, value):
+    with _lock:
+        gauges[name] = value
+
+
+def reset():
+    """Forget all stage timings and gauges"""
+    global _self_last
+    with _lock:
+        stage_stats.clear()
+        rolling.clear()
+        gauges.clear()
+    _self_last = None
+
+
+def snapshot():
+    """Copies of (stage_stats, rolling, gauges) taken together, safe to read on any thread"""
+    with _lock:
+        stats = {name: dict(values, buckets=list(values["buckets"])) for name, values in stage_stats.items()}
+        recent = {name: list(values) for name, values in rolling.items()}
+        return stats, recent, dict(gauges)
+
+
+def report():
+    """Return stage timings (in milliseconds, percentiles over the rolling window) and gauges"""
+    stage_copy, rolling_copy, gauge_copy = snapshot()
+    stages = {}
+    for name, stats in stage_copy.items():
+        recent = np.array(rolling_copy[name], dtype=float) * 1000
+        p50, p95, p99 = np.percentile(recent, (50, 95, 99)) if len(recent) else (0.0, 0.0, 0.0)
+        stages[name] = {
+            "last_ms": stats["last"] * 1000,
+            "avg_ms": stats["total"] / stats["count"] * 1000 if stats["count"] else 0.0,
+            "max_ms": stats["max"] * 1000,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "count": stats["count"],
+        }
+    return {"enabled": enabled, "stages": stages, "gauges": gauge_copy}
+
+
+def format_report(report_data=None):
+    """Plain-text stage percentile table and self overhead (dashboard panel)"""
+    report_data = report_data or report()
+    stages = report_data["stages"]
+    lines = [f"{'stage':<13}{'p50':>8}{'p95':>8}{'p99':>8}  ms"]
+    for name in STAGE_ORDER + sorted(set(stages) - set(STAGE_ORDER)):
+        stats = stages.get(name)
+        if stats is not None:
+            lines.append(f"{name:<13}{stats['p50_ms']:>8.2f}{stats['p95_ms']:>8.2f}{stats['p99_ms']:>8.2f}")
+    gauges = report_data["gauges"]
+    if "self_rss_bytes" in gauges:
+        lines.append(f"Self: {gauges.get('self_cpu_percent', 0.0):.1f}% CPU, "
+                     f"{gauges.get('self_cpu_seconds', 0.0):.1f}s total, {gauges['self_rss_bytes'] / 2**20:.0f} MB RSS")
+    if not report_data["enabled"]:
+        lines.append("(instrumentation off)")
+    return "\n".join(lines)
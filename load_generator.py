@@ -0,0 +1,227 @@
+"""Synthetic CPU load with controlled utilization, for validating the balancer.
+
+Each worker holds a target utilization with PWM: every ``period`` it burns
+CPU for ``duty * period`` and sleeps for the rest. The duty cycle comes
+from a profile evaluated on the time since start:
+
+  * ``Constant(duty)``: a steady load.
+  * ``Ramp(start, end, seconds)``: rises (or falls) linearly, then holds.
+  * ``Burst(high, low, on, off)``: square wave of ``on`` s at ``high`` and
+    ``off`` s at ``low``.
+
+A worker runs ``threads`` burner threads, each holding the duty cycle on
+its own, so a worker with 4 threads on 4 free cores loads each to
+``duty``. The burn loop hashes a buffer with ``hashlib``, which releases
+the GIL, so threads of one process load separate cores. Workers can be
+pinned to a CPU.
+
+Workers are forked child processes (one process per worker, what the
+process balancer moves) where ``fork`` is available. Elsewhere a child
+would re-import the dashboard script, so they run as threads of the
+calling process. Nothing is written to disk. From the command line:
+
+    python load_generator.py --cpus 0 1 --profile burst --duty 0.9 --threads 2
+"""
+import argparse
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+
+import psutil
+
+PWM_PERIOD = 0.1  # Seconds per duty cycle
+DEFAULT_MODE = "process" if "fork" in multiprocessing.get_all_start_methods() else "thread"
+_BLOCK = bytes(64 * 1024)  # Hashed per burn step (~30 us, GIL released)
+
+
+class Constant:
+    def __init__(self, duty=1.0):
+        self.duty = duty
+
+    def __call__(self, t):
+        return self.duty
+
+
+class Ramp:
+    def __init__(self, start=0.0, end=1.0, seconds=30.0):
+        self.start = start
+        self.end = end
+        self.seconds = seconds
+
+    def __call__(self, t):
+        if self.seconds <= 0 or t >= self.seconds:
+            return self.end
+        return self.start + (self.end - self.start) * t / self.seconds
+
+
+class Burst:
+    def __init__(self, high=1.0, low=0.0, on=2.0, off=3.0):
+        self.high = high
+        self.low = low
+        self.on = on
+        self.off = off
+
+    def __call__(self, t):
+        return self.high if t % (self.on + self.off) < self.on else self.low
+
+
+PROFILES = {"constant": Constant, "ramp": Ramp, "burst": Burst}
+
+
+def _pin(cpu):
+    """Pin the calling thread (Linux) or process to `cpu`"""
+    if cpu is None:
+        return
+    try:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, {cpu})
+        else:
+            psutil.Process().cpu_affinity([cpu])
+    except (OSError, ValueError, psutil.Error):
+        pass
+
+
+def _burn_until(deadline):
+    while time.perf_counter() < deadline:
+        hashlib.sha256(_BLOCK).digest()
+
+
+def pwm_loop(profile, duration, period, stop, cpu=None):
+    """Hold `profile`'s duty cycle until `duration` has passed or `stop` is set"""
+    _pin(cpu)
+    started = time.perf_counter()
+    while not stop.is_set():
+        now = time.perf_counter()
+        elapsed = now - started
+        if elapsed >= duration:
+            break
+        duty = min(max(profile(elapsed), 0.0), 1.0)
+        _burn_until(now + duty * period)
+        rest = period - (time.perf_counter() - now)
+        if rest > 0:
+            stop.wait(rest)
+
+
+def run_worker(profile, duration, period, stop, cpu=None, threads=1):
+    """Body of one worker: `threads` PWM burner threads, the first being the caller
+
+    Burning in the worker's own thread keeps a single-threaded worker
+    movable by PID: on Linux a PID's affinity is that of its main thread.
+    """
+    burners = [threading.Thread(target=pwm_loop, args=(profile, duration, period, stop, cpu),
+                                name=f"burner-{i}", daemon=True) for i in range(1, threads)]
+    for burner in burners:
+        burner.start()
+    pwm_loop(profile, duration, period, stop, cpu)
+    for burner in burners:
+        burner.join()
+
+
+class LoadGenerator:
+    """A set of PWM load workers started and stopped together"""
+
+    def __init__(self, period=PWM_PERIOD, mode=DEFAULT_MODE):
+        if mode not in ("process", "thread"):
+            raise ValueError(f"Unknown load generator mode: {mode}")
+        if mode == "process" and "fork" not in multiprocessing.get_all_start_methods():
+            mode = "thread"
+        self.period = period
+        self.mode = mode
+        self.specs = []
+        self.workers = []
+        if mode == "process":
+            self._context = multiprocessing.get_context("fork")
+            self.stop_event = self._context.Event()
+        else:
+            self._context = None
+            self.stop_event = threading.Event()
+
+    def add(self, profile=None, cpu=None, threads=1, duration=30.0):
+        """Add a worker (not started yet); `cpu` pins it, None lets it float"""
+        self.specs.append((profile or Constant(1.0), cpu, threads, duration))
+        return self
+
+    def start(self):
+        self.stop_event.clear()
+        for i, (profile, cpu, threads, duration) in enumerate(self.specs):
+            args = (profile, duration, self.period, self.stop_event, cpu, threads)
+            if self.mode == "process":
+                worker = self._context.Process(target=run_worker, args=args, name=f"load-worker-{i}", daemon=True)
+            else:
+                worker = threading.Thread(target=run_worker, args=args, name=f"load-worker-{i}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+        return self
+
+    def stop(self, timeout=2.0):
+        """Stop every worker (processes that do not exit in time are killed)"""
+        self.stop_event.set()
+        for worker in self.workers:
+            worker.join(timeout)
+            if self.mode == "process" and worker.is_alive():
+                worker.kill()
+        self.workers = []
+
+    def running(self):
+        return any(worker.is_alive() for worker in self.workers)
+
+    def pids(self):
+        """PIDs of worker processes (empty in thread mode)"""
+        return [worker.pid for worker in self.workers if self.mode == "process"]
+
+
+def generate_load(cpus=None, profile=None, duration=30.0, threads=1, workers=None,
+                  period=PWM_PERIOD, mode=DEFAULT_MODE):
+    """Start one worker per CPU in `cpus` (pinned), or `workers` floating ones"""
+    generator = LoadGenerator(period, mode)
+    if cpus is not None:
+        for cpu in cpus:
+            generator.add(profile, cpu, threads, duration)
+    else:
+        for _ in range(workers or psutil.cpu_count() or 1):
+            generator.add(profile, None, threads, duration)
+    return generator.start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic CPU load")
+    parser.add_argument("--cpus", type=int, nargs="+", help="pin one worker to each CPU (default: float)")
+    parser.add_argument("--workers", type=int, help="floating workers when --cpus is not given (default: one per CPU)")
+    parser.add_argument("--threads", type=int, default=1, help="burner threads per worker")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="constant")
+    parser.add_argument("--duty", type=float, default=1.0,
+                        help="target utilization 0-1 (constant), end of a ramp, or burst high")
+    parser.add_argument("--start-duty", type=float, default=0.0, help="start of a ramp")
+    parser.add_argument("--low-duty", type=float, default=0.0, help="utilization between bursts")
+    parser.add_argument("--ramp", type=float, default=30.0, help="ramp length (s)")
+    parser.add_argument("--on", type=float, default=2.0, help="burst length (s)")
+    parser.add_argument("--off", type=float, default=3.0, help="pause between bursts (s)")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--period", type=float, default=PWM_PERIOD, help="PWM period (s)")
+    parser.add_argument("--mode", choices=["process", "thread"], default=DEFAULT_MODE)
+    args = parser.parse_args(argv)
+
+    if args.profile == "ramp":
+        profile = Ramp(args.start_duty, args.duty, args.ramp)
+    elif args.profile == "burst":
+        profile = Burst(args.duty, args.low_duty, args.on, args.off)
+    else:
+        profile = Constant(args.duty)
+
+    generator = generate_load(args.cpus, profile, args.duration, args.threads, args.workers,
+                              args.period, args.mode)
+    print(f"{len(generator.workers)} {generator.mode} worker(s) x {args.threads} thread(s), "
+          f"{args.profile} profile for {args.duration:.0f}s (Ctrl+C stops)")
+    try:
+        while generator.running():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        generator.stop()
+
+
+if __name__ == "__main__":
+    main()
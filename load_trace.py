@@ -0,0 +1,100 @@
+"""Compact binary load traces.
+
+A trace is a gzip stream that starts with ``TRACE_MAGIC``. One record per
+tick follows, each holding that tick's per-core load (``get_cpu_load()``)
+and its process snapshot:
+
+    header   <d H I    timestamp, cores, processes
+    loads    float32[cores]
+    pid      int32[n]     cpu_percent  float32[n]   nice  int32[n]
+    cpu_num  int16[n]     create_time  float64[n]
+    names    uint32 length + NUL-separated UTF-8
+    statuses uint32 length + NUL-separated UTF-8
+
+``TraceReader`` turns records back into ``ProcessSnapshot`` objects, so a
+trace can be fed through the engine exactly like live ticks (see
+``replay.py``).
+"""
+import gzip
+import struct
+import time
+
+import numpy as np
+
+from process_snapshot import ProcessSnapshot
+
+TRACE_MAGIC = b"LBTRACE1"
+_HEADER = struct.Struct("<dHI")
+_LENGTH = struct.Struct("<I")
+
+
+def _pack_strings(strings):
+    blob = "\0".join(strings).encode("utf-8", "replace")
+    return _LENGTH.pack(len(blob)) + blob
+
+
+class TraceWriter:
+    """Appends one record per tick to a gzip-compressed trace file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.ticks = 0
+        self._file = gzip.open(path, "wb", compresslevel=6)
+        self._file.write(TRACE_MAGIC)
+
+    def write(self, snapshot, timestamp=None):
+        """Append `snapshot`, stamped with `timestamp` (wall-clock seconds, default now)"""
+        loads = np.asarray(snapshot.cpu_loads, dtype=np.float32)
+        n = len(snapshot)
+        self._file.write(b"".join((
+            _HEADER.pack(time.time() if timestamp is None else timestamp, len(loads), n),
+            loads.tobytes(),
+            np.asarray(snapshot.pid, dtype=np.int32).tobytes(),
+            np.asarray(snapshot.cpu_percent, dtype=np.float32).tobytes(),
+            np.asarray(snapshot.nice, dtype=np.int32).tobytes(),
+            np.asarray(snapshot.cpu_num, dtype=np.int16).tobytes(),
+            np.asarray(snapshot.create_time, dtype=np.float64).tobytes(),
+            _pack_strings(snapshot.names),
+            _pack_strings(snapshot.statuses),
+        )))
+        self.ticks += 1
+
+    def close(self):
+        self._file.close()
+
+
+class TraceReader:
+    """Iterates a trace file as ProcessSnapshot objects"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        with gzip.open(self.path, "rb") as f:
+            if f.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+                raise ValueError(f"{self.path} is not a load trace")
+            tick = 0
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    return
+                timestamp, cores, n = _HEADER.unpack(header)
+                loads = np.frombuffer(f.read(4 * cores), dtype=np.float32)
+                pid = np.frombuffer(f.read(4 * n), dtype=np.int32).astype(np.int64)
+                cpu_percent = np.frombuffer(f.read(4 * n), dtype=np.float32).astype(float)
+                nice = np.frombuffer(f.read(4 * n), dtype=np.int32).copy()
+                cpu_num = np.frombuffer(f.read(2 * n), dtype=np.int16).astype(np.int64)
+                create_time = np.frombuffer(f.read(8 * n), dtype=np.float64).copy()
+                names = self._strings(f, n)
+                statuses = self._strings(f, n)
+                tick += 1
+                snapshot = ProcessSnapshot([float(x) for x in loads], pid, cpu_percent, nice, cpu_num,
+                                           create_time, names, statuses, time.monotonic(), 0.0, tick)
+                snapshot.recorded_at = timestamp  # Wall-clock time of the original tick
+                yield snapshot
+
+    @staticmethod
+    def _strings(f, n):
+        (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+        blob = f.read(length).decode("utf-8", "replace")
+        return blob.split("\0") if n else []
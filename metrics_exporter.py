@@ -0,0 +1,163 @@
+"""Prometheus / OpenMetrics exporter for the balancer's state.
+
+Serves ``/metrics`` in the Prometheus text format from a small
+``http.server`` thread next to the monitoring loop:
+
+  * per-core load (the latest ``get_cpu_load`` sample) and forecast load
+  * migrations attempted / succeeded / failed (process, thread and cpuset moves)
+  * cooldown table size and whether balancing is engaged
+  * a latency histogram per tick stage (``instrumentation``)
+
+Scrapes never sample anything themselves. The body is rendered at most
+once per monitoring tick and served from cache until the next one, so any
+number of scrapers costs one serialization per tick. The cache is keyed on
+``engine.ticks_completed()``, which the worker bumps after a tick's
+migrations have been applied, not on the snapshot tick (taken before
+balancing). ``/instrumentation`` returns ``instrumentation.report()``
+(rolling stage percentiles, own CPU and RSS) as JSON, cached the same way:
+
+    python balancer_daemon.py --metrics-port 9464
+    curl localhost:9464/metrics
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import balancer_engine as engine
+import instrumentation
+import process_snapshot
+
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9464
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+JSON_CONTENT_TYPE = "application/json"
+
+
+def _family(lines, name, kind, help_text):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _value(value):
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+def render_metrics():
+    """Current balancer state in the Prometheus text exposition format"""
+    lines = []
+    if len(engine.cpu_history):
+        _family(lines, "balancer_cpu_load_percent", "gauge", "Per-core CPU load of the latest sample")
+        for core, load in enumerate(engine.cpu_history.latest()):
+            lines.append(f'balancer_cpu_load_percent{{core="{core}"}} {_value(load)}')
+    forecast = engine.latest_forecast
+    if forecast is not None:
+        _family(lines, "balancer_cpu_load_predicted_percent", "gauge",
+                f"Per-core CPU load forecast {forecast.horizon:g}s ahead ({forecast.model})")
+        for core, load in enumerate(forecast.predicted):
+            lines.append(f'balancer_cpu_load_predicted_percent{{core="{core}"}} {_value(load)}')
+
+    for outcome in ("attempted", "succeeded", "failed"):
+        name = f"balancer_migrations_{outcome}_total"
+        _family(lines, name, "counter", f"Migrations (process, thread or cgroup cpuset changes) {outcome}")
+        lines.append(f"{name} {engine.migration_counts[outcome]}")
+
+    _family(lines, "balancer_cooldown_entries", "gauge", "Processes in the migration history / cooldown table")
+    lines.append(f"balancer_cooldown_entries {len(engine.migration_history)}")
+    _family(lines, "balancer_balancing_engaged", "gauge", "1 while sustained imbalance has balancing engaged")
+    lines.append(f"balancer_balancing_engaged {int(engine.balance_controller.engaged)}")
+    _family(lines, "balancer_threshold_percent", "gauge", "Load thresholds")
+    lines.append(f'balancer_threshold_percent{{level="high"}} {engine.L_HIGH}')
+    lines.append(f'balancer_threshold_percent{{level="low"}} {engine.L_LOW}')
+    _family(lines, "balancer_ticks_total", "counter", "Monitoring ticks (process snapshots) taken")
+    lines.append(f"balancer_ticks_total {process_snapshot.current_tick()}")
+
+    stage_stats, _, gauges = instrumentation.snapshot()
+    if stage_stats:
+        _family(lines, "balancer_stage_duration_seconds", "histogram", "Duration of each monitoring tick stage")
+        for stage, stats in sorted(stage_stats.items()):
+            cumulative = 0
+            for bound, count in zip(instrumentation.STAGE_BUCKETS + (float("inf"),), stats["buckets"]):
+                cumulative += count
+                lines.append(f'balancer_stage_duration_seconds_bucket{{stage="{stage}",le="{_value(bound)}"}} {cumulative}')
+            lines.append(f'balancer_stage_duration_seconds_sum{{stage="{stage}"}} {_value(stats["total"])}')
+            lines.append(f'balancer_stage_duration_seconds_count{{stage="{stage}"}} {stats["count"]}')
+    for name, value in sorted(gauges.items()):
+        _family(lines, f"balancer_{name}", "gauge", name.replace("_", " "))
+        lines.append(f"balancer_{name} {_value(value)}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def render_report():
+    """instrumentation.report() as JSON"""
+    return json.dumps(instrumentation.report(), sort_keys=True).encode()
+
+
+class MetricsCache:
+    """Rendered metrics, regenerated only when another tick has finished"""
+
+    def __init__(self, render=render_metrics, tick=engine.ticks_completed):
+        self.render = render
+        self.tick = tick
+        self.body = None
+        self.rendered_tick = None
+        self.renders = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            tick = self.tick()
+            if self.body is None or tick != self.rendered_tick:
+                self.body = self.render()
+                self.rendered_tick = tick
+                self.renders += 1
+            return self.body
+
+
+class _Handler(BaseHTTPRequestHandler):
+    routes = {}  # path -> (MetricsCache, content type)
+
+    def do_GET(self):
+        route = self.routes.get(self.path.split("?")[0])
+        if route is None:
+            self.send_error(404)
+            return
+        cache, content_type = route
+        try:
+            body = cache.get()
+        except Exception as e:
+            self.send_error(500, str(e))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes are not worth a log line each
+
+
+class MetricsExporter:
+    """HTTP server for /metrics on a daemon thread"""
+
+    def __init__(self, port=METRICS_PORT, host=METRICS_HOST, cache=None):
+        self.cache = cache or MetricsCache()
+        self.report_cache = MetricsCache(render_report)
+        routes = {"/metrics": (self.cache, CONTENT_TYPE), "/": (self.cache, CONTENT_TYPE),
+                  "/instrumentation": (self.report_cache, JSON_CONTENT_TYPE)}
+        handler = type("MetricsHandler", (_Handler,), {"routes": routes})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-exporter", daemon=True)
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
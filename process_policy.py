@@ -0,0 +1,143 @@
+"""Process eligibility policy.
+
+Decides which processes the balancer may migrate, from allow/deny rules on
+the process name, executable path, user, cgroup and PID range. Rules are
+compiled once: exact names and users into sets, name/exe/cgroup patterns
+into one combined regex each, PID ranges into a tuple. A process matching
+an allow rule is eligible even if a deny rule matches too.
+
+Verdicts are cached per ``(pid, create_time)`` until the policy is
+reloaded. ``exec()`` keeps both but changes the name (and exe), so a cached
+verdict is only reused while the process still has the name it was judged
+by. The exe path, user and cgroup are only read when a rule needs them; as
+they can change without a new name (setuid, a cgroup move, exec of a
+same-named binary), verdicts that read them are re-evaluated after
+``VERDICT_MAX_AGE`` seconds.
+
+A policy file is JSON with optional ``allow`` and ``deny`` sections:
+
+    {"deny": {"names": ["sshd"], "name_patterns": ["^kworker/"],
+              "exe_patterns": ["^/usr/lib/systemd/"], "users": ["root"],
+              "cgroups": ["system\\\\.slice"], "pid_ranges": [[0, 9]]},
+     "allow": {"names": ["ffmpeg"]}}
+"""
+import json
+import os
+import re
+import time
+
+import psutil
+
+# Matched case-insensitively as substrings of the process name
+SYSTEM_PROCESSES = ['system', 'systemd', 'kernel', 'wininit', 'services.exe',
+                    'explorer.exe', 'csrss.exe', 'lsass.exe', 'winlogon.exe',
+                    'svchost.exe', 'taskhost.exe', 'dwm.exe']
+
+VERDICT_MAX_AGE = 30.0  # Seconds a verdict that read exe/user/cgroup is reused
+
+DEFAULT_POLICY = {
+    "deny": {
+        "name_patterns": [re.escape(name) for name in SYSTEM_PROCESSES],
+        "pid_ranges": [[0, 9]],  # Idle/system and other low PIDs
+    },
+}
+
+
+def _combine(patterns):
+    """One case-insensitive regex matching any of `patterns` (None if empty)"""
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+
+class RuleSet:
+    """Compiled allow or deny rules"""
+
+    def __init__(self, rules=None):
+        rules = rules or {}
+        self.names = frozenset(n.lower() for n in rules.get("names", ()))
+        self.name_re = _combine(rules.get("name_patterns"))
+        self.exe_re = _combine(rules.get("exe_patterns"))
+        self.users = frozenset(rules.get("users", ()))
+        self.cgroup_re = _combine(rules.get("cgroups"))
+        self.pid_ranges = tuple((int(lo), int(hi)) for lo, hi in rules.get("pid_ranges", ()))
+
+    def matches(self, pid, name, info):
+        """True if any rule matches; `info(kind)` fetches exe/user/cgroup lazily"""
+        for lo, hi in self.pid_ranges:
+            if lo <= pid <= hi:
+                return True
+        if name.lower() in self.names:
+            return True
+        if self.name_re is not None and self.name_re.search(name):
+            return True
+        if self.exe_re is not None and self.exe_re.search(info("exe")):
+            return True
+        if self.users and info("user") in self.users:
+            return True
+        if self.cgroup_re is not None and self.cgroup_re.search(info("cgroup")):
+            return True
+        return False
+
+
+def read_process_info(pid, kind, proc_root="/proc"):
+    """Executable path, user name or cgroup path of `pid` ('' if unreadable)"""
+    try:
+        if kind == "cgroup":
+            with open(os.path.join(proc_root, str(pid), "cgroup")) as f:
+                return f.read()
+        process = psutil.Process(pid)
+        return process.exe() if kind == "exe" else process.username()
+    except (OSError, psutil.Error):
+        return ""
+
+
+class ProcessPolicy:
+    """Compiled allow/deny policy with per-(pid, create_time) verdict cache"""
+
+    def __init__(self, policy=None, proc_root="/proc", clock=time.monotonic):
+        self.proc_root = proc_root
+        self.clock = clock
+        self.verdicts = {}  # (pid, create_time) -> (name, verdict, expires at or None)
+        self.load(DEFAULT_POLICY if policy is None else policy)
+
+    def load(self, policy):
+        """Compile a policy dict (or JSON file path) and drop cached verdicts"""
+        if isinstance(policy, str):
+            with open(policy) as f:
+                policy = json.load(f)
+        self.allow = RuleSet(policy.get("allow"))
+        self.deny = RuleSet(policy.get("deny"))
+        self.verdicts.clear()
+
+    def allows(self, proc):
+        """Cached verdict for a ProcessEntry (re-evaluated after an exec or when stale)"""
+        key = (proc.pid, proc.create_time)
+        cached = self.verdicts.get(key)
+        if cached is not None and cached[0] == proc.name and (cached[2] is None or self.clock() < cached[2]):
+            return cached[1]
+        verdict, fetched = self._evaluate(proc.pid, proc.name)
+        expires = self.clock() + VERDICT_MAX_AGE if fetched else None
+        self.verdicts[key] = (proc.name, verdict, expires)
+        return verdict
+
+    def evaluate(self, pid, name):
+        return self._evaluate(pid, name)[0]
+
+    def _evaluate(self, pid, name):
+        """(verdict, whether exe/user/cgroup had to be read)"""
+        fetched = {}
+
+        def info(kind):
+            if kind not in fetched:
+                fetched[kind] = read_process_info(pid, kind, self.proc_root)
+            return fetched[kind]
+
+        if self.allow.matches(pid, name, info):
+            return True, bool(fetched)
+        return not self.deny.matches(pid, name, info), bool(fetched)
+
+    def prune(self, snapshot):
+        """Forget verdicts of processes that are no longer running"""
+        live = set(zip(snapshot.pid.tolist(), snapshot.create_time.tolist()))
+        self.verdicts = {key: v for key, v in self.verdicts.items() if key in live}
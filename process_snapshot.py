@@ -0,0 +1,185 @@
+"""Per-tick process snapshot shared by every consumer of process data.
+
+One scan per monitoring tick fills a column-oriented snapshot; the balancer,
+manual balancing, the process list and prediction all read from it instead
+of rescanning. On Linux the scan reads /proc directly (``proc_reader``);
+elsewhere it falls back to a single ``psutil.process_iter`` pass.
+
+Staleness rules:
+  * The monitoring tick always takes a fresh snapshot (``refresh_snapshot``).
+  * Any other consumer reuses the current snapshot until ``SNAPSHOT_AGE_SLACK``
+    seconds after the next tick is due (``set_tick_interval``, kept current by
+    the worker as the interval adapts), so the process list refresh and
+    manual balancing never trigger their own scan while monitoring is running.
+  * An older (or missing) snapshot is rescanned on demand.
+  * Per-process values are a point-in-time view: anything that must be exact
+    before acting (affinity, liveness) is re-checked on the live process.
+"""
+import time
+from collections import namedtuple
+
+import numpy as np
+import psutil
+
+import candidate_selection
+import instrumentation
+import proc_reader
+
+SNAPSHOT_AGE_SLACK = 1.5  # Seconds past the next due tick a snapshot may still be reused
+SNAPSHOT_BACKEND = "proc" if proc_reader.is_supported() else "psutil"
+
+ProcessEntry = namedtuple("ProcessEntry", "pid name cpu_percent nice status cpu_num create_time")
+
+_ATTRS = ['pid', 'name', 'cpu_percent', 'nice', 'status', 'create_time']
+if hasattr(psutil.Process, 'cpu_num'):  # Linux, FreeBSD, SunOS
+    _ATTRS.append('cpu_num')
+
+NO_NICE = np.iinfo(np.int32).min  # Stored when nice() is not readable
+
+
+class ProcessSnapshot:
+    """Column-oriented view of all processes at one point in time"""
+
+    def __init__(self, cpu_loads, pid, cpu_percent, nice, cpu_num, create_time,
+                 names, statuses, taken_at, scan_seconds, tick):
+        self.cpu_loads = cpu_loads
+        self.pid = pid
+        self.cpu_percent = cpu_percent
+        self.nice = nice
+        self.cpu_num = cpu_num
+        self.create_time = create_time
+        self.names = names
+        self.statuses = statuses
+        self.taken_at = taken_at
+        self.scan_seconds = scan_seconds
+        self.tick = tick
+        self.table = None  # Full ProcTable when taken with the /proc backend
+        self._index = None
+        self._pid_order = None
+        self._nice_keys = None
+
+    def __len__(self):
+        return len(self.pid)
+
+    def age(self):
+        return time.monotonic() - self.taken_at
+
+    def entry(self, i):
+        nice = self.nice[i]
+        return ProcessEntry(
+            int(self.pid[i]), self.names[i], float(self.cpu_percent[i]),
+            None if nice == NO_NICE else int(nice), self.statuses[i],
+            int(self.cpu_num[i]), float(self.create_time[i])
+        )
+
+    def active(self, min_cpu=1.0, limit=None):
+        """Indices of processes above `min_cpu`, busiest first (only the `limit` busiest if given)"""
+        idx = np.flatnonzero(self.cpu_percent > min_cpu)
+        return idx[candidate_selection.top_k(self.cpu_percent[idx], limit)]
+
+    def pid_order(self):
+        """Indices that sort the snapshot by PID (computed once per snapshot)"""
+        if self._pid_order is None:
+            self._pid_order = np.argsort(self.pid, kind='stable')
+        return self._pid_order
+
+    def nice_keys(self):
+        """Niceness as a sort key, 0 where unreadable (computed once per snapshot)"""
+        if self._nice_keys is None:
+            self._nice_keys = np.where(self.nice == NO_NICE, 0, self.nice)
+        return self._nice_keys
+
+    def index_of(self, pid):
+        """Row of `pid`, or None if it was not running at snapshot time"""
+        if self._index is None:
+            self._index = {int(p): i for i, p in enumerate(self.pid)}
+        return self._index.get(pid)
+
+    def find(self, pid):
+        """Entry for `pid`, or None if it was not running at snapshot time"""
+        i = self.index_of(pid)
+        return None if i is None else self.entry(i)
+
+
+_current = None
+_tick = 0
+_tick_interval = 1.0  # Seconds between monitoring ticks
+
+
+_reader = None
+
+
+def _scan_proc():
+    global _reader
+    if _reader is None:
+        _reader = proc_reader.ProcReader()
+    table = _reader.read()
+    return table, (table.pid, table.cpu_percent, table.nice, table.processor,
+                   _reader.create_times(table), table.names, table.statuses())
+
+
+def _scan_psutil():
+    pids, cpu, nice, cpu_num, created, names, statuses = [], [], [], [], [], [], []
+    for proc in psutil.process_iter(_ATTRS):
+        info = proc.info
+        pids.append(info['pid'])
+        cpu.append(info['cpu_percent'] or 0.0)
+        nice.append(NO_NICE if info['nice'] is None else info['nice'])
+        cpu_num.append(-1 if info.get('cpu_num') is None else info['cpu_num'])
+        created.append(info['create_time'] or 0.0)
+        names.append(info['name'] or "")
+        statuses.append(info['status'] or "")
+    return None, (np.array(pids, dtype=np.int64), np.array(cpu, dtype=np.float64),
+                  np.array(nice, dtype=np.int32), np.array(cpu_num, dtype=np.int32),
+                  np.array(created, dtype=np.float64), names, statuses)
+
+
+def take_snapshot(cpu_loads):
+    """Scan all processes once and pack them into a snapshot"""
+    global _tick
+    start = time.perf_counter()
+    if SNAPSHOT_BACKEND == "proc":
+        table, columns = _scan_proc()
+    else:
+        table, columns = _scan_psutil()
+    scan_seconds = time.perf_counter() - start
+    _tick += 1
+
+    instrumentation.record_stage("snapshot", scan_seconds)
+    instrumentation.set_gauge("snapshot_processes", len(columns[0]))
+    snapshot = ProcessSnapshot(cpu_loads, *columns, time.monotonic(), scan_seconds, _tick)
+    snapshot.table = table
+    return snapshot
+
+
+def refresh_snapshot(cpu_loads):
+    """Take this tick's snapshot and make it current"""
+    global _current
+    _current = take_snapshot(cpu_loads)
+    return _current
+
+
+def current_tick():
+    """Number of snapshots taken so far (changes once per monitoring tick)"""
+    return _tick
+
+
+def set_tick_interval(seconds):
+    """Seconds until the next monitoring tick (the reuse window follows it)"""
+    global _tick_interval
+    _tick_interval = seconds
+
+
+def snapshot_max_age():
+    """Seconds a snapshot may be reused outside the tick (2.5 s at a 1 s interval)"""
+    return _tick_interval + SNAPSHOT_AGE_SLACK
+
+
+def current_snapshot(cpu_loads_fn, max_age=None):
+    """Return the current snapshot, rescanning only if it is stale"""
+    if max_age is None:
+        max_age = snapshot_max_age()
+    if _current is None or _current.age() > max_age:
+        return refresh_snapshot(cpu_loads_fn())
+    return _current
+
@@ -0,0 +1,230 @@
+"""Incremental process table for the dashboards.
+
+``ProcessTableModel`` keeps the displayed rows keyed by PID. Each refresh
+diffs the busiest processes of the tick's snapshot against the previous
+rows into inserted, removed and changed PIDs. ``ProcessTable`` applies only
+those diffs to a ``ttk.Treeview`` whose item ids are the PIDs, so the
+selection follows a process (not a row position) and nothing is re-parsed
+out of display strings.
+
+Everything but the affinity comes from the snapshot. The affinity costs a
+syscall per process, so it is fetched lazily, only for rows currently
+scrolled into view, and cached per ``(pid, create_time)`` for
+``DETAILS_MAX_AGE`` seconds. Clicking a column heading sorts by it;
+clicking again reverses the order.
+"""
+import time
+import tkinter as tk
+from tkinter import ttk
+
+import psutil
+
+TABLE_ROWS = 50         # Busiest processes shown
+DETAILS_MAX_AGE = 5.0   # Seconds a fetched affinity is reused
+
+# (column id, heading, width, anchor)
+COLUMNS = (
+    ("pid", "PID", 70, "e"),
+    ("name", "Name", 150, "w"),
+    ("cpu", "CPU %", 65, "e"),
+    ("nice", "Nice", 50, "e"),
+    ("core", "Core", 50, "e"),
+    ("affinity", "Affinity", 110, "w"),
+)
+
+# Sort key per column (`details` gives the cached affinity text)
+SORT_KEYS = {
+    "pid": lambda entry, details: entry.pid,
+    "name": lambda entry, details: entry.name.lower(),
+    "cpu": lambda entry, details: entry.cpu_percent,
+    "nice": lambda entry, details: entry.nice if entry.nice is not None else 0,
+    "core": lambda entry, details: entry.cpu_num,
+    "affinity": lambda entry, details: details[2] if details else "",
+}
+
+
+def read_affinity(pid):
+    """Affinity as shown in the table ('N/A' if unreadable)"""
+    try:
+        affinity = psutil.Process(pid).cpu_affinity()
+        return ",".join(map(str, affinity)) if len(affinity) < 5 else f"{len(affinity)} CPUs"
+    except Exception:
+        return "N/A"
+
+
+def row_values(entry):
+    """Snapshot-derived cell values of a row (everything but the affinity)"""
+    return (entry.pid, entry.name, f"{entry.cpu_percent:.1f}",
+            "" if entry.nice is None else entry.nice,
+            "" if entry.cpu_num < 0 else entry.cpu_num)
+
+
+def diff_rows(old, new):
+    """(inserted, removed, changed) keys between two {key: values} dicts"""
+    inserted = [key for key in new if key not in old]
+    removed = [key for key in old if key not in new]
+    changed = [key for key, values in new.items() if key in old and old[key] != values]
+    return inserted, removed, changed
+
+
+class ProcessTableModel:
+    """Busiest processes keyed by PID, with diffs, sort order and cached details"""
+
+    def __init__(self, limit=TABLE_ROWS, min_cpu=0.1):
+        self.limit = limit
+        self.min_cpu = min_cpu
+        self.rows = {}     # pid -> ProcessEntry
+        self.values = {}   # pid -> row_values()
+        self.details = {}  # pid -> (create_time, fetched_at, affinity text)
+        self.sort_column = "cpu"
+        self.sort_reverse = True
+
+    def update(self, snapshot):
+        """Take the snapshot's busiest processes; returns (inserted, removed, changed) PIDs"""
+        rows = {}
+        for i in snapshot.active(self.min_cpu, self.limit):
+            entry = snapshot.entry(i)
+            rows[entry.pid] = entry
+        values = {pid: row_values(entry) for pid, entry in rows.items()}
+        inserted, removed, changed = diff_rows(self.values, values)
+        for pid in removed:
+            self.details.pop(pid, None)
+        self.rows, self.values = rows, values
+        return inserted, removed, changed
+
+    def order(self):
+        """PIDs in the current sort order"""
+        key = SORT_KEYS[self.sort_column]
+        return sorted(self.rows, key=lambda pid: key(self.rows[pid], self.details.get(pid)),
+                      reverse=self.sort_reverse)
+
+    def sort_by(self, column):
+        """Sort by `column`; the same column again reverses the order"""
+        if column == self.sort_column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            self.sort_reverse = column in ("cpu", "nice")
+
+    def detail(self, pid, now=None):
+        """(affinity text, fetched now?) for a row, fetched at most every DETAILS_MAX_AGE s"""
+        entry = self.rows.get(pid)
+        if entry is None:
+            return "", False
+        now = time.monotonic() if now is None else now
+        cached = self.details.get(pid)
+        if cached is not None and cached[0] == entry.create_time and now - cached[1] < DETAILS_MAX_AGE:
+            return cached[2], False
+        affinity = read_affinity(pid)
+        self.details[pid] = (entry.create_time, now, affinity)
+        return affinity, True
+
+
+class ProcessTable:
+    """ttk.Treeview showing a ProcessTableModel, updated by row diffs
+
+    `colors` needs bg, fg, select_bg, select_fg, hot (rows > 50% CPU) and
+    warm (> 20%).
+    """
+
+    def __init__(self, parent, colors, font=("Consolas", 9), height=10, limit=TABLE_ROWS):
+        self.model = ProcessTableModel(limit)
+        self.frame = tk.Frame(parent, bg=colors["bg"])
+        style = ttk.Style(parent)
+        style.configure("Processes.Treeview", background=colors["bg"], fieldbackground=colors["bg"],
+                        foreground=colors["fg"], font=font, rowheight=font[1] + 10)
+        style.map("Processes.Treeview", background=[("selected", colors["select_bg"])],
+                  foreground=[("selected", colors["select_fg"])])
+
+        self.tree = ttk.Treeview(self.frame, columns=[c[0] for c in COLUMNS], show="headings",
+                                 selectmode="browse", height=height, style="Processes.Treeview")
+        for column, heading, width, anchor in COLUMNS:
+            self.tree.heading(column, text=heading, command=lambda c=column: self.sort_by(c))
+            self.tree.column(column, width=width, anchor=anchor, stretch=column == "name")
+        self.tree.tag_configure("hot", foreground=colors["hot"])
+        self.tree.tag_configure("warm", foreground=colors["warm"])
+
+        self.scrollbar = tk.Scrollbar(self.frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        self._details_pending = False
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def bind(self, sequence, fn):
+        self.tree.bind(sequence, fn)
+
+    def update(self, snapshot):
+        """Apply the snapshot's row diffs to the tree"""
+        model = self.model
+        inserted, removed, changed = model.update(snapshot)
+        if removed:
+            self.tree.delete(*(str(pid) for pid in removed))
+        for pid in inserted:
+            self.tree.insert("", "end", iid=str(pid), values=model.values[pid] + ("",),
+                             tags=self._tag(model.rows[pid]))
+        for pid in changed:
+            self.tree.item(str(pid), values=model.values[pid] + (self._shown_detail(pid),),
+                           tags=self._tag(model.rows[pid]))
+        self._reorder()
+        self.fill_visible_details()
+
+    def sort_by(self, column):
+        self.model.sort_by(column)
+        for name, heading, _, _ in COLUMNS:
+            arrow = (" ▼" if self.model.sort_reverse else " ▲") if name == column else ""
+            self.tree.heading(name, text=heading + arrow)
+        self._reorder()
+        self.fill_visible_details()
+
+    def fill_visible_details(self):
+        """Fetch (or refresh) the affinity of the rows scrolled into view"""
+        self._details_pending = False
+        for iid in self.tree.get_children():
+            if not self.tree.bbox(iid):
+                continue  # Scrolled out of view (or not mapped yet)
+            affinity, fetched = self.model.detail(int(iid))
+            if fetched or self.tree.set(iid, "affinity") != affinity:
+                self.tree.set(iid, "affinity", affinity)
+
+    def selected_pid(self):
+        """PID of the selected row, or None"""
+        selection = self.tree.selection()
+        return int(selection[0]) if selection else None
+
+    def select_at(self, y):
+        """Select the row under window coordinate `y` (e.g. on right-click)"""
+        iid = self.tree.identify_row(y)
+        if iid:
+            self.tree.selection_set(iid)
+        return self.selected_pid()
+
+    def entry(self, pid):
+        """ProcessEntry shown for `pid`, or None"""
+        return self.model.rows.get(pid)
+
+    def _tag(self, entry):
+        if entry.cpu_percent > 50:
+            return ("hot",)
+        if entry.cpu_percent > 20:
+            return ("warm",)
+        return ()
+
+    def _shown_detail(self, pid):
+        cached = self.model.details.get(pid)
+        return cached[2] if cached else ""
+
+    def _reorder(self):
+        wanted = [str(pid) for pid in self.model.order()]
+        if list(self.tree.get_children()) != wanted:
+            for index, iid in enumerate(wanted):
+                self.tree.move(iid, "", index)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # Rows scrolled into view get their details once the scroll settles
+        if not self._details_pending:
+            self._details_pending = True
+            self.tree.after_idle(self.fill_visible_details)
@@ -0,0 +1,163 @@
+"""Offline replay of recorded load traces.
+
+Feeds a trace recorded with ``balancer_daemon.py --record`` tick by tick
+through the engine (``ingest_snapshot``, ``predict_overload`` via
+``balance_load``), as fast as it can be read, against a simulated affinity
+backend: instead of calling ``sched_setaffinity``, a "moved" process keeps
+its recorded CPU usage in later ticks but it is counted on its new core.
+Cooldowns run on the trace's own clock.
+
+Reports imbalance over time, migration count and convergence time, so
+policies (thresholds, forecast model, budget, hysteresis) can be compared
+on the same load:
+
+    python replay.py trace.lbt --model slope --sustain 2 --csv imbalance.csv
+
+Record traces with ``--dry-run`` so they hold the unbalanced load. The
+simulation ignores the cache and memory effects of a move.
+"""
+import argparse
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import balancer_engine as engine
+import forecasting
+from load_trace import TraceReader
+
+ReplayResult = namedtuple("ReplayResult", "ticks duration times imbalance migrations convergence_time replay_seconds")
+
+
+class SimulatedAffinity:
+    """Affinity backend that records pins and moves their load in later ticks"""
+
+    def __init__(self):
+        self.pins = {}       # (pid, create_time) -> pinned core
+        self.migrations = 0
+        self.snapshot = None  # Tick being replayed, to resolve PIDs
+
+    def __call__(self, pid, cpu_list):
+        entry = self.snapshot.find(pid) if self.snapshot is not None else None
+        if entry is None:
+            return False
+        key = (pid, entry.create_time)
+        target = min(cpu_list)
+        if self.pins.get(key) == target:
+            return False
+        self.pins[key] = target
+        self.migrations += 1
+        return True
+
+    def apply(self, snapshot):
+        """Count every pinned process's recorded load on its pinned core"""
+        self.snapshot = snapshot
+        if not self.pins:
+            return snapshot
+        loads = np.asarray(snapshot.cpu_loads, dtype=float)
+        for i in np.flatnonzero(np.isin(snapshot.pid, [pid for pid, _ in self.pins])):
+            target = self.pins.get((int(snapshot.pid[i]), float(snapshot.create_time[i])))
+            source = int(snapshot.cpu_num[i])
+            if target is None or source == target or not 0 <= source < len(loads) or target >= len(loads):
+                continue
+            load = snapshot.cpu_percent[i]
+            loads[source] -= load
+            loads[target] += load
+            snapshot.cpu_num[i] = target
+        snapshot.cpu_loads = np.clip(loads, 0.0, 100.0).tolist()
+        return snapshot
+
+
+def convergence_time(times, imbalance, gap, settle=3):
+    """Seconds from the first tick above `gap` until it stays below for `settle` ticks"""
+    above = np.flatnonzero(imbalance > gap)
+    if not len(above):
+        return 0.0
+    first = above[0]
+    for j in range(first + 1, len(imbalance) - settle + 1):
+        if np.all(imbalance[j:j + settle] <= gap):
+            return float(times[j] - times[first])
+    return None
+
+
+def replay(path, gap=30.0, settle=3, quiet=True):
+    """Replay one trace through the current engine settings"""
+    engine.reset_state()
+    engine.set_balance_mode("process")
+    backend = SimulatedAffinity()
+    engine.set_affinity_backend(backend)
+    clock = [0.0]
+    engine.migration_history.clock = lambda: clock[0]
+    if quiet:
+        engine.set_log_handler(lambda message: None)
+
+    times, imbalance = [], []
+    start = previous = None
+    wall = time.perf_counter()
+    try:
+        for snapshot in TraceReader(path):
+            if start is None:
+                start = snapshot.recorded_at
+            clock[0] = snapshot.recorded_at - start
+            if previous is not None:
+                # Traces recorded with an adaptive interval are not evenly spaced
+                engine.set_sample_interval(snapshot.recorded_at - previous)
+            previous = snapshot.recorded_at
+            backend.apply(snapshot)
+            engine.ingest_snapshot(snapshot)
+            engine.balance_load(snapshot.cpu_loads, snapshot)
+            times.append(clock[0])
+            imbalance.append(max(snapshot.cpu_loads) - min(snapshot.cpu_loads))
+    finally:
+        engine.set_affinity_backend(None)
+        engine.migration_history.clock = time.monotonic
+        engine.set_log_handler(None)
+
+    times, imbalance = np.array(times), np.array(imbalance)
+    return ReplayResult(len(times), float(times[-1]) if len(times) else 0.0, times, imbalance,
+                        backend.migrations, convergence_time(times, imbalance, gap, settle),
+                        time.perf_counter() - wall)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a load trace against a simulated affinity backend")
+    parser.add_argument("trace", help="trace file recorded with balancer_daemon.py --record")
+    parser.add_argument("--high", type=int, default=engine.L_HIGH, help="high load threshold (%%)")
+    parser.add_argument("--low", type=int, default=engine.L_LOW, help="low load threshold (%%)")
+    parser.add_argument("--model", choices=forecasting.FORECAST_MODELS, default=engine.FORECAST_MODEL)
+    parser.add_argument("--horizon", type=float, default=engine.FORECAST_HORIZON)
+    parser.add_argument("--budget", type=int, default=engine.MIGRATION_BUDGET)
+    parser.add_argument("--cooldown", type=float, default=engine.BALANCE_COOLDOWN)
+    parser.add_argument("--sustain", type=float, default=engine.balance_controller.sustain_seconds,
+                        help="seconds an imbalance must last before balancing starts")
+    parser.add_argument("--interval", type=float, default=engine.SAMPLE_INTERVAL,
+                        help="tick interval assumed until the trace's own spacing is known")
+    parser.add_argument("--gap", type=float, default=30.0, help="imbalance (points) counted as converged")
+    parser.add_argument("--csv", help="write per-tick time,imbalance to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the engine's log messages")
+    args = parser.parse_args(argv)
+
+    engine.set_thresholds(args.high, args.low)
+    engine.set_forecast(args.model, args.horizon)
+    engine.MIGRATION_BUDGET = args.budget
+    engine.SAMPLE_INTERVAL = args.interval
+    engine.set_cooldown(args.cooldown)
+    engine.balance_controller.sustain_seconds = args.sustain
+
+    result = replay(args.trace, gap=args.gap, quiet=not args.verbose)
+    if not result.ticks:
+        print("Trace is empty")
+        return
+    converged = "never" if result.convergence_time is None else f"{result.convergence_time:.1f}s"
+    print(f"Ticks:            {result.ticks} ({result.duration:.1f}s of trace in {result.replay_seconds:.2f}s)")
+    print(f"Imbalance:        mean {result.imbalance.mean():.1f}, max {result.imbalance.max():.1f}, "
+          f"final {result.imbalance[-1]:.1f} points")
+    print(f"Migrations:       {result.migrations}")
+    print(f"Convergence time: {converged} (imbalance <= {args.gap:.0f} points)")
+    if args.csv:
+        np.savetxt(args.csv, np.column_stack([result.times, result.imbalance]),
+                   delimiter=",", header="time,imbalance", comments="", fmt="%.3f")
+
+
+if __name__ == "__main__":
+    main()
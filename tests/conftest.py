@@ -0,0 +1,35 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import balancer_engine as engine  # noqa: E402
+from process_snapshot import ProcessSnapshot  # noqa: E402
+
+
+def make_snapshot(cpu_loads, processes, tick=0, taken_at=0.0):
+    """ProcessSnapshot from (pid, cpu_percent, cpu_num) tuples"""
+    pid, cpu, core = (np.array(column) for column in zip(*processes))
+    n = len(processes)
+    return ProcessSnapshot(list(cpu_loads), pid.astype(np.int64), cpu.astype(float),
+                           np.zeros(n, dtype=np.int32), core.astype(np.int64),
+                           np.full(n, 1000.0), [f"worker-{p}" for p in pid], ["running"] * n,
+                           taken_at, 0.0, tick)
+
+
+@pytest.fixture
+def clock():
+    """Engine with fresh state, a silent log and a manual clock (seconds in clock[0])"""
+    now = [0.0]
+    engine.reset_state()
+    engine.migration_history.clock = lambda: now[0]
+    engine.set_log_handler(lambda message: None)
+    yield now
+    engine.set_log_handler(None)
+    engine.migration_history.clock = time.monotonic
+    engine.set_balance_mode("process")
+    engine.reset_state()
@@ -0,0 +1,82 @@
+import pytest
+
+import balancer_engine as engine
+import migration_planner
+from cgroup_cpuset import CGROUP_ROOT
+from conftest import make_snapshot
+
+GROUP_PID = 4242
+
+
+@pytest.fixture
+def cgroup_tree(tmp_path, clock):
+    """cgroup v2 fixture tree with one service, /svc, allowed on CPUs 0-3"""
+    root, proc = tmp_path / "cgroup", tmp_path / "proc"
+    (root / "svc").mkdir(parents=True)
+    (root / "cgroup.controllers").write_text("cpuset cpu\n")
+    (root / "svc" / "cpuset.cpus").write_text("0-3\n")
+    (root / "svc" / "cgroup.procs").write_text(f"{GROUP_PID}\n")
+    (proc / str(GROUP_PID)).mkdir(parents=True)
+    (proc / str(GROUP_PID) / "cgroup").write_text("0::/svc\n")
+    engine.set_cgroup_root(str(root), str(proc))
+    engine.set_balance_mode("cgroup")
+    yield root / "svc" / "cpuset.cpus"
+    engine.set_cgroup_root(CGROUP_ROOT)
+
+
+def tick(clock, loads, group_load):
+    """Advance one second and run one balancing tick"""
+    clock[0] += 1.0
+    snapshot = make_snapshot(loads, [(GROUP_PID, group_load, 0), (7, 5.0, 1)], tick=int(clock[0]))
+    engine.set_sample_interval(1.0)
+    engine.ingest_snapshot(snapshot)
+    return engine.balance_load(snapshot.cpu_loads, snapshot)
+
+
+def overload_until_moved(clock, cpuset):
+    for _ in range(10):
+        if tick(clock, [95, 20, 20, 20], 80.0) != (None, None):
+            break
+    assert cpuset.read_text().strip() == "1-3"
+
+
+def test_moved_group_stays_moved_after_load_drops(clock, cgroup_tree):
+    overload_until_moved(clock, cgroup_tree)
+    for _ in range(3 * int(engine.BALANCE_COOLDOWN)):
+        tick(clock, [25, 25, 25, 25], 20.0)
+    assert not engine.balance_controller.engaged
+    assert cgroup_tree.read_text().strip() == "1-3"
+
+
+def test_group_move_is_counted(clock, cgroup_tree):
+    overload_until_moved(clock, cgroup_tree)
+    assert engine.migration_counts == {"attempted": 1, "succeeded": 1, "failed": 0}
+
+
+def test_shutdown_restores_original_cpuset(clock, cgroup_tree):
+    overload_until_moved(clock, cgroup_tree)
+    engine.restore_cpusets()
+    assert cgroup_tree.read_text().strip() == "0-3"
+
+
+def test_idle_group_is_restored(clock, cgroup_tree):
+    overload_until_moved(clock, cgroup_tree)
+    for _ in range(int(engine.GROUP_IDLE_RESTORE)):
+        tick(clock, [10, 10, 10, 10], 0.0)
+    assert cgroup_tree.read_text().strip() == "1-3"
+    for _ in range(2):
+        tick(clock, [10, 10, 10, 10], 0.0)
+    assert cgroup_tree.read_text().strip() == "0-3"
+
+
+def test_group_recency_is_priced_by_group_key(clock, cgroup_tree):
+    overload_until_moved(clock, cgroup_tree)
+    clock[0] += engine.BALANCE_COOLDOWN
+    snapshot = make_snapshot([95, 20, 20, 20], [(GROUP_PID, 80.0, 0)])
+    proc = snapshot.entry(0)
+    (_, _, key), = engine._merge_by_group([(migration_planner.Candidate(proc, 80.0, 0), 0,
+                                            engine._history_key(proc))])
+    assert key == ("/svc", 0.0)
+    now = engine.migration_history.clock()
+    moved = engine.migration_cost.cost(snapshot, 0, engine.migration_history, now, key)
+    assert moved > engine.migration_cost.cost(snapshot, 0, engine.migration_history, now)
@@ -0,0 +1,30 @@
+import numpy as np
+
+import proc_reader
+
+
+def stat_line(pid, comm, state="S", nice=0, processor=3):
+    fields = [state, 1, pid, pid, 0, -1, 4194304, 1234, 0, 7, 0, 500, 250, 0, 0, 20, nice, 4, 0,
+              98765, 2703360, 313, 18446744073709551615] + [0] * 12 + [17, processor] + [0] * 14
+    return f"{pid} ({comm}) {' '.join(map(str, fields))}\n".encode()
+
+
+def test_vectorized_parse_matches_line_by_line():
+    lines = [stat_line(10, "bash"), stat_line(11, "a b) (c", "R", -20, 0),
+             stat_line(12, "kworker/u8:2-events", "I", 19, 63), stat_line(13, "café")]
+    names, states, columns = proc_reader.parse_stat_lines(lines)
+    assert names == ["bash", "a b) (c", "kworker/u8:2-events", "café"]
+    assert states == ["S", "R", "I", "S"]
+    assert columns[5].tolist() == [0, -20, 19, 0]  # nice
+    assert columns[9].tolist() == [3, 0, 63, 3]    # processor
+    expected = proc_reader._parse_each(lines)
+    assert names == expected[0] and states == expected[1]
+    assert np.array_equal(columns, expected[2])
+
+
+def test_irregular_lines_fall_back():
+    # No processor field (and no trailing newline) on the last line
+    short = b" ".join(stat_line(14, "old").split()[:30])
+    names, _, columns = proc_reader.parse_stat_lines([stat_line(10, "bash"), short])
+    assert names == ["bash", "old"]
+    assert columns[9].tolist() == [3, -1]
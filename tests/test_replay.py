@@ -0,0 +1,33 @@
+import balancer_engine as engine
+import replay
+from conftest import make_snapshot
+from load_trace import TraceWriter
+
+# pid -> (cpu %, core): core 0 is overloaded by two heavy processes, the
+# other cores carry a few light ones each
+PROCESSES = {3001: (45.0, 0), 3002: (40.0, 0), 3003: (10.0, 0)}
+PROCESSES.update({4000 + 10 * core + k: (5.0, core) for core in (1, 2, 3) for k in range(4)})
+
+
+def write_trace(path, ticks=40):
+    loads = [0.0] * 4
+    for cpu, core in PROCESSES.values():
+        loads[core] += cpu
+    writer = TraceWriter(str(path))
+    for t in range(ticks):
+        rows = [(pid, cpu, core) for pid, (cpu, core) in PROCESSES.items()]
+        writer.write(make_snapshot(loads, rows, tick=t), timestamp=1000.0 + t)
+    writer.close()
+
+
+def test_relieved_target_is_not_balanced_again(tmp_path, clock):
+    write_trace(tmp_path / "step.lbt")
+    moves = []
+    engine.set_event_sink(lambda event, **fields: moves.append(fields) if event == "migrate" else None)
+    try:
+        result = replay.replay(str(tmp_path / "step.lbt"))
+    finally:
+        engine.set_event_sink(None)
+    assert result.migrations >= 1
+    target = moves[0]["to_core"]
+    assert [move for move in moves if move["from_core"] == target] == []